@@ -3,6 +3,10 @@ import time
 import os
 import json
 import csv
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 # Try to load environment variables from .env file
 try:
@@ -18,8 +22,39 @@ from constants import (
     PLACE_DETAILS_FIELDS, GOOGLE_PLACES_RATE_LIMIT_DELAY, PAGINATION_DELAY,
     CITIES_TO_SEARCH, INSTITUTION_TYPES, MAX_PAGES_PER_QUERY,
     BANGALORE_KEYWORDS, DEFAULT_LOCATION, INITIAL_LEADS_OUTPUT_FILE,
-    DEFAULT_REQUEST_TIMEOUT
+    DEFAULT_REQUEST_TIMEOUT, GOOGLE_PLACES_DETAILS_WORKERS
 )
+from place_cache import PlaceStore
+
+class RateLimiter:
+    """
+    Spaces requests from all threads at least `interval` seconds apart.
+
+    One limiter is shared by the text searches and every details worker, so together
+    they stay within the Places API quota.
+    """
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+    
+    def wait(self):
+        """Block until this caller's request slot comes up"""
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def create_places_session():
+    """Keep-alive session with enough pooled connections for every details worker"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=GOOGLE_PLACES_DETAILS_WORKERS + 1)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 def categorize_location(location_string):
     """
@@ -42,16 +77,20 @@ def categorize_location(location_string):
     
     return DEFAULT_LOCATION
 
-def get_place_details(api_key, place_id):
+def get_place_details(api_key, place_id, session=requests, limiter=None):
     """
     Fetches detailed information for a specific place using the Place Details API.
     
+    Only the fields missing from text search results are requested (PLACE_DETAILS_FIELDS).
+    
     Args:
         api_key (str): Google Cloud Platform API key
         place_id (str): The place ID to get details for
+        session: requests module or Session to send the request with
+        limiter (RateLimiter): Shared limiter to wait on before the request, if any
         
     Returns:
-        dict: Place details including website, phone, etc.
+        dict: Place details including website and phone, or None if the request failed
     """
     params = {
         "place_id": place_id,
@@ -60,7 +99,9 @@ def get_place_details(api_key, place_id):
     }
     
     try:
-        response = requests.get(GOOGLE_PLACES_DETAILS_URL, params=params, timeout=DEFAULT_REQUEST_TIMEOUT)
+        if limiter:
+            limiter.wait()
+        response = session.get(GOOGLE_PLACES_DETAILS_URL, params=params, timeout=DEFAULT_REQUEST_TIMEOUT)
         response.raise_for_status()
         result = response.json()
         
@@ -68,20 +109,75 @@ def get_place_details(api_key, place_id):
             return result.get("result", {})
         else:
             print(f"WARN: Place Details API error for {place_id}: {result.get('status')}")
-            return {}
+            return None
             
     except Exception as e:
         print(f"WARN: Error fetching place details for {place_id}: {e}")
+        return None
+
+def lookup_place_details(api_key, place, session=requests, limiter=None, store=None):
+    """
+    Returns a place's details from the store when they are fresh, otherwise from the API.
+    
+    Freshly fetched details are written back to the store; failed requests return {}.
+    """
+    place_id = place["place_id"]
+    place_details = store.get(place_id) if store else None
+    if place_details is not None:
+        return place_details
+    
+    place_details = get_place_details(api_key, place_id, session, limiter)
+    if place_details is None:
         return {}
+    if store:
+        store.put(place_id, place.get("name", "N/A"), place_details)
+    return place_details
+
+def build_institution(place, inst_type, place_details):
+    """
+    Combines a text search result with its details into a lead row.
+    
+    Returns:
+        tuple: (Institution Name, Type, Website, Location, Phone), or None if the place has no valid website
+    """
+    name = place.get("name", "N/A")
+    
+    # Extract website and other details
+    website = place_details.get("website", "")
+    phone = place_details.get("formatted_phone_number", "N/A")
+    
+    # Only add institutions that have valid websites
+    if not (website and website.strip() and website.lower() not in ['n/a', 'na', '']):
+        print(f"INFO: Skipped {name} - no valid website found")
+        return None
+    
+    # Categorize the location based on keywords
+    raw_location = place.get("formatted_address", "N/A")
+    categorized_location = categorize_location(raw_location)
+    
+    print(f"INFO: Added {name} with website: {website}")
+    return (
+        name, 
+        inst_type, 
+        website, 
+        categorized_location,
+        phone
+    )
 
-def fetch_institutions(api_key, cities, institution_types):
+def fetch_institutions(api_key, cities, institution_types, store=None):
     """
     Fetches a list of institutions from the Google Places API based on cities and types.
 
+    Place details are fetched by a pool of GOOGLE_PLACES_DETAILS_WORKERS threads while
+    the search moves on, so details for one page arrive during the wait for the next
+    page token. All requests share one rate limiter (GOOGLE_PLACES_RATE_LIMIT_DELAY).
+    Places with fresh details in the store are not looked up again.
+
     Args:
         api_key (str): Your Google Cloud Platform API key with Places API enabled.
         cities (list): A list of city names to search in (e.g., ["Bangalore", "Delhi"]).
         institution_types (list): A list of types to search for (e.g., ["Corporates", "Schools"]).
+        store (PlaceStore): Persistent place details store, or None to always use the API.
 
     Returns:
         list: A list of tuples, where each tuple contains (Institution Name, Type, Website, Location, Phone).
@@ -107,92 +203,77 @@ def fetch_institutions(api_key, cities, institution_types):
 
     # 2. Using a set to track processed place IDs is an efficient way to handle duplicates
     processed_place_ids = set()
+    
+    # (details future, search result, type) in discovery order, so rows keep the search order
+    pending_details = []
+    limiter = RateLimiter(GOOGLE_PLACES_RATE_LIMIT_DELAY)
+    session = create_places_session()
 
-    for city in cities:
-        for inst_type in institution_types:
-            if inst_type in search_queries:
-                for query_template in search_queries[inst_type]:
-                    query = query_template.format(city)
-                    print(f"INFO: Searching for '{query}'...")
-                    
-                    params = {
-                        "query": query,
-                        "key": api_key
-                    }
-                    
-                    # Loop to handle pagination (limited to max pages)
-                    page_count = 1  # Start with page 1
-                    max_pages = MAX_PAGES_PER_QUERY
-                    
-                    while page_count <= max_pages:
-                        try:
-                            response = requests.get(base_url, params=params, timeout=DEFAULT_REQUEST_TIMEOUT)
-                            response.raise_for_status()
-                            results = response.json()
-                        except requests.exceptions.RequestException as e:
-                            print(f"ERROR: An HTTP request error occurred: {e}")
-                            break
-                        except json.JSONDecodeError:
-                            print(f"ERROR: Failed to decode JSON from response.")
-                            break
-
-                        print(f"INFO: Processing page {page_count}...")
+    with ThreadPoolExecutor(max_workers=GOOGLE_PLACES_DETAILS_WORKERS) as executor:
+        for city in cities:
+            for inst_type in institution_types:
+                if inst_type in search_queries:
+                    for query_template in search_queries[inst_type]:
+                        query = query_template.format(city)
+                        print(f"INFO: Searching for '{query}'...")
                         
-                        for place in results.get("results", []):
-                            place_id = place.get("place_id")
-                            if place_id and place_id not in processed_place_ids:
-                                try:
-                                    name = place.get("name", "N/A")
-                                    
-                                    # Get detailed information including website
-                                    print(f"INFO: Fetching details for {name}...")
-                                    place_details = get_place_details(api_key, place_id)
-                                    
-                                    # Extract website and other details
-                                    website = place_details.get("website", "")
-                                    phone = place_details.get("formatted_phone_number", "N/A")
-                                    
-                                    # Only add institutions that have valid websites
-                                    if website and website.strip() and website.lower() not in ['n/a', 'na', '']:
-                                        # Categorize the location based on keywords
-                                        raw_location = place.get("formatted_address", "N/A")
-                                        categorized_location = categorize_location(raw_location)
-                                        
-                                        institution_data = (
-                                            name, 
-                                            inst_type, 
-                                            website, 
-                                            categorized_location,
-                                            phone
-                                        )
-                                        all_institutions.append(institution_data)
-                                        print(f"INFO: Added {name} with website: {website}")
-                                    else:
-                                        print(f"INFO: Skipped {name} - no valid website found")
-                                    
+                        params = {
+                            "query": query,
+                            "key": api_key
+                        }
+                        
+                        # Loop to handle pagination (limited to max pages)
+                        page_count = 1  # Start with page 1
+                        max_pages = MAX_PAGES_PER_QUERY
+                        
+                        while page_count <= max_pages:
+                            try:
+                                limiter.wait()
+                                response = session.get(base_url, params=params, timeout=DEFAULT_REQUEST_TIMEOUT)
+                                response.raise_for_status()
+                                results = response.json()
+                            except requests.exceptions.RequestException as e:
+                                print(f"ERROR: An HTTP request error occurred: {e}")
+                                break
+                            except json.JSONDecodeError:
+                                print(f"ERROR: Failed to decode JSON from response.")
+                                break
+
+                            print(f"INFO: Processing page {page_count}...")
+                            
+                            # Queue details for new places; the workers fetch them while we paginate
+                            for place in results.get("results", []):
+                                place_id = place.get("place_id")
+                                if place_id and place_id not in processed_place_ids:
                                     processed_place_ids.add(place_id)
-                                    
-                                    # Rate limiting - Google allows 100 requests per 100 seconds
-                                    time.sleep(GOOGLE_PLACES_RATE_LIMIT_DELAY)
-                                    
-                                except Exception as e:
-                                    print(f"WARN: Error processing place: {place.get('name', 'Unknown')}. Details: {e}")
+                                    future = executor.submit(lookup_place_details, api_key, place, session, limiter, store)
+                                    pending_details.append((future, place, inst_type))
+                            print(f"INFO: Queued details for {len(pending_details)} places so far")
 
-                        next_page_token = results.get('next_page_token')
-                        
-                        if next_page_token and page_count < max_pages:
-                            params['pagetoken'] = next_page_token
-                            page_count += 1
-                            print(f"INFO: Moving to page {page_count}...")
-                            time.sleep(PAGINATION_DELAY) 
-                        else:
-                            if page_count >= max_pages:
-                                print(f"INFO: Reached maximum page limit ({max_pages}) for query: {query}")
+                            next_page_token = results.get('next_page_token')
+                            
+                            if next_page_token and page_count < max_pages:
+                                params['pagetoken'] = next_page_token
+                                page_count += 1
+                                print(f"INFO: Moving to page {page_count}...")
+                                time.sleep(PAGINATION_DELAY) 
                             else:
-                                print(f"INFO: No more pages available for query: {query} (found {page_count} pages)")
-                            break
-            else:
-                print(f"WARN: No defined search queries for institution type: {inst_type}")
+                                if page_count >= max_pages:
+                                    print(f"INFO: Reached maximum page limit ({max_pages}) for query: {query}")
+                                else:
+                                    print(f"INFO: No more pages available for query: {query} (found {page_count} pages)")
+                                break
+                else:
+                    print(f"WARN: No defined search queries for institution type: {inst_type}")
+
+        print(f"INFO: Waiting for details of {len(pending_details)} places...")
+        for future, place, inst_type in pending_details:
+            try:
+                institution_data = build_institution(place, inst_type, future.result())
+                if institution_data:
+                    all_institutions.append(institution_data)
+            except Exception as e:
+                print(f"WARN: Error processing place: {place.get('name', 'Unknown')}. Details: {e}")
 
     return all_institutions
 
@@ -220,9 +301,87 @@ def save_to_csv(data, filename=INITIAL_LEADS_OUTPUT_FILE):
     except IOError as e:
         print(f"ERROR: Could not write to file {filename}. Error: {e}")
 
+def website_key(website):
+    """Normalized website used to match a lead against existing CSV rows"""
+    return website.strip().lower().rstrip('/')
+
+def lead_key(row):
+    """
+    Normalized (name, website) of a CSV row. Separate places can share a website (a
+    college and its other campus, branches of one company), so the name is part of it.
+    """
+    return " ".join(row[0].lower().split()), website_key(row[2])
+
+def merge_into_csv(data, filename=INITIAL_LEADS_OUTPUT_FILE):
+    """
+    Merges newly discovered leads into an existing CSV file instead of overwriting it.
+    
+    Rows are matched by name and website (lead_key): existing leads keep their position and are updated with
+    the fresh data, new leads are appended, and leads not found in this run are kept.
+    
+    Args:
+        data (list of tuples): The data to merge.
+        filename (str): The name of the output CSV file.
+    """
+    if not os.path.exists(filename):
+        save_to_csv(data, filename)
+        return
+    
+    try:
+        with open(filename, newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            header = next(reader, None)
+            existing = [tuple(row) for row in reader if row]
+    except IOError as e:
+        print(f"ERROR: Could not read {filename}. Error: {e}")
+        return
+    
+    # Existing rows are all kept, short ones padded with N/A; a fresh lead replaces the first row with its key
+    short = sum(1 for row in existing if len(row) < 5)
+    if short:
+        print(f"WARNING: Padded {short} row(s) in {filename} that had fewer than 5 columns")
+    rows = [row + ("N/A",) * (5 - len(row)) for row in existing]
+    positions = {}
+    for position, row in enumerate(rows):
+        positions.setdefault(lead_key(row), position)
+    added = updated = 0
+    for row in data:
+        key, row = lead_key(row), tuple(row)
+        if key not in positions:
+            positions[key] = len(rows)
+            rows.append(row)
+            added += 1
+        elif rows[positions[key]] != row:
+            rows[positions[key]] = row
+            updated += 1
+    
+    if not added and not updated:
+        print(f"\nINFO: {filename} is up to date ({len(rows)} leads)")
+        return
+    
+    # Write to a temporary file first so an interrupted run never truncates the leads
+    temp_file = f"{filename}.tmp"
+    try:
+        with open(temp_file, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(header or ['Institution Name', 'Institution Type', 'Website', 'Location', 'Phone'])
+            writer.writerows(rows)
+        os.replace(temp_file, filename)
+        print(f"\nSUCCESS: Merged leads into {filename}: {added} added, {updated} updated, {len(rows)} total")
+    except IOError as e:
+        print(f"ERROR: Could not write to file {filename}. Error: {e}")
+
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Discover institutions with the Google Places API")
+    parser.add_argument("--refresh-details", action="store_true",
+                        help="Fetch place details again even when the stored ones are fresh")
+    parser.add_argument("--no-place-cache", action="store_true", help="Do not read or write the place details store")
+    parser.add_argument("--overwrite", action="store_true",
+                        help=f"Rewrite {INITIAL_LEADS_OUTPUT_FILE} from this run only instead of merging into it")
+    args = parser.parse_args()
+    
     # Start timing
     start_time = time.time()
     print("Starting Coursera Lead Generation Script...")
@@ -234,10 +393,18 @@ if __name__ == "__main__":
         cities_to_search = CITIES_TO_SEARCH
         types_to_search = INSTITUTION_TYPES
         
-        discovered_leads = fetch_institutions(GOOGLE_PLACES_API_KEY, cities_to_search, types_to_search)
+        store = None if args.no_place_cache else PlaceStore(refresh=args.refresh_details)
+        discovered_leads = fetch_institutions(GOOGLE_PLACES_API_KEY, cities_to_search, types_to_search, store)
+        if store:
+            stats = store.stats()
+            print(f"\nINFO: Place details: {stats['fresh']} from the store, "
+                  f"{stats['new']} new and {stats['stale']} stale places looked up")
         
         # 3. Save the final output to a CSV file
-        save_to_csv(discovered_leads)
+        if args.overwrite:
+            save_to_csv(discovered_leads)
+        else:
+            merge_into_csv(discovered_leads)
         
         # Optional: Print a summary to the console
         if discovered_leads:
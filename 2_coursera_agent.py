@@ -1,10 +1,62 @@
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import json
 import os
 import time
 import random
+import asyncio
+import argparse
+import threading
+import hashlib
+import functools
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from constants import (
+    DEFAULT_MAX_WORKERS, MAX_CONSECUTIVE_ERRORS,
+    ASYNC_MAX_CONCURRENT_LEADS, ASYNC_MAX_CONNECTIONS, ASYNC_PER_HOST_LIMIT,
+    ASYNC_GEMINI_CONCURRENCY, ASYNC_PERPLEXITY_CONCURRENCY, PAGE_CACHE_ENABLED, LLM_CACHE_ENABLED,
+    INCREMENTAL_RECOMMENDATION, RECOMMENDATION_CONFIDENCE_THRESHOLD, RUN_MANIFEST_PATH,
+    HTML_EXTRACTION_BACKEND, GEMINI_API_BASE, PERPLEXITY_API_URL, TRACE_ENABLED, TRACE_FILE,
+    URL_RANKER_ENABLED, URL_RANKER_MIN_SCORE, URL_RANKER_MAX_URLS, URL_RANKER_MAX_CONTACT_URLS,
+    SITEMAP_DISCOVERY_ENABLED, SITEMAP_TIMEOUT,
+    GENERAL_CLASSIFICATION_SCORES, PROGRAMMING_KEYWORD_SCORES, SALES_KEYWORD_SCORES,
+    GEMINI_BATCHING_ENABLED, GEMINI_BATCH_MAX_ITEMS, GEMINI_BATCH_TIMEOUT,
+    PIPELINE_ENABLED, PIPELINE_CONTACT_WORKERS, PIPELINE_WRITE_WORKERS, PIPELINE_QUEUE_SIZE,
+    RESULT_SINK, EXPORT_DOMAIN_JSON, RESULTS_JSONL_PATH, SHARE_PARENT_DOMAIN_CONTACTS,
+    RECOMMENDATION_MAX_CONTEXT_CHARS, TEXT_DEDUP_ENABLED, TEXT_DEDUP_SHINGLE_WORDS,
+    PERPLEXITY_MAX_CONCURRENCY, PERPLEXITY_TIMEOUT, LOCAL_CONTACTS_ENABLED, LOCAL_CONTACTS_MIN_CONTACTS
+)
+from page_cache import PageCache
+from llm_cache import LLMCache
+from run_manifest import RunManifest, CONTACTS_DONE, FAILED
+from http_transport import CRAWL, GEMINI, PERPLEXITY, get_session, create_async_sessions
+from http_transport import metrics_snapshot as transport_metrics_snapshot
+from politeness import DomainScheduler
+from html_extract import extract_page, resolve_backend
+from url_ranker import select_urls
+from fetch_policy import (
+    ACCEPT_ENCODING, CHUNK_SIZE as FETCH_CHUNK_SIZE, BodyBudget, crawlable_url, rejection_reason
+)
+from sitemap_discovery import SitemapDiscovery, SitemapParser, CHUNK_SIZE as SITEMAP_CHUNK_SIZE
+from gemini_batcher import GeminiBatcher, AsyncGeminiBatcher, build_batch_prompt
+from pipeline import Stage, StagePipeline, AsyncStagePipeline
+from result_sink import open_result_sink, read_saved_results, OK as RESULT_OK, FAILED as RESULT_FAILED
+from output_filter import CleanedOutputView
+from contacts import ContactDirectory, dedupe_contacts, CRAWLED_PAGES
+from text_dedup import PageTextDedup
+from perplexity_client import PerplexityClient, AsyncPerplexityClient
+from contact_harvest import ContactHarvest
+from stage_metrics import (
+    STAGE_METRICS, timed_stage, annotate_span, set_span_attributes, lead_scope,
+    configure_trace, close_trace, start_metrics_server, format_stage_summary
+)
+
+# aiohttp is only needed for the async execution mode (--async)
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
 
 # Try to load from .env file first, then environment variable
 def load_api_key():
@@ -20,7 +72,8 @@ def load_api_key():
 
 # Environment variables
 GEMINI_API_KEY = load_api_key()
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={GEMINI_API_KEY}"
+GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_API_URL = f"{GEMINI_API_BASE}/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
 
 # Perplexity API Configuration
 def load_perplexity_api_key():
@@ -35,7 +88,7 @@ def load_perplexity_api_key():
     return os.environ.get("PERPLEXITY_API_KEY", "YOUR_PERPLEXITY_API_KEY_HERE")
 
 PERPLEXITY_API_KEY = load_perplexity_api_key()
-PERPLEXITY_BASE_URL = "https://api.perplexity.ai/chat/completions"
+PERPLEXITY_BASE_URL = PERPLEXITY_API_URL
 PERPLEXITY_HEADERS = {
     "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
     "Content-Type": "application/json"
@@ -134,6 +187,83 @@ Example: {{"selected_urls": ["url_1", "url_2", "url_3"]}}
 # Debug: Print API key status (remove in production)
 # print(f"API Key loaded: {'Yes' if GEMINI_API_KEY != 'YOUR_API_KEY_HERE' else 'No'}")
 
+def build_perplexity_payload(query):
+    """Request body for a Perplexity chat completion"""
+    return {
+        "model": "sonar-pro",
+        "messages": [
+            {
+                "role": "user",
+                "content": query
+            }
+        ],
+        "max_tokens": 4000,
+        "temperature": 0.2
+    }
+
+def record_perplexity_usage(result):
+    """Add a Perplexity response's token usage to the current span"""
+    usage = result.get('usage') or {}
+    annotate_span(prompt_tokens=usage.get('prompt_tokens'), response_tokens=usage.get('completion_tokens'))
+
+def interpret_perplexity_response(result):
+    """Turn a raw Perplexity response into the answer/citations/breakdown dict"""
+    # Extract the response content
+    if 'choices' in result and len(result['choices']) > 0:
+        content = result['choices'][0]['message']['content']
+        
+        # Print the full response from Perplexity
+        print(f"\n📋 PERPLEXITY RESPONSE:")
+        print("="*80)
+        print(content)
+        print("="*80)
+        
+        return {
+            "answer": content,
+            "citations": [],  # Perplexity doesn't provide citations in this format
+            "breakdown": result.get('usage', {})
+        }
+    else:
+        print(f"❌ No choices found in Perplexity response")
+        print(f"Full response: {result}")
+        return {"answer": "", "citations": [], "breakdown": {}}
+
+def send_perplexity(payload):
+    """POST one payload to Perplexity; returns (status, Retry-After header, body)"""
+    resp = get_session(PERPLEXITY).post(PERPLEXITY_BASE_URL, json=payload, headers=PERPLEXITY_HEADERS,
+                                        timeout=PERPLEXITY_TIMEOUT)
+    return resp.status_code, resp.headers.get("Retry-After"), resp.content
+
+async def send_perplexity_async(clients, payload):
+    """Async version of send_perplexity"""
+    async with clients.sessions[PERPLEXITY].post(PERPLEXITY_BASE_URL, json=payload, headers=PERPLEXITY_HEADERS,
+                                                 timeout=aiohttp.ClientTimeout(total=PERPLEXITY_TIMEOUT)) as resp:
+        return resp.status, resp.headers.get("Retry-After"), await resp.read()
+
+# Shared Perplexity client (concurrency window, retries, coalescing), created on first use
+_perplexity_client = None
+_perplexity_client_lock = threading.Lock()
+
+def get_perplexity_client():
+    """Return the process-wide PerplexityClient"""
+    global _perplexity_client
+    with _perplexity_client_lock:
+        if _perplexity_client is None:
+            _perplexity_client = PerplexityClient(send_perplexity)
+    return _perplexity_client
+
+def read_perplexity_body(body, info):
+    """Parse a Perplexity response body and record it on the current span"""
+    result = json.loads(body)
+    if info["coalesced"]:
+        # The request and its tokens are accounted to the lead that sent it
+        set_span_attributes(coalesced=True)
+    else:
+        annotate_span(bytes=len(body), retries=info["retries"])
+        record_perplexity_usage(result)
+    return result
+
+@timed_stage("perplexity")
 def perplexity_deep_research(query: str, max_searches: int = 10) -> dict:
     """
     Perform a deep research query using Perplexity API.
@@ -151,48 +281,41 @@ def perplexity_deep_research(query: str, max_searches: int = 10) -> dict:
     if not PERPLEXITY_API_KEY:
         raise RuntimeError("PERPLEXITY_API_KEY environment variable not set")
     
-    payload = {
-        "model": "sonar-pro",
-        "messages": [
-            {
-                "role": "user",
-                "content": query
-            }
-        ],
-        "max_tokens": 4000,
-        "temperature": 0.2
-    }
+    payload = build_perplexity_payload(query)
     
     try:
         print(f"\n🔍 Sending query to Perplexity API...")
         print(f"Query length: {len(query)} characters")
         
-        resp = requests.post(PERPLEXITY_BASE_URL, json=payload, headers=PERPLEXITY_HEADERS, timeout=60)
-        resp.raise_for_status()
-        result = resp.json()
+        body, info = get_perplexity_client().post(payload)
+        result = read_perplexity_body(body, info)
         
         print(f"✅ Perplexity API response received")
-        print(f"Response status: {resp.status_code}")
         
-        # Extract the response content
-        if 'choices' in result and len(result['choices']) > 0:
-            content = result['choices'][0]['message']['content']
+        return interpret_perplexity_response(result)
             
-            # Print the full response from Perplexity
-            print(f"\n📋 PERPLEXITY RESPONSE:")
-            print("="*80)
-            print(content)
-            print("="*80)
-            
-            return {
-                "answer": content,
-                "citations": [],  # Perplexity doesn't provide citations in this format
-                "breakdown": result.get('usage', {})
-            }
-        else:
-            print(f"❌ No choices found in Perplexity response")
-            print(f"Full response: {result}")
-            return {"answer": "", "citations": [], "breakdown": {}}
+    except Exception as e:
+        print(f"❌ Error in Perplexity API call: {e}")
+        return {"answer": "", "citations": [], "breakdown": {}}
+
+@timed_stage("perplexity")
+async def perplexity_deep_research_async(clients, query: str, max_searches: int = 10) -> dict:
+    """Async version of perplexity_deep_research"""
+    if not PERPLEXITY_API_KEY:
+        raise RuntimeError("PERPLEXITY_API_KEY environment variable not set")
+    
+    payload = build_perplexity_payload(query)
+    
+    try:
+        print(f"\n🔍 Sending query to Perplexity API...")
+        print(f"Query length: {len(query)} characters")
+        
+        body, info = await clients.perplexity.post(payload)
+        result = read_perplexity_body(body, info)
+        
+        print(f"✅ Perplexity API response received")
+        
+        return interpret_perplexity_response(result)
             
     except Exception as e:
         print(f"❌ Error in Perplexity API call: {e}")
@@ -219,7 +342,7 @@ def get_enhanced_headers():
         'User-Agent': random.choice(user_agents),
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
         'Accept-Language': 'en-US,en;q=0.9',
-        'Accept-Encoding': 'gzip, deflate, br',
+        'Accept-Encoding': ACCEPT_ENCODING,  # Only codings the HTTP clients can decode
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1',
         'Sec-Fetch-Dest': 'document',
@@ -233,57 +356,281 @@ def get_enhanced_headers():
         'Sec-Ch-Ua-Platform': '"Windows"'
     }
 
+def get_attempt_headers(attempt):
+    """Headers for a given retry attempt; later attempts look more like a search-engine referral"""
+    # Get fresh headers for each attempt
+    headers = get_enhanced_headers()
+    
+    if attempt == 1:
+        # Second attempt: Add referer
+        headers['Referer'] = 'https://www.google.com/'
+    elif attempt >= 2:
+        # Third attempt: Different approach with more realistic headers
+        headers.update({
+            'Referer': 'https://www.google.com/',
+            'Origin': 'https://www.google.com',
+            'Sec-Fetch-Site': 'cross-site'
+        })
+    return headers
+
+@dataclass
+class FetchedResponse:
+    """Minimal response returned by the async fetcher; mirrors the requests.Response attributes we use"""
+    url: str
+    status_code: int
+    headers: dict
+    content: bytes
+    # True when the fetch budget cut the body short
+    truncated: bool = False
+
+# Shared page cache, created on first use; disabled with --no-page-cache
+page_cache_enabled = PAGE_CACHE_ENABLED
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+def get_page_cache():
+    """Return the process-wide PageCache, or None when page caching is disabled"""
+    global _page_cache
+    if not page_cache_enabled:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache()
+    return _page_cache
+
+def lookup_page_cache(url):
+    """
+    Check the page cache before fetching url.
+
+    Returns (cached, response): response is set when the cached copy is fresh and no
+    request is needed; otherwise cached (possibly None) is the entry to revalidate.
+    """
+    cache = get_page_cache()
+    cached = cache.get(url) if cache else None
+    if cached and cached.is_fresh(cache.ttl):
+        cache.record("hits")
+        print(f"📦 Served {url} from page cache")
+        return cached, FetchedResponse(url, 200, cached.headers, cached.content)
+    return cached, None
+
+def resolve_cached_response(url, response, cached):
+    """
+    Reconcile a network response with the page cache.
+
+    A 304 for a cached page returns the cached copy; a complete 200 is stored (a body
+    the fetch budget cut short is not). Any other response is returned unchanged.
+    """
+    cache = get_page_cache()
+    if cache is None:
+        return response
+    if response.status_code == 304 and cached is not None:
+        cache.mark_revalidated(url)
+        cache.record("revalidated")
+        print(f"📦 {url} not modified, using cached copy")
+        return FetchedResponse(url, 200, cached.headers, cached.content)
+    if response.status_code == 200:
+        if not response.truncated:
+            cache.put(url, response.headers, response.content)
+        cache.record("misses")
+    return response
+
+def budgeted_response(url, final_url, headers, budget):
+    """FetchedResponse holding the part of a body read within the fetch budget"""
+    if budget.truncated:
+        set_span_attributes(truncated=True)
+        print(f"✂️  Stopped reading {url} after {budget.size // 1024} KB")
+    return FetchedResponse(final_url, 200, headers, budget.body(), budget.truncated)
+
+def read_streamed_response(url, response):
+    """
+    Read a streamed requests response within the fetch budget (fetch_policy.py).
+
+    Returns a FetchedResponse, or None when a 200 response is not HTML or too large.
+    """
+    if response.status_code != 200:
+        return FetchedResponse(response.url, response.status_code, response.headers, b"")
+    reason = rejection_reason(response.headers)
+    if reason:
+        print(f"⏭️  Skipping {url}: {reason}")
+        return None
+    budget = BodyBudget()
+    # urllib3 2's read1 returns whatever has arrived, so a trickling body cannot outlast
+    # FETCH_MAX_SECONDS by waiting for a full chunk
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is not None:
+        chunks = iter(lambda: read1(FETCH_CHUNK_SIZE, decode_content=True), b"")
+    else:
+        chunks = response.iter_content(FETCH_CHUNK_SIZE)
+    for chunk in chunks:
+        if not budget.add(chunk):
+            break
+    return budgeted_response(url, response.url, response.headers, budget)
+
+async def read_streamed_response_async(url, resp):
+    """Async version of read_streamed_response for an aiohttp response"""
+    if resp.status != 200:
+        return FetchedResponse(str(resp.url), resp.status, resp.headers.copy(), b"")
+    reason = rejection_reason(resp.headers)
+    if reason:
+        print(f"⏭️  Skipping {url}: {reason}")
+        return None
+    budget = BodyBudget()
+    async for chunk in resp.content.iter_any():
+        if not budget.add(chunk):
+            break
+    return budgeted_response(url, str(resp.url), resp.headers.copy(), budget)
+
+# Shared by all workers so each host is paced once, however many leads point at it
+crawl_scheduler = DomainScheduler()
+
+@timed_stage("fetch")
 def make_robust_request(url, max_retries=3):
     """Make a robust HTTP request with multiple fallback strategies"""
-    session = requests.Session()
+    if not crawlable_url(url):
+        print(f"⏭️  Skipping {url}: not a web page")
+        return None
+    
+    cached, response = lookup_page_cache(url)
+    if response is not None:
+        set_span_attributes(cache_hit=True)
+        return response
+    
+    # Shared keep-alive pool: repeat visits to a host reuse the TCP/TLS connection
+    session = get_session(CRAWL)
     
     for attempt in range(max_retries):
+        if attempt:
+            annotate_span(retries=1)
         try:
-            # Get fresh headers for each attempt
-            headers = get_enhanced_headers()
+            headers = get_attempt_headers(attempt)
+            if cached:
+                # Revalidate the stale cached copy instead of downloading it again
+                headers.update(cached.conditional_headers())
             
-            # Add random delay
-            time.sleep(random.uniform(1, 3))
+            # Per-host pacing: robots.txt crawl-delay, back-off after 429/503/406, Retry-After
+            crawl_scheduler.wait(url)
             
-            if attempt == 0:
-                # First attempt: Standard request
-                response = session.get(url, headers=headers, timeout=15, allow_redirects=True)
-            elif attempt == 1:
-                # Second attempt: Add referer
-                headers['Referer'] = 'https://www.google.com/'
-                response = session.get(url, headers=headers, timeout=15, allow_redirects=True)
-            else:
-                # Third attempt: Different approach with more realistic headers
-                headers.update({
-                    'Referer': 'https://www.google.com/',
-                    'Origin': 'https://www.google.com',
-                    'Sec-Fetch-Site': 'cross-site'
-                })
-                response = session.get(url, headers=headers, timeout=15, allow_redirects=True)
+            # Streamed: the headers decide whether the body is worth reading, and only
+            # FETCH_MAX_BYTES of it are read
+            with session.get(url, headers=headers, timeout=15, allow_redirects=True, stream=True) as streamed:
+                crawl_scheduler.report(url, streamed.status_code, streamed.headers.get('Retry-After'))
+                response = read_streamed_response(url, streamed)
+            if response is None:
+                return None
+            response = resolve_cached_response(url, response, cached)
+            set_span_attributes(status=response.status_code)
             
             if response.status_code == 200:
+                annotate_span(bytes=len(response.content))
                 print(f"✅ Successfully accessed {url} on attempt {attempt + 1}")
                 return response
             elif response.status_code == 406:
                 print(f"⚠️  Attempt {attempt + 1}: Got 406 error, trying different approach...")
-                time.sleep(random.uniform(3, 7))  # Wait longer between attempts
                 continue
             else:
                 print(f"⚠️  Attempt {attempt + 1}: Got status {response.status_code}, retrying...")
-                time.sleep(random.uniform(2, 5))
                 continue
                 
         except requests.exceptions.RequestException as e:
             print(f"❌ Attempt {attempt + 1} failed: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(random.uniform(3, 7))
             continue
     
     print(f"❌ All attempts failed for {url}")
     return None
 
-def find_urls(url):
-    """Find all URLs present as hyperlinks in the website with anti-bot protection"""
+@timed_stage("fetch")
+async def make_robust_request_async(clients, url, max_retries=3):
+    """Async version of make_robust_request, bounded by the per-host concurrency limit"""
+    if not crawlable_url(url):
+        print(f"⏭️  Skipping {url}: not a web page")
+        return None
+    
+    cached, response = lookup_page_cache(url)
+    if response is not None:
+        set_span_attributes(cache_hit=True)
+        return response
+    
+    for attempt in range(max_retries):
+        if attempt:
+            annotate_span(retries=1)
+        try:
+            headers = get_attempt_headers(attempt)
+            if cached:
+                headers.update(cached.conditional_headers())
+            
+            await crawl_scheduler.wait_async(url, clients.sessions[CRAWL])
+            
+            # Per-read timeouts: the overall download time is bounded by FETCH_MAX_SECONDS,
+            # which keeps the part read so far instead of failing
+            timeout = aiohttp.ClientTimeout(sock_connect=15, sock_read=15)
+            async with clients.host_semaphore(url):
+                async with clients.sessions[CRAWL].get(url, headers=headers, timeout=timeout, allow_redirects=True) as resp:
+                    crawl_scheduler.report(url, resp.status, resp.headers.get('Retry-After'))
+                    response = await read_streamed_response_async(url, resp)
+            if response is None:
+                return None
+            response = resolve_cached_response(url, response, cached)
+            set_span_attributes(status=response.status_code)
+            
+            if response.status_code == 200:
+                annotate_span(bytes=len(response.content))
+                print(f"✅ Successfully accessed {url} on attempt {attempt + 1}")
+                return response
+            elif response.status_code == 406:
+                print(f"⚠️  Attempt {attempt + 1}: Got 406 error, trying different approach...")
+                continue
+            else:
+                print(f"⚠️  Attempt {attempt + 1}: Got status {response.status_code}, retrying...")
+                continue
+                
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"❌ Attempt {attempt + 1} failed: {e}")
+            continue
+    
+    print(f"❌ All attempts failed for {url}")
+    return None
+
+@dataclass
+class Page:
+    """A fetched web page, parsed once and shared by every consumer"""
+    url: str
+    content: bytes = b""
+    text: str = ""
+    links: list = field(default_factory=list)
+    anchor_texts: dict = field(default_factory=dict)
+
+# Extraction backend for parse_page (--html-backend); see html_extract.py
+html_backend = HTML_EXTRACTION_BACKEND
+
+@timed_stage("parse")
+def parse_page(url, content):
+    """Parse raw HTML into a Page with cleaned text and same-domain links"""
+    annotate_span(bytes=len(content))
+    text, links, anchor_texts = extract_page(url, content, html_backend)
+    return Page(url=url, content=content, text=text, links=links, anchor_texts=anchor_texts)
+
+# Harvest contacts from the pages the recommendation crawl downloads, and skip Perplexity
+# when enough are found; see --no-local-contacts
+local_contacts_enabled = LOCAL_CONTACTS_ENABLED
+
+def new_contact_harvest():
+    """A ContactHarvest for one lead, or None when local contact harvesting is disabled"""
+    return ContactHarvest() if local_contacts_enabled else None
+
+@timed_stage("contact_harvest")
+def harvest_page_contacts(harvest, page):
+    """Add the contacts on a fetched page to the lead's ContactHarvest"""
+    annotate_span(bytes=len(page.content))
+    try:
+        found = harvest.add_page(page.url, page.content)
+    except Exception as e:
+        print(f"Error harvesting contacts from {page.url}: {e}")
+        return
+    if found:
+        print(f"📇 Found {found} contacts on {page.url}")
+
+def fetch_page(url):
+    """Download and parse a page once; returns a Page or None if it could not be fetched"""
     try:
         normalized_url = normalize_url(url)
         
@@ -291,63 +638,192 @@ def find_urls(url):
         response = make_robust_request(normalized_url)
         
         if response is None:
-            return []
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        base_domain = urlparse(normalized_url).netloc
+            return None
         
-        urls = []
-        for link in soup.find_all('a', href=True):
-            href = link['href']
-            full_url = urljoin(normalized_url, href)
-            parsed_url = urlparse(full_url)
-            
-            # Only include URLs from the same domain
-            if parsed_url.netloc == base_domain:
-                urls.append(full_url)
+        page = parse_page(normalized_url, response.content)
+        print(f"Successfully extracted {len(page.text)} characters and {len(page.links)} unique URLs from {normalized_url}")
+        return page
         
-        print(f"Found {len(set(urls))} unique URLs from {normalized_url}")
-        return list(set(urls))  # Remove duplicates
     except Exception as e:
-        print(f"Error finding URLs from {url}: {e}")
-        return []
+        print(f"Error fetching {url}: {e}")
+        return None
 
-def browse_website(url):
-    """Extract text content from a website with anti-bot protection bypass"""
+async def fetch_page_async(clients, url):
+    """Async version of fetch_page"""
     try:
         normalized_url = normalize_url(url)
         
-        # Use the robust request function
-        response = make_robust_request(normalized_url)
+        response = await make_robust_request_async(clients, normalized_url)
         
         if response is None:
-            return ""
+            return None
         
-        # Parse HTML and extract text
-        soup = BeautifulSoup(response.content, 'html.parser')
+        page = parse_page(normalized_url, response.content)
+        print(f"Successfully extracted {len(page.text)} characters and {len(page.links)} unique URLs from {normalized_url}")
+        return page
         
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text()
-        
-        # Clean up text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
+    except Exception as e:
+        print(f"Error fetching {url}: {e}")
+        return None
+
+def find_urls(url):
+    """Find all URLs present as hyperlinks in the website with anti-bot protection"""
+    page = fetch_page(url)
+    return page.links if page else []
+
+def browse_website(url):
+    """Extract text content from a website with anti-bot protection bypass"""
+    page = fetch_page(url)
+    return page.text if page else ""
+
+def build_gemini_payload(prompt):
+    """Request body for a Gemini generateContent call"""
+    return {
+        "contents": [{
+            "parts": [{
+                "text": prompt
+            }]
+        }]
+    }
+
+def extract_gemini_text(result):
+    """Return the first candidate's text from a Gemini response, unwrapped from markdown code fences"""
+    if 'candidates' in result and len(result['candidates']) > 0:
+        content = result['candidates'][0]['content']['parts'][0]['text'].strip()
         
-        print(f"Successfully extracted {len(text)} characters from {normalized_url}")
-        return text
+        # Extract JSON from markdown code blocks if present
+        if content.startswith('```json'):
+            # Find the JSON content between ```json and ```
+            start = content.find('```json') + 7
+            end = content.rfind('```')
+            if end > start:
+                content = content[start:end].strip()
+        elif content.startswith('```'):
+            # Handle case where it's just ``` without json
+            start = content.find('```') + 3
+            end = content.rfind('```')
+            if end > start:
+                content = content[start:end].strip()
         
-    except Exception as e:
-        print(f"Error browsing {url}: {e}")
-        return ""
+        return content
+    return None
 
-def course_recommendation(text_content):
-    """Analyze accumulated text content with Gemini LLM"""
-    prompt = f"""
+# Shared Gemini response cache, created on first use; see --no-llm-cache / --bypass-llm-cache
+llm_cache_enabled = LLM_CACHE_ENABLED
+llm_cache_bypass = False
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """Return the process-wide LLMCache, or None when LLM caching is disabled"""
+    global _llm_cache
+    if not llm_cache_enabled:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache(bypass=llm_cache_bypass)
+    return _llm_cache
+
+def cache_gemini_answer(prompt, content):
+    """Store a Gemini answer; only JSON answers are kept so malformed ones get retried next run"""
+    cache = get_llm_cache()
+    if cache is None or content is None:
+        return
+    try:
+        json.loads(content)
+    except json.JSONDecodeError:
+        return
+    cache.put(GEMINI_MODEL, prompt, content)
+
+def gemini_usage(result, size):
+    """Span counters of a Gemini response: body bytes and prompt/response tokens"""
+    usage = result.get('usageMetadata') or {}
+    return {
+        "bytes": size,
+        "prompt_tokens": usage.get('promptTokenCount') or 0,
+        "response_tokens": usage.get('candidatesTokenCount') or 0
+    }
+
+def post_gemini(prompt, timeout=30):
+    """Send one prompt to Gemini; returns (candidate text or None, usage counters)"""
+    response = get_session(GEMINI).post(GEMINI_API_URL, json=build_gemini_payload(prompt), timeout=timeout)
+    response.raise_for_status()
+    result = response.json()
+    return extract_gemini_text(result), gemini_usage(result, len(response.content))
+
+async def post_gemini_async(clients, prompt, timeout=30):
+    """Async version of post_gemini, bounded by the Gemini concurrency limit"""
+    async with clients.gemini_semaphore:
+        async with clients.sessions[GEMINI].post(GEMINI_API_URL, json=build_gemini_payload(prompt),
+                                        timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            body = await response.read()
+    result = json.loads(body)
+    return extract_gemini_text(result), gemini_usage(result, len(body))
+
+# Micro-batch URL-filter and classification prompts from concurrent leads into shared
+# Gemini requests; see --no-gemini-batching
+gemini_batching = GEMINI_BATCHING_ENABLED
+_gemini_batcher = None
+_gemini_batcher_lock = threading.Lock()
+
+def get_gemini_batcher():
+    """Return the process-wide GeminiBatcher, or None when batching is disabled"""
+    global _gemini_batcher
+    if not gemini_batching:
+        return None
+    with _gemini_batcher_lock:
+        if _gemini_batcher is None:
+            _gemini_batcher = GeminiBatcher(lambda prompt: post_gemini(prompt, GEMINI_BATCH_TIMEOUT))
+    return _gemini_batcher
+
+def call_gemini(prompt, timeout=30, batchable=False):
+    """
+    Send a prompt to Gemini and return the candidate text, or None if there was no candidate.
+
+    Batchable prompts may share one request with prompts from other leads.
+    """
+    cache = get_llm_cache()
+    content = cache.get(GEMINI_MODEL, prompt) if cache else None
+    if content is not None:
+        set_span_attributes(cache_hit=True)
+        return content
+    
+    batcher = get_gemini_batcher() if batchable else None
+    if batcher is not None:
+        content, usage, batch_size = batcher.submit(prompt)
+        set_span_attributes(batch_size=batch_size)
+    else:
+        content, usage = post_gemini(prompt, timeout)
+    annotate_span(**usage)
+    cache_gemini_answer(prompt, content)
+    return content
+
+async def call_gemini_async(clients, prompt, timeout=30, batchable=False):
+    """Async version of call_gemini"""
+    cache = get_llm_cache()
+    content = cache.get(GEMINI_MODEL, prompt) if cache else None
+    if content is not None:
+        set_span_attributes(cache_hit=True)
+        return content
+    
+    batcher = clients.gemini_batcher if batchable else None
+    if batcher is not None:
+        content, usage, batch_size = await batcher.submit(prompt)
+        set_span_attributes(batch_size=batch_size)
+    else:
+        content, usage = await post_gemini_async(clients, prompt, timeout)
+    annotate_span(**usage)
+    cache_gemini_answer(prompt, content)
+    return content
+
+def not_ready_analysis(reason):
+    """Analysis result used when Gemini could not produce a recommendation"""
+    return {"ready": False, "recommended_course": None, "recommendation_reasoning": reason, "recommendation_score": None}
+
+def build_course_recommendation_prompt(text_content):
+    """Prompt asking Gemini whether the accumulated content supports a recommendation"""
+    return f"""
     You are an AI agent analyzing website content to recommend either a "Programming Course" or "Sales Course" to a course-selling company.
     
     Based on the following website content, determine if the website owner would benefit more from a Programming Course or a Sales Course.
@@ -368,58 +844,87 @@ def course_recommendation(text_content):
     
     Return only valid JSON, no additional text.
     """
-    
+
+def interpret_course_recommendation(content):
+    """Parse Gemini's course recommendation answer"""
+    if content is None:
+        print("No candidates in Gemini response")
+        return not_ready_analysis("No response from Gemini")
     try:
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }]
-        }
-        
-        response = requests.post(GEMINI_API_URL, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        # print(f"Gemini API Response: {result}")  # Debug output
-        
-        if 'candidates' in result and len(result['candidates']) > 0:
-            content = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            # print(f"Gemini Content: {content}")  # Debug output
-            
-            # Extract JSON from markdown code blocks if present
-            if content.startswith('```json'):
-                # Find the JSON content between ```json and ```
-                start = content.find('```json') + 7
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            elif content.startswith('```'):
-                # Handle case where it's just ``` without json
-                start = content.find('```') + 3
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            
-            return json.loads(content)
-        else:
-            print("No candidates in Gemini response")
-            return {"ready": False, "recommended_course": None, "recommendation_reasoning": "No response from Gemini", "recommendation_score": None}
+        return json.loads(content)
     except json.JSONDecodeError as e:
         print(f"JSON decode error: {e}")
-        print(f"Raw response: {response.text if 'response' in locals() else 'No response'}")
-        return {"ready": False, "recommended_course": None, "recommendation_reasoning": "Invalid JSON response", "recommendation_score": None}
+        print(f"Raw response: {content}")
+        return not_ready_analysis("Invalid JSON response")
+
+@timed_stage("recommendation_llm")
+def course_recommendation(text_content):
+    """Analyze accumulated text content with Gemini LLM"""
+    try:
+        content = call_gemini(build_course_recommendation_prompt(text_content), batchable=True)
     except Exception as e:
         print(f"Error analyzing with LLM: {e}")
-        return {"ready": False, "recommended_course": None, "recommendation_reasoning": "Error in analysis", "recommendation_score": None}
+        return not_ready_analysis("Error in analysis")
+    return interpret_course_recommendation(content)
 
-def detect_good_urls_for_course_recommendation(urls, base_domain):
-    """Use LLM to filter URLs that are most likely to contain relevant information for course recommendations"""
-    if not urls:
-        return []
+@timed_stage("recommendation_llm")
+async def course_recommendation_async(clients, text_content):
+    """Async version of course_recommendation"""
+    try:
+        content = await call_gemini_async(clients, build_course_recommendation_prompt(text_content), batchable=True)
+    except Exception as e:
+        print(f"Error analyzing with LLM: {e}")
+        return not_ready_analysis("Error in analysis")
+    return interpret_course_recommendation(content)
+
+def build_incremental_recommendation_prompt(evidence_summary, page_url, page_text):
+    """Prompt that updates a running assessment with one new page instead of re-sending every page"""
+    return f"""
+    You are an AI agent reading a website one page at a time to recommend either a "Programming Course" or "Sales Course" to a course-selling company.
     
-    # Create a list of URL paths for analysis
+    Evidence gathered from the pages already read:
+    {evidence_summary or "None yet - this is the first page."}
+    
+    New page ({page_url}):
+    {page_text}
+    
+    Update your assessment using the new page together with the prior evidence, and return a JSON response with the following structure:
+    - ready: boolean (true if you have enough information to make a recommendation, false if you need more data)
+    - recommended_course: string ("Programming Course" or "Sales Course" or null if ready=false)
+    - recommendation_reasoning: string (ONE LINE explanation of your recommendation or "Need more data" if ready=false)
+    - recommendation_score: number (confidence score 0-100, or null if ready=false)
+    - evidence_summary: string (compact notes, at most 120 words, of everything relevant learned so far including the prior evidence; this replaces the prior evidence)
+    
+    Consider these factors:
+    - Technical content, programming languages, software development, engineering, etc. → Programming Course
+    - Business content, marketing, sales, customer acquisition → Sales Course
+    - E-commerce, retail, service business → Sales Course
+    
+    Return only valid JSON, no additional text.
+    """
+
+@timed_stage("recommendation_llm")
+def incremental_course_recommendation(evidence_summary, page_url, page_text):
+    """Update the running recommendation with one new page"""
+    try:
+        content = call_gemini(build_incremental_recommendation_prompt(evidence_summary, page_url, page_text), batchable=True)
+    except Exception as e:
+        print(f"Error analyzing with LLM: {e}")
+        return not_ready_analysis("Error in analysis")
+    return interpret_course_recommendation(content)
+
+@timed_stage("recommendation_llm")
+async def incremental_course_recommendation_async(clients, evidence_summary, page_url, page_text):
+    """Async version of incremental_course_recommendation"""
+    try:
+        content = await call_gemini_async(clients, build_incremental_recommendation_prompt(evidence_summary, page_url, page_text), batchable=True)
+    except Exception as e:
+        print(f"Error analyzing with LLM: {e}")
+        return not_ready_analysis("Error in analysis")
+    return interpret_course_recommendation(content)
+
+def extract_url_paths(urls):
+    """URL paths (without surrounding slashes) of the URLs that have one"""
     url_paths = []
     for url in urls:
         try:
@@ -429,11 +934,11 @@ def detect_good_urls_for_course_recommendation(urls, base_domain):
                 url_paths.append(path)
         except:
             continue
-    
-    if not url_paths:
-        return urls[:3]  # Return first 3 if no paths to analyze
-    
-    prompt = f"""
+    return url_paths
+
+def build_url_filter_prompt(url_paths, base_domain):
+    """Prompt asking Gemini which URL paths are worth reading for a course recommendation"""
+    return f"""
     You are analyzing website URLs to determine which ones are most likely to contain information relevant for recommending either a "Programming Course" or "Sales Course".
     
     Base domain: {base_domain}
@@ -466,64 +971,95 @@ def detect_good_urls_for_course_recommendation(urls, base_domain):
     
     Return only valid JSON, no additional text.
     """
-    
+
+def interpret_url_filter(content, urls):
+    """Map the paths Gemini selected back to full URLs; falls back to the first 5 URLs"""
+    if content is None:
+        return urls[:5]
     try:
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }]
-        }
-        
-        response = requests.post(GEMINI_API_URL, json=payload, timeout=30)
-        response.raise_for_status()
+        analysis = json.loads(content)
+        relevant_paths = analysis.get('relevant_urls', [])
         
-        result = response.json()
+        # Convert paths back to full URLs
+        good_urls = []
+        for url in urls:
+            try:
+                parsed = urlparse(url)
+                path = parsed.path.strip('/')
+                if path in relevant_paths:
+                    good_urls.append(url)
+            except:
+                continue
         
-        if 'candidates' in result and len(result['candidates']) > 0:
-            content = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            
-            # Extract JSON from markdown code blocks if present
-            if content.startswith('```json'):
-                start = content.find('```json') + 7
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            elif content.startswith('```'):
-                start = content.find('```') + 3
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            
-            analysis = json.loads(content)
-            relevant_paths = analysis.get('relevant_urls', [])
-            
-            # Convert paths back to full URLs
-            good_urls = []
-            for url in urls:
-                try:
-                    parsed = urlparse(url)
-                    path = parsed.path.strip('/')
-                    if path in relevant_paths:
-                        good_urls.append(url)
-                except:
-                    continue
-            
-            print(f"LLM selected {len(good_urls)} relevant URLs from {len(urls)} total URLs")
-            return good_urls[:8]  # Limit to 8 URLs max
-            
+        print(f"LLM selected {len(good_urls)} relevant URLs from {len(urls)} total URLs")
+        return good_urls[:8]  # Limit to 8 URLs max
     except Exception as e:
         print(f"Error in URL filtering: {e}")
+        return urls[:5]
+
+# Rank links with the keyword tables and ask Gemini only when that is ambiguous; see --no-url-ranker
+url_ranker_enabled = URL_RANKER_ENABLED
+
+def rank_urls_locally(urls, table, max_urls, anchor_texts=None):
+    """Keyword-ranker pick of up to max_urls links, or None when the LLM should decide"""
+    if not url_ranker_enabled:
+        return None
+    selected, confident = select_urls(urls, table, max_urls, anchor_texts)
+    set_span_attributes(ranker="keywords" if confident else "llm")
+    if not confident:
+        return None
+    print(f"Keyword ranker selected {len(selected)} relevant URLs from {len(urls)} total URLs")
+    return selected
+
+@timed_stage("url_filter")
+def detect_good_urls_for_course_recommendation(urls, base_domain, anchor_texts=None):
+    """Use LLM to filter URLs that are most likely to contain relevant information for course recommendations"""
+    if not urls:
+        return []
+    
+    # Clear-cut cases are settled by the keyword tables without a Gemini round-trip
+    good_urls = rank_urls_locally(urls, GENERAL_CLASSIFICATION_SCORES, URL_RANKER_MAX_URLS, anchor_texts)
+    if good_urls is not None:
+        return good_urls
+    
+    # Create a list of URL paths for analysis
+    url_paths = extract_url_paths(urls)
     
-    # Fallback: return first 5 URLs if LLM fails
-    return urls[:5]
+    if not url_paths:
+        return urls[:3]  # Return first 3 if no paths to analyze
+    
+    try:
+        content = call_gemini(build_url_filter_prompt(url_paths, base_domain), batchable=True)
+    except Exception as e:
+        print(f"Error in URL filtering: {e}")
+        # Fallback: return first 5 URLs if LLM fails
+        return urls[:5]
+    return interpret_url_filter(content, urls)
 
-def detect_good_urls_for_contact_info_extraction(urls, base_domain, recommended_course):
-    """Use LLM to filter URLs that are most likely to contain contact information"""
+@timed_stage("url_filter")
+async def detect_good_urls_for_course_recommendation_async(clients, urls, base_domain, anchor_texts=None):
+    """Async version of detect_good_urls_for_course_recommendation"""
     if not urls:
         return []
     
+    good_urls = rank_urls_locally(urls, GENERAL_CLASSIFICATION_SCORES, URL_RANKER_MAX_URLS, anchor_texts)
+    if good_urls is not None:
+        return good_urls
+    
+    url_paths = extract_url_paths(urls)
+    
+    if not url_paths:
+        return urls[:3]  # Return first 3 if no paths to analyze
+    
+    try:
+        content = await call_gemini_async(clients, build_url_filter_prompt(url_paths, base_domain), batchable=True)
+    except Exception as e:
+        print(f"Error in URL filtering: {e}")
+        return urls[:5]
+    return interpret_url_filter(content, urls)
+
+def build_contact_url_filter_prompt(urls, recommended_course):
+    """Prompt asking Gemini which URLs most likely hold contacts for the recommended course"""
     # Limit to first 20 URLs for analysis
     urls_to_analyze = urls[:20]
     
@@ -532,54 +1068,49 @@ def detect_good_urls_for_contact_info_extraction(urls, base_domain, recommended_
     
     # Choose the appropriate master prompt based on recommended course
     if "Programming" in recommended_course:
-        prompt = PROGRAMMING_MASTER_PROMPT_TEMPLATE.format(url_list_json=url_list_json)
+        return PROGRAMMING_MASTER_PROMPT_TEMPLATE.format(url_list_json=url_list_json)
     else:  # Sales Course or any other type
-        prompt = SALES_MASTER_PROMPT_TEMPLATE.format(url_list_json=url_list_json)
-    
+        return SALES_MASTER_PROMPT_TEMPLATE.format(url_list_json=url_list_json)
+
+def contact_keyword_scores(recommended_course):
+    """Keyword table for ranking contact pages for the recommended course"""
+    return PROGRAMMING_KEYWORD_SCORES if "Programming" in recommended_course else SALES_KEYWORD_SCORES
+
+def interpret_contact_url_filter(content, urls):
+    """Parse Gemini's selected contact URLs; falls back to the first 5 URLs"""
+    if content is None:
+        return urls[:5]
     try:
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }]
-        }
+        analysis = json.loads(content)
+        selected_urls = analysis.get('selected_urls', [])
         
-        response = requests.post(GEMINI_API_URL, json=payload, timeout=30)
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        if 'candidates' in result and len(result['candidates']) > 0:
-            content = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            
-            # Extract JSON from markdown code blocks if present
-            if content.startswith('```json'):
-                start = content.find('```json') + 7
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            elif content.startswith('```'):
-                start = content.find('```') + 3
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            
-            analysis = json.loads(content)
-            selected_urls = analysis.get('selected_urls', [])
-            
-            print(f"LLM selected {len(selected_urls)} contact-relevant URLs from {len(urls)} total URLs")
-            return selected_urls[:8]  # Limit to 8 URLs max
-            
+        print(f"LLM selected {len(selected_urls)} contact-relevant URLs from {len(urls)} total URLs")
+        return selected_urls[:8]  # Limit to 8 URLs max
     except Exception as e:
         print(f"Error in contact URL filtering: {e}")
+        return urls[:5]
+
+@timed_stage("url_filter")
+def detect_good_urls_for_contact_info_extraction(urls, base_domain, recommended_course):
+    """Use LLM to filter URLs that are most likely to contain contact information"""
+    if not urls:
+        return []
     
-    # Fallback: return first 5 URLs if LLM fails
-    return urls[:5]
+    good_urls = rank_urls_locally(urls, contact_keyword_scores(recommended_course), URL_RANKER_MAX_CONTACT_URLS)
+    if good_urls is not None:
+        return good_urls
+    
+    try:
+        content = call_gemini(build_contact_url_filter_prompt(urls, recommended_course), batchable=True)
+    except Exception as e:
+        print(f"Error in contact URL filtering: {e}")
+        # Fallback: return first 5 URLs if LLM fails
+        return urls[:5]
+    return interpret_contact_url_filter(content, urls)
 
-def force_recommendation(text_content):
-    """Force a recommendation even with limited data"""
-    prompt = f"""
+def build_force_recommendation_prompt(text_content):
+    """Prompt that makes Gemini commit to a recommendation even with limited data"""
+    return f"""
     You are an AI agent that MUST make a recommendation between "Programming Course" or "Sales Course" based on the limited website content provided.
     
     Website Content:
@@ -600,145 +1131,347 @@ def force_recommendation(text_content):
     
     Return only valid JSON, no additional text.
     """
-    
-    try:
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }]
+
+def forced_recommendation_fallback():
+    """Low-confidence recommendation used when the forced Gemini call errors out"""
+    return {
+        "ready": True,
+        "recommended_course": "Programming Course",
+        "recommendation_reasoning": "Default recommendation due to limited data and technical error",
+        "recommendation_score": 20
+    }
+
+def interpret_force_recommendation(content):
+    """Parse Gemini's forced recommendation, with a low-confidence default if it fails"""
+    if content is None:
+        # Fallback recommendation if API fails
+        return {
+            "ready": True,
+            "recommended_course": "Programming Course",
+            "recommendation_reasoning": "Default recommendation due to limited data and API error",
+            "recommendation_score": 25
         }
+    try:
+        return json.loads(content)
+    except Exception as e:
+        print(f"Error in forced recommendation: {e}")
+        return forced_recommendation_fallback()
+
+@timed_stage("recommendation_llm")
+def force_recommendation(text_content):
+    """Force a recommendation even with limited data"""
+    try:
+        content = call_gemini(build_force_recommendation_prompt(text_content), batchable=True)
+    except Exception as e:
+        print(f"Error in forced recommendation: {e}")
+        # Fallback recommendation
+        return forced_recommendation_fallback()
+    return interpret_force_recommendation(content)
+
+@timed_stage("recommendation_llm")
+async def force_recommendation_async(clients, text_content):
+    """Async version of force_recommendation"""
+    try:
+        content = await call_gemini_async(clients, build_force_recommendation_prompt(text_content), batchable=True)
+    except Exception as e:
+        print(f"Error in forced recommendation: {e}")
+        return forced_recommendation_fallback()
+    return interpret_force_recommendation(content)
+
+class RecommendationCrawl:
+    """
+    Frontier, visited set and accumulated evidence for one lead's recommendation crawl.
+
+    The sync and async drivers share this bookkeeping and differ only in how they do I/O.
+    In incremental mode each page is evaluated on its own against a running evidence
+    summary, and the crawl stops once a recommendation reaches the confidence threshold.
+    With dedup, text repeated from the lead's earlier pages is dropped before it is
+    prompted (page_text) or accumulated; the accumulated text is capped at
+    RECOMMENDATION_MAX_CONTEXT_CHARS.
+    """
+    MAX_STEPS = 15
+
+    def __init__(self, url, incremental=True, dedup=True):
+        # Normalize the input URL
+        self.base_url = normalize_url(url)
+        self.visited_urls = {self.base_url}
+        self.accumulated_text = ""
+        self.page_text = ""
+        self.dedup = PageTextDedup() if dedup else None
+        self.incremental = incremental
+        self.evidence_summary = ""
+        self.best_analysis = None
+        
+        # Full-context mode keeps its original stopping rule: any ready answer
+        self.confidence_threshold = RECOMMENDATION_CONFIDENCE_THRESHOLD if incremental else 0
+        
+        # Start with the base URL
+        self.urls_to_visit = [self.base_url]
+
+    def iter_steps(self):
+        """Yield (step, url) for each page to analyze, up to MAX_STEPS"""
+        for step in range(1, self.MAX_STEPS + 1):
+            print(f"\n--- Step {step} ---")
+            
+            if not self.urls_to_visit:
+                print("No more URLs to visit")
+                return
+            
+            # Get next URL to visit; queue_urls never queues a URL twice
+            current_url = self.urls_to_visit.pop(0)
+            
+            print(f"Analyzing: {current_url}")
+            yield step, current_url
+
+    def add_page(self, current_url, page):
+        """Record a fetched page (or None on failure) and return the links found on it"""
+        self.page_text = self.new_text(current_url, page.text) if page and page.text else ""
+        if self.page_text:
+            self.accumulate(current_url, self.page_text)
+        
+        # Find new URLs (only from the first URL to avoid going too deep). Visited and queued
+        # ones are left out before ranking, so they cannot take the ranker's top slots
+        links = page.links if page else []
+        all_new_urls = [link for link in links if crawlable_url(link) and link not in self.visited_urls]
+        print(f"Found {len(all_new_urls)} new URLs from {current_url}")
+        return all_new_urls
+
+    def new_text(self, current_url, text):
+        """The page's text minus what earlier pages already had, capped for one prompt"""
+        if self.dedup is not None:
+            text = self.dedup.filter(text)
+            print(f"🧹 Kept {len(text)} new characters from {current_url} "
+                  f"({self.dedup.dropped_fraction:.0%} of this lead's page text was repeated)")
+        return text[:RECOMMENDATION_MAX_CONTEXT_CHARS]
+
+    def accumulate(self, current_url, text):
+        """Append page text to the full context, up to RECOMMENDATION_MAX_CONTEXT_CHARS"""
+        room = RECOMMENDATION_MAX_CONTEXT_CHARS - len(self.accumulated_text)
+        if room <= 0:
+            print(f"Context limit reached; {current_url} is not added to the accumulated text")
+            return
+        self.accumulated_text += f"\n\n--- Content from {current_url} ---\n{text}"[:room]
+
+    def seed_urls(self, candidates):
+        """Queue the best sitemap candidates right after the homepage"""
+        good_urls = [url for score, url in candidates if score >= URL_RANKER_MIN_SCORE][:URL_RANKER_MAX_URLS]
+        if good_urls:
+            print(f"Queued {len(good_urls)} URLs from the sitemap before fetching any page")
+        self.queue_urls(good_urls)
+
+    def queue_urls(self, good_urls):
+        """Add filtered URLs to visit"""
+        for new_url in good_urls:
+            if new_url not in self.visited_urls:
+                self.urls_to_visit.append(new_url)
+                self.visited_urls.add(new_url)
+
+    def record_analysis(self, analysis):
+        """Keep the evidence and best ready answer; returns True once the crawl can stop"""
+        print(f"LLM Analysis: {analysis}")
         
-        response = requests.post(GEMINI_API_URL, json=payload, timeout=30)
-        response.raise_for_status()
+        if analysis.get("evidence_summary"):
+            self.evidence_summary = analysis["evidence_summary"]
         
-        result = response.json()
+        if not analysis.get("ready", False):
+            return False
         
-        if 'candidates' in result and len(result['candidates']) > 0:
-            content = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            
-            # Extract JSON from markdown code blocks if present
-            if content.startswith('```json'):
-                start = content.find('```json') + 7
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            elif content.startswith('```'):
-                start = content.find('```') + 3
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            
-            return json.loads(content)
-        else:
-            # Fallback recommendation if API fails
-            return {
-                "ready": True,
-                "recommended_course": "Programming Course",
-                "recommendation_reasoning": "Default recommendation due to limited data and API error",
-                "recommendation_score": 25
-            }
-    except Exception as e:
-        print(f"Error in forced recommendation: {e}")
-        # Fallback recommendation
+        score = analysis.get("recommendation_score") or 0
+        if self.best_analysis is None or score >= (self.best_analysis.get("recommendation_score") or 0):
+            self.best_analysis = analysis
+        return score >= self.confidence_threshold
+
+    def recommendation_context(self):
+        """Text handed to force_recommendation: the compact evidence when there is some"""
+        if self.incremental and self.evidence_summary:
+            return self.evidence_summary
+        return self.accumulated_text
+
+# Seed the recommendation crawl with ranked URLs from the lead's sitemaps; see --no-sitemaps
+sitemap_discovery_enabled = SITEMAP_DISCOVERY_ENABLED
+
+def start_sitemap_discovery(base_url):
+    """SitemapDiscovery for a lead whose robots.txt has been checked"""
+    return SitemapDiscovery(base_url, crawl_scheduler.sitemaps(base_url), GENERAL_CLASSIFICATION_SCORES,
+                            crawl_scheduler.allowed)
+
+def sitemap_candidates(discovery):
+    """Report a finished discovery and return its ranked candidates"""
+    candidates = discovery.candidates()
+    annotate_span(bytes=discovery.bytes)
+    set_span_attributes(sitemap_files=discovery.files, sitemap_entries=discovery.entries)
+    print(f"🗺️ Sitemaps: {discovery.entries} entries in {discovery.files} files, {len(candidates)} candidate URLs")
+    return candidates
+
+@timed_stage("discovery")
+def discover_sitemap_urls(base_url):
+    """Ranked (score, url) candidates from the lead's robots.txt sitemaps, read as a stream"""
+    crawl_scheduler.check_robots(base_url)
+    discovery = start_sitemap_discovery(base_url)
+    session = get_session(CRAWL)
+    
+    while (sitemap_url := discovery.next_sitemap()) is not None:
+        try:
+            crawl_scheduler.wait(sitemap_url)
+            with session.get(sitemap_url, headers=get_attempt_headers(0), timeout=SITEMAP_TIMEOUT, stream=True) as response:
+                crawl_scheduler.report(sitemap_url, response.status_code, response.headers.get('Retry-After'))
+                if response.status_code != 200:
+                    continue
+                parser = SitemapParser()
+                for chunk in response.iter_content(SITEMAP_CHUNK_SIZE):
+                    if not discovery.read(parser, chunk):
+                        break
+        except Exception as e:
+            print(f"⚠️  Could not read sitemap {sitemap_url}: {e}")
+    
+    return sitemap_candidates(discovery)
+
+@timed_stage("discovery")
+async def discover_sitemap_urls_async(clients, base_url):
+    """Async version of discover_sitemap_urls"""
+    session = clients.sessions[CRAWL]
+    await crawl_scheduler.check_robots_async(base_url, session)
+    discovery = start_sitemap_discovery(base_url)
+    
+    while (sitemap_url := discovery.next_sitemap()) is not None:
+        try:
+            await crawl_scheduler.wait_async(sitemap_url, session)
+            async with clients.host_semaphore(sitemap_url):
+                async with session.get(sitemap_url, headers=get_attempt_headers(0),
+                                       timeout=aiohttp.ClientTimeout(total=SITEMAP_TIMEOUT)) as resp:
+                    crawl_scheduler.report(sitemap_url, resp.status, resp.headers.get('Retry-After'))
+                    if resp.status != 200:
+                        continue
+                    parser = SitemapParser()
+                    async for chunk in resp.content.iter_chunked(SITEMAP_CHUNK_SIZE):
+                        if not discovery.read(parser, chunk):
+                            break
+        except Exception as e:
+            print(f"⚠️  Could not read sitemap {sitemap_url}: {e}")
+    
+    return sitemap_candidates(discovery)
+
+def recommendation_result(analysis, forced=False):
+    """Reduce a Gemini analysis to the course_recommendation block saved for each lead"""
+    if forced:
         return {
-            "ready": True,
-            "recommended_course": "Programming Course",
-            "recommendation_reasoning": "Default recommendation due to limited data and technical error",
-            "recommendation_score": 20
+            "recommended_course": analysis.get("recommended_course", "Unable to determine"),
+            "recommendation_reasoning": analysis.get("recommendation_reasoning", "Limited data available"),
+            "recommendation_score": analysis.get("recommendation_score", 30)
         }
+    return {
+        "recommended_course": analysis.get("recommended_course", "Unable to determine"),
+        "recommendation_reasoning": analysis.get("recommendation_reasoning", "Insufficient data"),
+        "recommendation_score": analysis.get("recommendation_score", 0)
+    }
+
+# Evaluate pages one at a time against a running evidence summary; --full-context restores
+# re-sending all accumulated text on every step
+incremental_recommendation = INCREMENTAL_RECOMMENDATION
+
+# Drop text repeated from a lead's earlier pages before it reaches Gemini; see --no-text-dedup
+text_dedup_enabled = TEXT_DEDUP_ENABLED
+
+def get_course_recommendation(url, harvest=None):
+    """
+    Main function that runs the analysis loop and returns course recommendation.
 
-def get_course_recommendation(url):
-    """Main function that runs the analysis loop and returns course recommendation"""
+    With a ContactHarvest, the contacts on every fetched page are collected into it.
+    """
     print(f"Starting analysis of: {url}")
     
-    # Normalize the input URL
-    base_url = normalize_url(url)
-    visited_urls = {base_url}
-    accumulated_text = ""
-    
-    # Start with the base URL
-    urls_to_visit = [base_url]
+    crawl = RecommendationCrawl(url, incremental=incremental_recommendation, dedup=text_dedup_enabled)
+    if sitemap_discovery_enabled:
+        crawl.seed_urls(discover_sitemap_urls(crawl.base_url))
     
-    for step in range(1, 16):  # Max 15 steps
-        print(f"\n--- Step {step} ---")
-        
-        if not urls_to_visit:
-            print("No more URLs to visit")
-            break
-        
-        # Get next URL to visit
-        current_url = urls_to_visit.pop(0)
-        
-        if current_url in visited_urls and step > 1:
-            continue
-            
-        print(f"Analyzing: {current_url}")
-        
-        # Extract text content
-        text_content = browse_website(current_url)
-        if text_content:
-            accumulated_text += f"\n\n--- Content from {current_url} ---\n{text_content}"
-        
-        # Find new URLs (only from the first URL to avoid going too deep)
-        all_new_urls = find_urls(current_url)
-        print(f"Found {len(all_new_urls)} total URLs from {current_url}")
+    for step, current_url in crawl.iter_steps():
+        # Fetch and parse the page once; text and links both come from it
+        page = fetch_page(current_url)
+        if harvest is not None and page:
+            harvest_page_contacts(harvest, page)
+        all_new_urls = crawl.add_page(current_url, page)
         
         # Use LLM to filter URLs that are most relevant for course recommendations
         base_domain = urlparse(current_url).netloc
-        good_urls = detect_good_urls_for_course_recommendation(all_new_urls, base_domain)
-        
-        # Add filtered URLs to visit
-        for new_url in good_urls:
-            if new_url not in visited_urls:
-                urls_to_visit.append(new_url)
-                visited_urls.add(new_url)
+        anchor_texts = page.anchor_texts if page else None
+        crawl.queue_urls(detect_good_urls_for_course_recommendation(all_new_urls, base_domain, anchor_texts))
         
         # Analyze with LLM
-        analysis = course_recommendation(accumulated_text)
-        
-        print(f"LLM Analysis: {analysis}")
+        if crawl.incremental:
+            if not crawl.page_text:
+                continue  # Nothing new to evaluate
+            analysis = incremental_course_recommendation(crawl.evidence_summary, current_url, crawl.page_text)
+        else:
+            analysis = course_recommendation(crawl.accumulated_text)
         
-        if analysis.get("ready", False):
+        if crawl.record_analysis(analysis):
             print("LLM has enough data to make a recommendation!")
             break
     
-    # Final analysis if not ready yet
-    if not analysis.get("ready", False):
+    analysis = crawl.best_analysis
+    
+    # Final analysis if not ready yet (incremental mode has already seen every page's evidence)
+    if analysis is None and not crawl.incremental:
         print("Running final analysis with all collected data...")
-        analysis = course_recommendation(accumulated_text)
+        analysis = course_recommendation(crawl.accumulated_text)
+        if not analysis.get("ready", False):
+            analysis = None
     
     # If still not ready after final analysis, force a recommendation with low confidence
-    if not analysis.get("ready", False):
+    if analysis is None:
         print("Forcing recommendation based on limited data available...")
-        forced_analysis = force_recommendation(accumulated_text)
-        result = {
-            "recommended_course": forced_analysis.get("recommended_course", "Unable to determine"),
-            "recommendation_reasoning": forced_analysis.get("recommendation_reasoning", "Limited data available"),
-            "recommendation_score": forced_analysis.get("recommendation_score", 30)
-        }
-    else:
-        result = {
-            "recommended_course": analysis.get("recommended_course", "Unable to determine"),
-            "recommendation_reasoning": analysis.get("recommendation_reasoning", "Insufficient data"),
-            "recommendation_score": analysis.get("recommendation_score", 0)
-        }
+        return recommendation_result(force_recommendation(crawl.recommendation_context()), forced=True)
 
-    return result
+    return recommendation_result(analysis)
 
-def get_contact_info(url, recommended_course):
-    """
-    Extract contact information from a website using Perplexity API
-    """
-    print(f"Starting contact extraction for: {url}")
+async def get_course_recommendation_async(clients, url, harvest=None):
+    """Async version of get_course_recommendation"""
+    print(f"Starting analysis of: {url}")
     
-    # Normalize the input URL
-    base_url = normalize_url(url)
+    crawl = RecommendationCrawl(url, incremental=incremental_recommendation, dedup=text_dedup_enabled)
+    if sitemap_discovery_enabled:
+        crawl.seed_urls(await discover_sitemap_urls_async(clients, crawl.base_url))
+    
+    for step, current_url in crawl.iter_steps():
+        page = await fetch_page_async(clients, current_url)
+        if harvest is not None and page:
+            harvest_page_contacts(harvest, page)
+        all_new_urls = crawl.add_page(current_url, page)
+        
+        base_domain = urlparse(current_url).netloc
+        anchor_texts = page.anchor_texts if page else None
+        crawl.queue_urls(await detect_good_urls_for_course_recommendation_async(clients, all_new_urls, base_domain, anchor_texts))
+        
+        if crawl.incremental:
+            if not crawl.page_text:
+                continue
+            analysis = await incremental_course_recommendation_async(clients, crawl.evidence_summary, current_url, crawl.page_text)
+        else:
+            analysis = await course_recommendation_async(clients, crawl.accumulated_text)
+        
+        if crawl.record_analysis(analysis):
+            print("LLM has enough data to make a recommendation!")
+            break
+    
+    analysis = crawl.best_analysis
     
+    if analysis is None and not crawl.incremental:
+        print("Running final analysis with all collected data...")
+        analysis = await course_recommendation_async(clients, crawl.accumulated_text)
+        if not analysis.get("ready", False):
+            analysis = None
+    
+    if analysis is None:
+        print("Forcing recommendation based on limited data available...")
+        return recommendation_result(await force_recommendation_async(clients, crawl.recommendation_context()), forced=True)
+
+    return recommendation_result(analysis)
+
+def build_contact_query(base_url, recommended_course):
+    """Course-specific Perplexity research query for a lead's website"""
     # Create course-specific query for Perplexity
     if "Programming" in recommended_course:
-        query = f"""Act as a lead generation specialist. Your task is to thoroughly analyze the website provided below and extract contact information for key individuals who are potential buyers or key influencers for a programming course.
+        return f"""Act as a lead generation specialist. Your task is to thoroughly analyze the website provided below and extract contact information for key individuals who are potential buyers or key influencers for a programming course.
 
 Website to Analyze:
 {base_url}
@@ -793,7 +1526,7 @@ Phone: +1-123-456-7890
 Name: John Smith
 Job Title: Training & Placement Officer"""
     else:  # Sales Course
-        query = f"""Act as a lead generation specialist. Your task is to thoroughly analyze the website provided below and extract contact information for key individuals who are potential buyers or key influencers for a sales training course.
+        return f"""Act as a lead generation specialist. Your task is to thoroughly analyze the website provided below and extract contact information for key individuals who are potential buyers or key influencers for a sales training course.
 
 Website to Analyze:
 {base_url}
@@ -849,6 +1582,65 @@ Email: j.smith@example.edu
 Phone: +1-123-456-7890
 Name: John Smith
 Job Title: Head of Career Services"""
+
+def report_contacts(contacts, result):
+    """Print extracted contacts and the sources Perplexity consulted"""
+    # Print extracted contacts for debugging
+    if contacts:
+        print(f"\n📞 EXTRACTED CONTACTS:")
+        print("-" * 60)
+        for i, contact in enumerate(contacts, 1):
+            print(f"{i}. {contact.get('name', 'Unknown Name')}")
+            if contact.get('title'):
+                print(f"   Title: {contact['title']}")
+            if contact.get('email'):
+                print(f"   Email: {contact['email']}")
+            if contact.get('phone'):
+                print(f"   Phone: {contact['phone']}")
+            print()
+    else:
+        print("No contacts extracted from Perplexity response")
+    
+    # Print citations for transparency
+    if result.get('citations'):
+        print(f"\nSources consulted ({len(result['citations'])} total):")
+        print("-" * 60)
+        for i, cite in enumerate(result['citations'][:15], 1):  # Show first 15 sources
+            title = cite.get('title', 'No title')
+            url = cite.get('url', 'No URL')
+            print(f"{i}. {title}")
+            print(f"   {url}")
+        if len(result['citations']) > 5:
+            print(f"   ... and {len(result['citations']) - 5} more sources")
+
+def local_contact_info(harvest):
+    """Contacts harvested from the crawled pages when there are enough of them, else None"""
+    if harvest is None or not harvest.enough():
+        return None
+    contacts = harvest.contacts()
+    print(f"📇 {len(contacts)} contacts found on {harvest.pages} crawled pages; skipping Perplexity")
+    report_contacts(contacts, {})
+    return {"contacts": contacts, "source": CRAWLED_PAGES}
+
+def merge_local_contacts(contacts, harvest):
+    """Perplexity's contacts plus those harvested from the crawled pages, merged"""
+    if harvest is None:
+        return contacts
+    return dedupe_contacts(contacts + harvest.contacts())
+
+def get_contact_info(url, recommended_course, harvest=None):
+    """
+    Extract contact information from a website using Perplexity API.
+
+    Contacts harvested from the crawled pages are added to Perplexity's (research_contacts
+    skips this call when they are enough on their own).
+    """
+    print(f"Starting contact extraction for: {url}")
+    
+    # Normalize the input URL
+    base_url = normalize_url(url)
+    
+    query = build_contact_query(base_url, recommended_course)
     
     print(f"Querying Perplexity for contact information...")
     print(f"Course type: {recommended_course}")
@@ -860,51 +1652,113 @@ Job Title: Head of Career Services"""
         
         # Extract contacts from the answer using LLM
         contacts = extract_contacts_from_perplexity_result(result, recommended_course)
+        contacts = merge_local_contacts(contacts, harvest)
         
         print(f"Contact extraction completed. Found {len(contacts)} contacts")
+        report_contacts(contacts, result)
         
-        # Print extracted contacts for debugging
-        if contacts:
-            print(f"\n📞 EXTRACTED CONTACTS:")
-            print("-" * 60)
-            for i, contact in enumerate(contacts, 1):
-                print(f"{i}. {contact.get('name', 'Unknown Name')}")
-                if contact.get('title'):
-                    print(f"   Title: {contact['title']}")
-                if contact.get('email'):
-                    print(f"   Email: {contact['email']}")
-                if contact.get('phone'):
-                    print(f"   Phone: {contact['phone']}")
-                print()
-        else:
-            print("No contacts extracted from Perplexity response")
+        return {"contacts": contacts}
+        
+    except Exception as e:
+        print(f"Error in contact extraction: {e}")
+        return {"contacts": merge_local_contacts([], harvest)}
+
+async def get_contact_info_async(clients, url, recommended_course, harvest=None):
+    """Async version of get_contact_info"""
+    print(f"Starting contact extraction for: {url}")
+    
+    base_url = normalize_url(url)
+    query = build_contact_query(base_url, recommended_course)
+    
+    print(f"Querying Perplexity for contact information...")
+    print(f"Course type: {recommended_course}")
+    print(f"Target website: {base_url}")
+    
+    try:
+        result = await perplexity_deep_research_async(clients, query, max_searches=15)
+        contacts = await extract_contacts_from_perplexity_result_async(clients, result, recommended_course)
+        contacts = merge_local_contacts(contacts, harvest)
         
-        # Print citations for transparency
-        if result.get('citations'):
-            print(f"\nSources consulted ({len(result['citations'])} total):")
-            print("-" * 60)
-            for i, cite in enumerate(result['citations'][:15], 1):  # Show first 15 sources
-                title = cite.get('title', 'No title')
-                url = cite.get('url', 'No URL')
-                print(f"{i}. {title}")
-                print(f"   {url}")
-            if len(result['citations']) > 5:
-                print(f"   ... and {len(result['citations']) - 5} more sources")
+        print(f"Contact extraction completed. Found {len(contacts)} contacts")
+        report_contacts(contacts, result)
         
         return {"contacts": contacts}
         
     except Exception as e:
         print(f"Error in contact extraction: {e}")
-        return {"contacts": []}
+        return {"contacts": merge_local_contacts([], harvest)}
+
+# Contacts researched for one subdomain are reused by its siblings under the same parent
+# domain (home.iitd.ac.in, dms.iitd.ac.in) recommended the same course; see --no-shared-contacts
+share_parent_contacts = SHARE_PARENT_DOMAIN_CONTACTS
+_contact_directory = None
+
+def open_contact_directory():
+    """Start the batch's contact directory, seeded with the contacts of earlier results"""
+    global _contact_directory
+    _contact_directory = ContactDirectory() if share_parent_contacts else None
+    if _contact_directory:
+        known = _contact_directory.seed(read_saved_results())
+        print(f"Contact directory: {known} parent domain / course pairs with researched contacts")
+
+def shared_contact_info(source, contacts):
+    """contact_info of a lead reusing the contacts researched for a sibling subdomain (source)"""
+    print(f"♻️ Reusing {len(contacts)} contacts researched for {source} (same parent domain)")
+    return {"contacts": contacts, "shared_from": source}
+
+def research_contacts(domain, url, recommended_course, harvest=None):
+    """
+    get_contact_info for a lead, unless a lead under the same parent domain already has
+    contacts for the same course; while such a sibling is being researched, wait for its
+    outcome instead. Enough contacts on the lead's own crawled pages take precedence over
+    both, and are not shared with siblings.
+    """
+    directory = _contact_directory
+    contact_info = local_contact_info(harvest)
+    if contact_info is not None:
+        return contact_info
+    if directory is None or domain is None:
+        return get_contact_info(url, recommended_course, harvest)
+    while True:
+        outcome, value = directory.claim(domain, recommended_course, threading.Event)
+        if outcome == "shared":
+            return shared_contact_info(*value)
+        if outcome == "research":
+            break
+        value.wait()
+    contact_info = {"contacts": []}
+    try:
+        contact_info = get_contact_info(url, recommended_course, harvest)
+    finally:
+        directory.record(domain, recommended_course, contact_info["contacts"])
+    return contact_info
+
+async def research_contacts_async(clients, domain, url, recommended_course, harvest=None):
+    """Async version of research_contacts"""
+    directory = _contact_directory
+    contact_info = local_contact_info(harvest)
+    if contact_info is not None:
+        return contact_info
+    if directory is None or domain is None:
+        return await get_contact_info_async(clients, url, recommended_course, harvest)
+    while True:
+        outcome, value = directory.claim(domain, recommended_course, asyncio.Event)
+        if outcome == "shared":
+            return shared_contact_info(*value)
+        if outcome == "research":
+            break
+        await value.wait()
+    contact_info = {"contacts": []}
+    try:
+        contact_info = await get_contact_info_async(clients, url, recommended_course, harvest)
+    finally:
+        directory.record(domain, recommended_course, contact_info["contacts"])
+    return contact_info
 
-def extract_contacts_from_perplexity_result(perplexity_result, recommended_course):
-    """Extract all contacts from Perplexity API result using LLM"""
-    answer = perplexity_result.get('answer', '')
-    if not answer:
-        return []
-    
+def build_contact_extraction_prompt(answer):
+    """Prompt asking Gemini to turn a Perplexity answer into structured contacts"""
     # Create a prompt to extract ALL contact information from the Perplexity answer
-    prompt = f"""
+    return f"""
     Extract ALL contact information from the following text.. 
     Include any person mentioned with their name, title, email address, or phone number.
 
@@ -926,73 +1780,333 @@ def extract_contacts_from_perplexity_result(perplexity_result, recommended_cours
     Only include contacts that have at least an email address or phone number.
     If no contacts are found, return: {{"contacts": []}}
     """
-    
+
+def interpret_contact_extraction(content):
+    """Parse the contacts list out of Gemini's extraction answer"""
+    if content is None:
+        return []
     try:
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }]
-        }
-        
-        response = requests.post(GEMINI_API_URL, json=payload, timeout=30)
-        response.raise_for_status()
+        analysis = json.loads(content)
+        # Canonical emails/phones, without placeholder rows and duplicates
+        contacts = dedupe_contacts(analysis.get('contacts', []))
         
-        result = response.json()
+        # Print found contacts
+        for contact in contacts:
+            print(f"Added contact: {contact.get('name', 'Unknown')} - {contact.get('title', 'No title')}")
         
-        if 'candidates' in result and len(result['candidates']) > 0:
-            content = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            
-            # Extract JSON from markdown code blocks if present
-            if content.startswith('```json'):
-                start = content.find('```json') + 7
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            elif content.startswith('```'):
-                start = content.find('```') + 3
-                end = content.rfind('```')
-                if end > start:
-                    content = content[start:end].strip()
-            
-            analysis = json.loads(content)
-            contacts = analysis.get('contacts', [])
-            
-            # Print found contacts
-            for contact in contacts:
-                print(f"Added contact: {contact.get('name', 'Unknown')} - {contact.get('title', 'No title')}")
-            
-            return contacts
-            
+        return contacts
+    except Exception as e:
+        print(f"Error extracting contacts from Perplexity result: {e}")
+        return []
+
+@timed_stage("contact_extraction")
+def extract_contacts_from_perplexity_result(perplexity_result, recommended_course):
+    """Extract all contacts from Perplexity API result using LLM"""
+    answer = perplexity_result.get('answer', '')
+    if not answer:
+        return []
+    
+    try:
+        content = call_gemini(build_contact_extraction_prompt(answer))
     except Exception as e:
         print(f"Error extracting contacts from Perplexity result: {e}")
+        return []
+    return interpret_contact_extraction(content)
+
+@timed_stage("contact_extraction")
+async def extract_contacts_from_perplexity_result_async(clients, perplexity_result, recommended_course):
+    """Async version of extract_contacts_from_perplexity_result"""
+    answer = perplexity_result.get('answer', '')
+    if not answer:
+        return []
     
-    return []
+    try:
+        content = await call_gemini_async(clients, build_contact_extraction_prompt(answer))
+    except Exception as e:
+        print(f"Error extracting contacts from Perplexity result: {e}")
+        return []
+    return interpret_contact_extraction(content)
+
 
+def resume_course_recommendation(url, checkpoint=None, harvest=None):
+    """
+    Course recommendation for url.
+
+    With a checkpoint (see run_manifest.LeadCheckpoint), a recommendation saved by an
+    interrupted run is reused and a new one is saved before contact research starts.
+    """
+    course_recommendation = checkpoint.saved_recommendation() if checkpoint else None
+    if course_recommendation is None:
+        course_recommendation = get_course_recommendation(url, harvest)
+        if checkpoint:
+            checkpoint.save_recommendation(course_recommendation)
+    else:
+        print(f"Reusing saved course recommendation for {url}")
+    return course_recommendation
+
+async def resume_course_recommendation_async(clients, url, checkpoint=None, harvest=None):
+    """Async version of resume_course_recommendation"""
+    course_recommendation = checkpoint.saved_recommendation() if checkpoint else None
+    if course_recommendation is None:
+        course_recommendation = await get_course_recommendation_async(clients, url, harvest)
+        if checkpoint:
+            checkpoint.save_recommendation(course_recommendation)
+    else:
+        print(f"Reusing saved course recommendation for {url}")
+    return course_recommendation
 
-def run_agent(url):
+def run_agent(url, checkpoint=None, domain=None):
     """Main agent function that gets course recommendation and contact info, then returns both"""
-    course_recommendation = get_course_recommendation(url)
-    contact_info = get_contact_info(url, course_recommendation.get("recommended_course", "Unknown"))
+    harvest = new_contact_harvest()
+    course_recommendation = resume_course_recommendation(url, checkpoint, harvest)
+    contact_info = research_contacts(domain, url, course_recommendation.get("recommended_course", "Unknown"), harvest)
+    
+    return {
+        "course_recommendation": course_recommendation,
+        "contact_info": contact_info
+    }
+
+async def run_agent_async(clients, url, checkpoint=None, domain=None):
+    """Async version of run_agent; all I/O goes through the shared AsyncClients"""
+    harvest = new_contact_harvest()
+    course_recommendation = await resume_course_recommendation_async(clients, url, checkpoint, harvest)
+    contact_info = await research_contacts_async(clients, domain, url,
+                                                 course_recommendation.get("recommended_course", "Unknown"), harvest)
     
     return {
         "course_recommendation": course_recommendation,
         "contact_info": contact_info
     }
 
-def process_all_websites(csv_file_path, max_websites=None):
-    """Process all websites from CSV file and save results to individual JSON files"""
+def compute_prompt_version():
+    """Short fingerprint of every prompt the agent sends, recorded in the run manifest"""
+    prompts = [
+        build_course_recommendation_prompt(""),
+        build_incremental_recommendation_prompt("", "", ""),
+        build_url_filter_prompt([], ""),
+        build_contact_url_filter_prompt([], "Programming Course"),
+        build_contact_url_filter_prompt([], "Sales Course"),
+        build_force_recommendation_prompt(""),
+        build_contact_extraction_prompt(""),
+        build_contact_query("", "Programming Course"),
+        build_contact_query("", "Sales Course"),
+        build_batch_prompt(["", ""])
+    ]
+    return hashlib.sha256("\n".join(prompts).encode("utf-8")).hexdigest()[:12]
+
+def compute_config_version():
+    """Short fingerprint of the settings that change what the agent produces"""
+    config = {
+        "gemini_model": GEMINI_MODEL,
+        "perplexity_model": build_perplexity_payload("")["model"],
+        "incremental_recommendation": incremental_recommendation,
+        "confidence_threshold": RECOMMENDATION_CONFIDENCE_THRESHOLD,
+        "max_steps": RecommendationCrawl.MAX_STEPS,
+        "url_ranker": [URL_RANKER_MIN_SCORE, URL_RANKER_MAX_URLS] if url_ranker_enabled else None,
+        "gemini_batch_max_items": GEMINI_BATCH_MAX_ITEMS if gemini_batching else None,
+        "share_parent_contacts": share_parent_contacts,
+        "sitemap_discovery": sitemap_discovery_enabled,
+        "text_dedup": TEXT_DEDUP_SHINGLE_WORDS if text_dedup_enabled else None,
+        "max_context_chars": RECOMMENDATION_MAX_CONTEXT_CHARS,
+        "local_contacts": LOCAL_CONTACTS_MIN_CONTACTS if local_contacts_enabled else None
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+def get_output_domain(website_url, index):
+    """Derive the output file stem for a lead from its website URL"""
+    try:
+        parsed_url = urlparse(website_url)
+        domain = parsed_url.netloc or parsed_url.path
+        domain = domain.replace('www.', '').replace('https://', '').replace('http://', '')
+        if domain.endswith('/'):
+            domain = domain[:-1]
+    except:
+        domain = f"website_{index}"
+    return domain
+
+# Where lead results go: the JSONL store (optionally with per-domain JSON files) or only
+# per-domain JSON files, plus cleaned_outputs/ when cleaning inline; see --result-sink /
+# --export-json / --clean-inline
+result_sink_kind = RESULT_SINK
+export_domain_json = EXPORT_DOMAIN_JSON
+clean_inline = False
+_result_sink = None
+_result_sink_lock = threading.Lock()
+
+def get_result_sink():
+    """Return the process-wide result sink, opening it on first use"""
+    global _result_sink
+    with _result_sink_lock:
+        if _result_sink is None:
+            views = [CleanedOutputView()] if clean_inline else []
+            _result_sink = open_result_sink(result_sink_kind, export_domain_json, views=views)
+    return _result_sink
+
+def close_result_sink():
+    global _result_sink
+    with _result_sink_lock:
+        if _result_sink is not None:
+            _result_sink.close()
+            _result_sink = None
+
+@timed_stage("write")
+def write_lead_record(domain, status, record):
+    """Hand a lead's result or error record to the result sink"""
+    annotate_span(bytes=get_result_sink().write(domain, status, record))
+
+def build_lead_metadata(row):
+    """Metadata block stored alongside every lead result"""
     import pandas as pd
-    import json
-    import os
-    from urllib.parse import urlparse
     
-    # Start timing for batch processing
-    batch_start_time = time.time()
+    return {
+        'institution_name': row['Institution Name'],
+        'website_url': row['Website'],
+        'location': row.get('Location', 'N/A'),
+        'phone': row.get('Phone', 'N/A'),
+        'institution_type': row.get('Institution Type', 'N/A'),
+        'processed_at': pd.Timestamp.now().isoformat()
+    }
+
+def announce_lead(index, row, total):
+    """Print the per-lead banner and return the lead's output domain"""
+    # Extract domain name for filename
+    domain = get_output_domain(row['Website'], index)
+    
+    print(f"\n{'='*60}")
+    print(f"Processing {index + 1}/{total}: {row['Institution Name']}")
+    print(f"Website: {row['Website']}")
+    print(f"Domain: {domain}")
+    print(f"{'='*60}")
+    return domain
+
+def save_lead_result(domain, row, result):
+    """Attach metadata to an agent result and save it to the result sink"""
+    # Add metadata
+    result['metadata'] = build_lead_metadata(row)
     
-    # Create outputs directory if it doesn't exist
-    os.makedirs('outputs', exist_ok=True)
+    write_lead_record(domain, RESULT_OK, result)
+    
+    print(f"✅ Successfully processed and saved to {get_result_sink().location(domain)}")
+    
+    # Print summary
+    print(f"Course: {result['course_recommendation']['recommended_course']}")
+    print(f"Score: {result['course_recommendation']['recommendation_score']}")
+    print(f"Contacts: {len(result['contact_info']['contacts'])} found")
+
+def save_lead_error(domain, row, error):
+    """Save error info for a failed lead to the result sink"""
+    print(f"❌ Error processing {row['Institution Name']}: {error}")
+    
+    error_result = {
+        'error': str(error),
+        'metadata': {**build_lead_metadata(row), 'status': 'failed'}
+    }
+    
+    write_lead_record(domain, RESULT_FAILED, error_result)
+
+def process_lead(index, row, total, manifest=None):
+    """Run the agent for one CSV row and save its result; returns True on success"""
+    domain = announce_lead(index, row, total)
+    checkpoint = manifest.checkpoint(domain, row['Website']) if manifest else None
+    
+    # Every span recorded while this lead runs is tagged with its domain
+    with lead_scope(domain):
+        try:
+            # Run the agent
+            result = run_agent(row['Website'], checkpoint, domain)
+            save_lead_result(domain, row, result)
+            if manifest:
+                manifest.mark(domain, row['Website'], CONTACTS_DONE)
+            return True
+            
+        except Exception as e:
+            save_lead_error(domain, row, e)
+            if manifest:
+                manifest.mark(domain, row['Website'], FAILED, error=str(e))
+            return False
+
+async def process_lead_async(clients, index, row, total, manifest=None):
+    """Async version of process_lead"""
+    domain = announce_lead(index, row, total)
+    checkpoint = manifest.checkpoint(domain, row['Website']) if manifest else None
+    
+    with lead_scope(domain):
+        try:
+            result = await run_agent_async(clients, row['Website'], checkpoint, domain)
+            save_lead_result(domain, row, result)
+            if manifest:
+                manifest.mark(domain, row['Website'], CONTACTS_DONE)
+            return True
+            
+        except Exception as e:
+            save_lead_error(domain, row, e)
+            if manifest:
+                manifest.mark(domain, row['Website'], FAILED, error=str(e))
+            return False
+
+@dataclass
+class LeadJob:
+    """A lead travelling through the staged pipeline, with what each stage produced"""
+    index: int
+    row: dict
+    domain: str
+    manifest: object = None
+    checkpoint: object = None
+    harvest: object = None
+    course_recommendation: dict = None
+    contact_info: dict = None
+
+def start_lead_job(index, row, total, manifest=None):
+    """Announce a lead and wrap it for the pipeline"""
+    domain = announce_lead(index, row, total)
+    checkpoint = manifest.checkpoint(domain, row['Website']) if manifest else None
+    return LeadJob(index, row, domain, manifest, checkpoint, new_contact_harvest())
+
+def recommend_stage(job):
+    """Pipeline stage 1: crawl the lead's website until a course can be recommended"""
+    with lead_scope(job.domain):
+        job.course_recommendation = resume_course_recommendation(job.row['Website'], job.checkpoint, job.harvest)
+
+async def recommend_stage_async(clients, job):
+    with lead_scope(job.domain):
+        job.course_recommendation = await resume_course_recommendation_async(clients, job.row['Website'], job.checkpoint,
+                                                                             job.harvest)
+
+def contacts_stage(job):
+    """Pipeline stage 2: contact research (crawled pages, else Perplexity) for the recommended course"""
+    with lead_scope(job.domain):
+        course = job.course_recommendation.get("recommended_course", "Unknown")
+        job.contact_info = research_contacts(job.domain, job.row['Website'], course, job.harvest)
+
+async def contacts_stage_async(clients, job):
+    with lead_scope(job.domain):
+        course = job.course_recommendation.get("recommended_course", "Unknown")
+        job.contact_info = await research_contacts_async(clients, job.domain, job.row['Website'], course, job.harvest)
+
+def write_stage(job):
+    """Pipeline stage 3: save the lead's result and mark it done in the manifest"""
+    with lead_scope(job.domain):
+        result = {"course_recommendation": job.course_recommendation, "contact_info": job.contact_info}
+        save_lead_result(job.domain, job.row, result)
+        if job.manifest:
+            job.manifest.mark(job.domain, job.row['Website'], CONTACTS_DONE)
+
+async def write_stage_async(job):
+    write_stage(job)
+
+def finish_lead_job(job, error, progress, pipeline):
+    """Record a lead leaving the pipeline; saves the error of a failed stage and aborts on too many failures"""
+    if error is not None:
+        with lead_scope(job.domain):
+            save_lead_error(job.domain, job.row, error)
+            if job.manifest:
+                job.manifest.mark(job.domain, job.row['Website'], FAILED, error=str(error))
+    if progress.record(error is None):
+        pipeline.stop()
+
+def load_leads(csv_file_path, max_websites=None):
+    """Read the leads CSV, optionally truncated to max_websites rows; None if it cannot be read"""
+    import pandas as pd
     
     # Read CSV file
     try:
@@ -1000,110 +2114,393 @@ def process_all_websites(csv_file_path, max_websites=None):
         print(f"Loaded {len(df)} websites from {csv_file_path}")
     except Exception as e:
         print(f"Error reading CSV file: {e}")
-        return
+        return None
     
     # Limit websites if specified
     if max_websites:
         df = df.head(max_websites)
         print(f"Processing first {len(df)} websites")
-    
-    # Process each website
-    successful = 0
-    failed = 0
+    return df
+
+# Run leads through separate recommend / contacts / write stages; see --no-pipeline
+pipeline_enabled = PIPELINE_ENABLED
+
+# JSONL span trace written during batches; see --trace-file / --no-trace
+trace_file = TRACE_FILE if TRACE_ENABLED else None
+
+def open_trace():
+    """Start appending this batch's spans to the trace file, if tracing is on"""
+    configure_trace(trace_file)
+    if trace_file:
+        print(f"Span trace: {trace_file}")
+
+def open_run_manifest():
+    """Open the run manifest stamped with this run's config and prompt versions"""
+    manifest = RunManifest(config_version=compute_config_version(), prompt_version=compute_prompt_version())
+    print(f"Run manifest: {RUN_MANIFEST_PATH} (config {manifest.config_version}, prompts {manifest.prompt_version})")
+    return manifest
+
+def select_leads(df, manifest, force_domains=(), rerun_outdated=False):
+    """
+    Pick the rows that still need work and journal them as pending.
+
+    Completed leads are skipped; failed and interrupted ones are retried. Domains in
+    force_domains are reprocessed from scratch.
+    """
+    force_domains = {domain.replace('www.', '') for domain in force_domains}
+    sink = get_result_sink()
+    selected = []
+    skipped = 0
     
     for index, row in df.iterrows():
-        institution_name = row['Institution Name']
-        website_url = row['Website']
+        row = row.to_dict()
+        domain = get_output_domain(row['Website'], index)
         
-        # Extract domain name for filename
-        try:
-            parsed_url = urlparse(website_url)
-            domain = parsed_url.netloc or parsed_url.path
-            domain = domain.replace('www.', '').replace('https://', '').replace('http://', '')
-            if domain.endswith('/'):
-                domain = domain[:-1]
-        except:
-            domain = f"website_{index}"
+        if domain in force_domains:
+            manifest.reset(domain)
+        elif manifest.is_completed(domain, sink.has_result, rerun_outdated):
+            skipped += 1
+            continue
+        
+        manifest.mark_pending(domain, row['Website'])
+        selected.append((index, row))
+    
+    if skipped:
+        print(f"Skipping {skipped} already-processed leads (use --force DOMAIN to redo one)")
+    return selected
+
+class BatchProgress:
+    """Aggregate progress, ETA and fail-fast bookkeeping for a batch of leads"""
+
+    def __init__(self, total):
+        self.start_time = time.time()
+        self.total = total
+        self.successful = 0
+        self.failed = 0
+        self.consecutive_errors = 0
+        self.aborted = False
+
+    def record(self, success):
+        """Record a finished lead; returns True the first time the batch should be aborted"""
+        if success:
+            self.successful += 1
+            self.consecutive_errors = 0
+        else:
+            self.failed += 1
+            self.consecutive_errors += 1
+        
+        # Aggregate progress across all workers
+        done = self.successful + self.failed
+        elapsed = time.time() - self.start_time
+        eta = elapsed / done * (self.total - done)
+        print(f"\n📊 Progress: {done}/{self.total} done ({self.successful} ok, {self.failed} failed) | "
+              f"elapsed {elapsed/60:.1f} min | ETA {eta/60:.1f} min")
+        
+        # Stop scheduling new leads if something is systematically wrong (API key, network)
+        if self.consecutive_errors >= MAX_CONSECUTIVE_ERRORS and not self.aborted:
+            print(f"🛑 {self.consecutive_errors} consecutive failures - cancelling remaining leads")
+            self.aborted = True
+            return True
+        return False
+
+    def print_summary(self):
+        """Print the end-of-batch report"""
+        batch_execution_time = time.time() - self.start_time
+        processed = self.successful + self.failed
         
         print(f"\n{'='*60}")
-        print(f"Processing {index + 1}/{len(df)}: {institution_name}")
-        print(f"Website: {website_url}")
-        print(f"Domain: {domain}")
+        print(f"BATCH PROCESSING COMPLETE")
         print(f"{'='*60}")
+        print(f"Total websites processed: {processed}/{self.total}")
+        print(f"Successful: {self.successful}")
+        print(f"Failed: {self.failed}")
+        if self.aborted:
+            print(f"Skipped (aborted after {MAX_CONSECUTIVE_ERRORS} consecutive errors): {self.total - processed}")
+        if processed:
+            print(f"Success rate: {(self.successful/processed*100):.1f}%")
+        if result_sink_kind == "jsonl":
+            print(f"Results appended to {RESULTS_JSONL_PATH}")
+        else:
+            print(f"Results saved in 'outputs/' directory")
+        print(f"\nBATCH EXECUTION TIME: {batch_execution_time:.2f} seconds ({batch_execution_time/60:.2f} minutes)")
+        if processed:
+            print(f"Average time per website: {batch_execution_time/processed:.2f} seconds")
+        cache = get_page_cache()
+        if cache:
+            stats = cache.stats()
+            print(f"Page cache: {stats['hits']} hits, {stats['revalidated']} revalidated (304), {stats['misses']} downloaded")
+        llm_cache = get_llm_cache()
+        if llm_cache:
+            stats = llm_cache.stats()
+            print(f"Gemini cache: {stats['hits']} hits, {stats['misses']} misses, {stats['bypassed']} bypassed")
+        for pool, stats in transport_metrics_snapshot().items():
+            if stats['requests']:
+                print(f"HTTP pool {pool}: {stats['requests']} requests, {stats['new_connections']} new connections "
+                      f"({stats['reuse_rate']*100:.0f}% reused), avg handshake {stats['avg_handshake_ms']:.0f} ms")
+        stage_summary = STAGE_METRICS.summary()
+        if stage_summary:
+            print("\nPer-stage spans:")
+            for line in format_stage_summary(stage_summary):
+                print(f"  {line}")
+        print("="*60)
+
+def process_all_websites(csv_file_path, max_websites=None, max_workers=DEFAULT_MAX_WORKERS,
+                         force_domains=(), rerun_outdated=False):
+    """
+    Process all websites from CSV file concurrently and save results to individual JSON files.
+
+    Leads already completed according to the run manifest are skipped, so an
+    interrupted batch can simply be restarted.
+    """
+    # Create outputs directory if it doesn't exist
+    os.makedirs('outputs', exist_ok=True)
+    
+    df = load_leads(csv_file_path, max_websites)
+    if df is None:
+        return
+    
+    manifest = open_run_manifest()
+    open_trace()
+    open_contact_directory()
+    leads = select_leads(df, manifest, force_domains, rerun_outdated)
+    
+    total = len(df)
+    progress = BatchProgress(len(leads))
+    
+    if pipeline_enabled:
+        print(f"Using staged pipeline: {max_workers} recommend, {PIPELINE_CONTACT_WORKERS} contact research, "
+              f"{PIPELINE_WRITE_WORKERS} write workers")
+        stages = [
+            Stage("recommend", recommend_stage, max_workers),
+            Stage("contacts", contacts_stage, PIPELINE_CONTACT_WORKERS),
+            Stage("write", write_stage, PIPELINE_WRITE_WORKERS)
+        ]
+        pipeline = StagePipeline(stages, PIPELINE_QUEUE_SIZE,
+                                 lambda job, error: finish_lead_job(job, error, progress, pipeline))
+        pipeline.run(start_lead_job(index, row, total, manifest) for index, row in leads)
+        progress.print_summary()
+        close_result_sink()
+        close_trace()
+        return
+    
+    print(f"Using {max_workers} workers")
+    
+    # Process websites with a bounded worker pool
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(process_lead, index, row, total, manifest): row['Website']
+            for index, row in leads
+        }
         
-        try:
-            # Run the agent
-            result = run_agent(website_url)
-            
-            # Add metadata
-            result['metadata'] = {
-                'institution_name': institution_name,
-                'website_url': website_url,
-                'location': row.get('Location', 'N/A'),
-                'phone': row.get('Phone', 'N/A'),
-                'institution_type': row.get('Institution Type', 'N/A'),
-                'processed_at': pd.Timestamp.now().isoformat()
-            }
-            
-            # Save to JSON file
-            output_file = f"outputs/{domain}.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
-            
-            print(f"✅ Successfully processed and saved to {output_file}")
-            successful += 1
+        for future in as_completed(futures):
+            try:
+                success = future.result()
+            except Exception as e:
+                print(f"❌ Worker crashed on {futures[future]}: {e}")
+                success = False
             
-            # Print summary
-            print(f"Course: {result['course_recommendation']['recommended_course']}")
-            print(f"Score: {result['course_recommendation']['recommendation_score']}")
-            print(f"Contacts: {len(result['contact_info']['contacts'])} found")
-            
-        except Exception as e:
-            print(f"❌ Error processing {institution_name}: {e}")
-            failed += 1
-            
-            # Save error info
-            error_result = {
-                'error': str(e),
-                'metadata': {
-                    'institution_name': institution_name,
-                    'website_url': website_url,
-                    'location': row.get('Location', 'N/A'),
-                    'phone': row.get('Phone', 'N/A'),
-                    'institution_type': row.get('Institution Type', 'N/A'),
-                    'processed_at': pd.Timestamp.now().isoformat(),
-                    'status': 'failed'
-                }
-            }
-            
-            output_file = f"outputs/{domain}_ERROR.json"
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(error_result, f, indent=2, ensure_ascii=False)
+            if progress.record(success):
+                for pending in futures:
+                    pending.cancel()
     
-    # Calculate and print batch processing time
-    batch_end_time = time.time()
-    batch_execution_time = batch_end_time - batch_start_time
+    progress.print_summary()
+    close_result_sink()
+    close_trace()
+
+class AsyncClients:
+    """
+    Pooled aiohttp sessions and concurrency limits for the async execution mode.
+
+    One event loop multiplexes every page fetch and LLM call over separate keep-alive
+    pools for crawled sites, Gemini and Perplexity; these semaphores keep any single
+    crawled host and Gemini within their limits. Perplexity requests go through an
+    AsyncPerplexityClient (AIMD window, retries, coalescing). Batchable Gemini prompts
+    from concurrent leads go through gemini_batcher.
+    """
+
+    def __init__(self, per_host_limit=ASYNC_PER_HOST_LIMIT, gemini_limit=ASYNC_GEMINI_CONCURRENCY,
+                 perplexity_limit=PERPLEXITY_MAX_CONCURRENCY, max_connections=ASYNC_MAX_CONNECTIONS):
+        self.per_host_limit = per_host_limit
+        self.gemini_semaphore = asyncio.Semaphore(gemini_limit)
+        self.perplexity = AsyncPerplexityClient(lambda payload: send_perplexity_async(self, payload), perplexity_limit)
+        self.connection_limits = {
+            CRAWL: max_connections,
+            GEMINI: gemini_limit,
+            PERPLEXITY: perplexity_limit
+        }
+        self.host_semaphores = {}
+        self.sessions = {}
+        self.gemini_batcher = None
+        if gemini_batching:
+            self.gemini_batcher = AsyncGeminiBatcher(lambda prompt: post_gemini_async(self, prompt, GEMINI_BATCH_TIMEOUT))
+
+    async def __aenter__(self):
+        self.sessions = create_async_sessions(self.connection_limits)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for session in self.sessions.values():
+            await session.close()
+
+    def host_semaphore(self, url):
+        """Semaphore limiting concurrent requests to the host of url"""
+        host = urlparse(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self.host_semaphores[host]
+
+async def process_all_websites_async(csv_file_path, max_websites=None, max_concurrent_leads=ASYNC_MAX_CONCURRENT_LEADS,
+                                     force_domains=(), rerun_outdated=False):
+    """Process all websites from CSV file on a single event loop and save results to individual JSON files"""
+    if aiohttp is None:
+        print("Error: async mode requires aiohttp (pip install aiohttp)")
+        return
     
-    print(f"\n{'='*60}")
-    print(f"BATCH PROCESSING COMPLETE")
-    print(f"{'='*60}")
-    print(f"Total websites processed: {len(df)}")
-    print(f"Successful: {successful}")
-    print(f"Failed: {failed}")
-    print(f"Success rate: {(successful/len(df)*100):.1f}%")
-    print(f"Results saved in 'outputs/' directory")
-    print(f"\nBATCH EXECUTION TIME: {batch_execution_time:.2f} seconds ({batch_execution_time/60:.2f} minutes)")
-    print(f"Average time per website: {batch_execution_time/len(df):.2f} seconds")
-    print("="*60)
+    os.makedirs('outputs', exist_ok=True)
+    
+    df = load_leads(csv_file_path, max_websites)
+    if df is None:
+        return
+    
+    manifest = open_run_manifest()
+    open_trace()
+    open_contact_directory()
+    leads = select_leads(df, manifest, force_domains, rerun_outdated)
+    
+    total = len(df)
+    progress = BatchProgress(len(leads))
+    
+    if pipeline_enabled:
+        print(f"Using async staged pipeline: {max_concurrent_leads} recommend, {ASYNC_PERPLEXITY_CONCURRENCY} contact "
+              f"research, {PIPELINE_WRITE_WORKERS} write workers")
+        async with AsyncClients() as clients:
+            stages = [
+                Stage("recommend", functools.partial(recommend_stage_async, clients), max_concurrent_leads),
+                Stage("contacts", functools.partial(contacts_stage_async, clients), ASYNC_PERPLEXITY_CONCURRENCY),
+                Stage("write", write_stage_async, PIPELINE_WRITE_WORKERS)
+            ]
+            pipeline = AsyncStagePipeline(stages, PIPELINE_QUEUE_SIZE,
+                                          lambda job, error: finish_lead_job(job, error, progress, pipeline))
+            await pipeline.run(start_lead_job(index, row, total, manifest) for index, row in leads)
+        progress.print_summary()
+        close_result_sink()
+        close_trace()
+        return
+    
+    lead_semaphore = asyncio.Semaphore(max_concurrent_leads)
+    print(f"Using async mode with up to {max_concurrent_leads} leads in flight")
+    
+    async with AsyncClients() as clients:
+        async def run_lead(index, row):
+            async with lead_semaphore:
+                return await process_lead_async(clients, index, row, total, manifest)
+        
+        tasks = [asyncio.create_task(run_lead(index, row)) for index, row in leads]
+        
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                success = await next_done
+            except asyncio.CancelledError:
+                continue
+            except Exception as e:
+                print(f"❌ Lead task crashed: {e}")
+                success = False
+            
+            if progress.record(success):
+                for task in tasks:
+                    task.cancel()
+    
+    progress.print_summary()
+    close_result_sink()
+    close_trace()
 
 # Example usage
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommend courses and find contacts for every lead in a CSV file")
+    parser.add_argument("csv_file", nargs="?", default="1_discovered_leads.csv", help="Leads CSV file")
+    parser.add_argument("--max-websites", type=int, default=None, help="Only process the first N leads")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Leads processed at once (default {DEFAULT_MAX_WORKERS}, or {ASYNC_MAX_CONCURRENT_LEADS} with --async)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Run all leads on a single asyncio event loop")
+    parser.add_argument("--no-page-cache", action="store_true", help="Always download pages instead of using the on-disk page cache")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Do not read or write the Gemini response cache")
+    parser.add_argument("--bypass-llm-cache", action="store_true",
+                        help="Send every Gemini prompt to the API, refreshing the cached responses")
+    parser.add_argument("--full-context", action="store_true",
+                        help="Re-send all accumulated page text to Gemini on every crawl step")
+    parser.add_argument("--no-text-dedup", action="store_true",
+                        help="Send each page's full text to Gemini, including text repeated from the lead's earlier pages")
+    parser.add_argument("--force", nargs="+", default=[], metavar="DOMAIN",
+                        help="Reprocess these domains even if the run manifest says they are done")
+    parser.add_argument("--rerun-outdated", action="store_true",
+                        help="Reprocess leads completed with a different config or prompt version")
+    parser.add_argument("--result-sink", choices=["jsonl", "json"], default=RESULT_SINK,
+                        help="Append results to outputs/results.jsonl, or write one outputs/{domain}.json per lead")
+    parser.add_argument("--export-json", action="store_true",
+                        help="With the JSONL sink, also write the per-domain JSON files")
+    parser.add_argument("--clean-inline", action="store_true",
+                        help="Keep cleaned_outputs/ up to date as results are written (no separate cleaner run)")
+    parser.add_argument("--no-pipeline", action="store_true",
+                        help="Carry each lead through all stages on one worker instead of the staged pipeline")
+    parser.add_argument("--no-shared-contacts", action="store_true",
+                        help="Research every subdomain's contacts even if a sibling under the same parent domain has some")
+    parser.add_argument("--no-local-contacts", action="store_true",
+                        help="Always research contacts with Perplexity instead of using those found on the crawled pages")
+    parser.add_argument("--no-sitemaps", action="store_true",
+                        help="Do not seed the recommendation crawl with URLs from robots.txt / sitemap.xml")
+    parser.add_argument("--no-url-ranker", action="store_true",
+                        help="Ask Gemini to choose every crawl link instead of ranking them with the keyword tables")
+    parser.add_argument("--no-gemini-batching", action="store_true",
+                        help="Send every URL-filter/classification prompt in its own Gemini request")
+    parser.add_argument("--html-backend", choices=["auto", "lxml", "bs4"], default=HTML_EXTRACTION_BACKEND,
+                        help="HTML text/link extraction backend (lxml is faster, bs4 is the reference)")
+    parser.add_argument("--trace-file", default=TRACE_FILE, help=f"JSONL file receiving per-stage spans (default {TRACE_FILE})")
+    parser.add_argument("--no-trace", action="store_true", help="Do not write the span trace file")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while the batch runs")
+    args = parser.parse_args()
+    
+    if args.no_page_cache:
+        page_cache_enabled = False
+    if args.no_llm_cache:
+        llm_cache_enabled = False
+    llm_cache_bypass = args.bypass_llm_cache
+    if args.full_context:
+        incremental_recommendation = False
+    if args.no_text_dedup:
+        text_dedup_enabled = False
+    if args.no_url_ranker:
+        url_ranker_enabled = False
+    if args.no_sitemaps:
+        sitemap_discovery_enabled = False
+    if args.no_pipeline:
+        pipeline_enabled = False
+    result_sink_kind = args.result_sink
+    export_domain_json = export_domain_json or args.export_json
+    clean_inline = args.clean_inline
+    if args.no_gemini_batching:
+        gemini_batching = False
+    if args.no_shared_contacts:
+        share_parent_contacts = False
+    if args.no_local_contacts:
+        local_contacts_enabled = False
+    html_backend = resolve_backend(args.html_backend)
+    trace_file = None if args.no_trace else args.trace_file
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port)
+        print(f"📈 Prometheus metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+    
     # Process all websites from CSV file
-    csv_file = "1_discovered_leads.csv"
+    csv_file = args.csv_file
     
     print("🚀 Starting batch processing of all websites...")
     print(f"CSV file: {csv_file}")
     print("="*60)
     
-    # Process all websites (remove max_websites limit to process all)
-    process_all_websites(csv_file)
+    if args.use_async:
+        asyncio.run(process_all_websites_async(csv_file, args.max_websites,
+                                               args.workers or ASYNC_MAX_CONCURRENT_LEADS,
+                                               args.force, args.rerun_outdated))
+    else:
+        process_all_websites(csv_file, args.max_websites, args.workers or DEFAULT_MAX_WORKERS,
+                             args.force, args.rerun_outdated)
@@ -2,89 +2,265 @@
 """
 Output Cleaner Script
 
-This script processes all JSON files in the outputs directory and creates cleaned versions
-in the cleaned_outputs directory. Only files with at least one contact entry in the
-contact_info.contacts array are copied to the cleaned_outputs directory.
+This script processes the results in the outputs directory and creates cleaned versions
+in the cleaned_outputs directory. Only results with at least one contact entry in the
+contact_info.contacts array are kept (as cleaned_outputs/{domain}.json).
+
+Runs are incremental: a manifest in cleaned_outputs/ remembers what was already cleaned.
+
+    - outputs/results.jsonl (when the agent wrote one) is read from the byte offset the
+      previous run stopped at, in one sequential scan
+    - every outputs/*.json file (the per-domain layout, or results saved before the
+      JSONL store) is checked in parallel; files whose mtime and size (or, failing that,
+      content hash) are unchanged are skipped, and qualifying files are hard-linked (or
+      byte-copied) instead of re-serialized. Domains with a successful result in the
+      JSONL store are left to the store.
+
+--merge-contacts additionally merges the normalized contacts of every result into one
+deduplicated cleaned_outputs/contacts.csv (contacts.py), in a single pass.
 
 Usage:
     python 3_output_cleaner.py
+    python 3_output_cleaner.py --full   # ignore the manifest and clean everything again
+    python 3_output_cleaner.py --merge-contacts
 """
 
+import argparse
+import csv
+import hashlib
 import json
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from constants import (
+    RESULTS_JSONL_PATH, CLEANED_OUTPUTS_DIR, CLEANER_MANIFEST_PATH, CLEANER_WORKERS, MERGED_CONTACTS_PATH
+)
+from result_sink import read_new_results, read_saved_results, OK
+from output_filter import has_contacts, remove_file, CleanedOutputView
+from contacts import ContactIndex
+
+MANIFEST_VERSION = 1
+
+
+def new_manifest():
+    return {"version": MANIFEST_VERSION, "files": {}, "jsonl": None}
+
+
+def load_manifest(path):
+    """Previous run's manifest, or an empty one"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return new_manifest()
+
+
+def save_manifest(path, manifest):
+    """Write the manifest atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def link_or_copy(source, destination):
+    """Hard-link source to destination (replacing it), falling back to a byte copy"""
+    remove_file(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
 
-def process_output_files():
+def clean_json_file(json_file, cleaned_outputs_dir, previous):
     """
-    Process all JSON files in the outputs directory and create cleaned versions
-    in cleaned_outputs directory for files that have at least one contact entry.
+    Bring one outputs/*.json file's cleaned copy up to date.
+
+    Returns (manifest entry, outcome, message) where outcome is "unchanged", "copied",
+    "skipped" or "error".
+    """
+    output_file = cleaned_outputs_dir / json_file.name
+    stat = json_file.stat()
+    entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    # A kept file whose cleaned copy went missing has to be redone
+    output_ok = previous is not None and (not previous.get("kept") or output_file.exists())
+    if output_ok and (previous["mtime_ns"], previous["size"]) == (entry["mtime_ns"], entry["size"]):
+        return previous, "unchanged", None
+
+    with open(json_file, 'rb') as f:
+        body = f.read()
+    entry["sha256"] = hashlib.sha256(body).hexdigest()
+    if output_ok and previous.get("sha256") == entry["sha256"]:
+        # Touched but not changed
+        return {**previous, **entry}, "unchanged", None
+
+    try:
+        data = json.loads(body)
+    except json.JSONDecodeError as e:
+        return None, "error", f"✗ Error parsing {json_file.name}: {e}"
+
+    entry["kept"] = has_contacts(data)
+    if entry["kept"]:
+        # The agent already writes pretty-printed UTF-8 JSON, so the bytes can be shared as-is
+        link_or_copy(json_file, output_file)
+        return entry, "copied", f"✓ Copied {json_file.name} (has {len(data['contact_info']['contacts'])} contacts)"
+    remove_file(output_file)
+    return entry, "skipped", f"✗ Skipped {json_file.name} (no contacts or invalid structure)"
+
+
+def json_file_domain(name):
+    """Domain of an outputs/{domain}.json or outputs/{domain}_ERROR.json file name"""
+    stem = name[:-len(".json")]
+    return stem[:-len("_ERROR")] if stem.endswith("_ERROR") else stem
+
+
+def clean_json_files(outputs_dir, cleaned_outputs_dir, manifest, workers=CLEANER_WORKERS, exclude=()):
+    """Clean every per-domain JSON file in parallel, except those of domains in exclude; returns outcome counts"""
+    json_files = [json_file for json_file in sorted(outputs_dir.glob("*.json"))
+                  if json_file_domain(json_file.name) not in exclude]
+    previous_files = manifest["files"]
+    counts = {"unchanged": 0, "copied": 0, "skipped": 0, "error": 0}
+
+    def clean(json_file):
+        try:
+            return json_file, clean_json_file(json_file, cleaned_outputs_dir, previous_files.get(json_file.name))
+        except Exception as e:
+            return json_file, (None, "error", f"✗ Error processing {json_file.name}: {e}")
+
+    files = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for json_file, (entry, outcome, message) in executor.map(clean, json_files):
+            counts[outcome] += 1
+            if message:
+                print(message)
+            if entry is not None:
+                files[json_file.name] = entry
+
+    # Inputs that disappeared take their cleaned copies with them
+    for name, entry in previous_files.items():
+        if name not in files and entry.get("kept") and json_file_domain(name) not in exclude:
+            remove_file(cleaned_outputs_dir / name)
+    manifest["files"] = files
+    return counts
+
+
+def clean_jsonl_store(results_path, cleaned_outputs_dir, manifest):
+    """
+    Apply the results appended to the JSONL store since the last run; returns outcome counts.
+
+    The domains with a successful result in the store are kept in the manifest, so their
+    per-domain JSON files are not cleaned over the store's results.
+    """
+    stat = results_path.stat()
+    previous = manifest.get("jsonl") or {}
+    offset = previous.get("offset", 0)
+    succeeded = set(previous.get("succeeded", []))
+    if previous.get("inode") != stat.st_ino or offset > stat.st_size:
+        # A different or truncated store: start over
+        offset = 0
+        succeeded = set()
+
+    latest, end = read_new_results(results_path, offset)
+    view = CleanedOutputView(cleaned_outputs_dir)
+    counts = {"unchanged": 0, "copied": 0, "skipped": 0, "error": 0}
+    for domain, (status, result) in latest.items():
+        if status != OK:
+            # A failed retry keeps the last successful result's cleaned file
+            view.write(domain, status, result)
+            counts["skipped"] += 1
+            print(f"✗ Skipped {domain} (failed)")
+            continue
+        succeeded.add(domain)
+        if view.write(domain, status, result):
+            counts["copied"] += 1
+            print(f"✓ Copied {domain}.json (has {len(result['contact_info']['contacts'])} contacts)")
+        else:
+            counts["skipped"] += 1
+            print(f"✗ Skipped {domain}.json (no contacts or invalid structure)")
+
+    manifest["jsonl"] = {"inode": stat.st_ino, "offset": end, "succeeded": sorted(succeeded)}
+    return counts
+
+
+def process_output_files(full=False, workers=CLEANER_WORKERS):
+    """
+    Process the results in the outputs directory and create cleaned versions in
+    cleaned_outputs directory for results that have at least one contact entry.
     """
     # Define directories
     outputs_dir = Path("outputs")
-    cleaned_outputs_dir = Path("cleaned_outputs")
-    
+    cleaned_outputs_dir = Path(CLEANED_OUTPUTS_DIR)
+
     # Ensure cleaned_outputs directory exists
     cleaned_outputs_dir.mkdir(exist_ok=True)
-    
+
     # Check if outputs directory exists
     if not outputs_dir.exists():
         print(f"Error: {outputs_dir} directory does not exist!")
         return
-    
-    # Get all JSON files in outputs directory
-    json_files = list(outputs_dir.glob("*.json"))
-    
-    if not json_files:
-        print(f"No JSON files found in {outputs_dir} directory.")
-        return
-    
-    print(f"Found {len(json_files)} JSON files in {outputs_dir} directory.")
-    
-    processed_count = 0
-    copied_count = 0
-    
-    for json_file in json_files:
-        try:
-            # Read the JSON file
-            with open(json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            processed_count += 1
-            
-            # Check if the file has the expected structure and at least one contact
-            if (isinstance(data, dict) and 
-                'contact_info' in data and 
-                isinstance(data['contact_info'], dict) and
-                'contacts' in data['contact_info'] and
-                isinstance(data['contact_info']['contacts'], list) and
-                len(data['contact_info']['contacts']) > 0):
-                
-                # Copy the file to cleaned_outputs directory
-                output_file = cleaned_outputs_dir / json_file.name
-                
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                
-                copied_count += 1
-                print(f"✓ Copied {json_file.name} (has {len(data['contact_info']['contacts'])} contacts)")
-            
-            else:
-                print(f"✗ Skipped {json_file.name} (no contacts or invalid structure)")
-                
-        except json.JSONDecodeError as e:
-            print(f"✗ Error parsing {json_file.name}: {e}")
-        except Exception as e:
-            print(f"✗ Error processing {json_file.name}: {e}")
-    
+
+    manifest = new_manifest() if full else load_manifest(CLEANER_MANIFEST_PATH)
+
+    results_path = Path(RESULTS_JSONL_PATH)
+    counts = {"unchanged": 0, "copied": 0, "skipped": 0, "error": 0}
+    succeeded = set()
+    if results_path.exists():
+        print(f"Reading new results from {results_path}")
+        counts = clean_jsonl_store(results_path, cleaned_outputs_dir, manifest)
+        succeeded = set(manifest["jsonl"]["succeeded"])
+    elif manifest.get("jsonl"):
+        # The store was removed: its domains go back to their per-domain files
+        manifest["jsonl"] = None
+        manifest["files"] = {}
+    for outcome, count in clean_json_files(outputs_dir, cleaned_outputs_dir, manifest, workers, succeeded).items():
+        counts[outcome] += count
+
+    save_manifest(CLEANER_MANIFEST_PATH, manifest)
+
     print(f"\nProcessing complete!")
-    print(f"Processed: {processed_count} files")
-    print(f"Copied to cleaned_outputs: {copied_count} files")
-    print(f"Skipped: {processed_count - copied_count} files")
+    print(f"Processed: {counts['copied'] + counts['skipped']} results")
+    print(f"Copied to cleaned_outputs: {counts['copied']}")
+    print(f"Skipped: {counts['skipped']}")
+    print(f"Unchanged since last run: {counts['unchanged']}")
+    if counts['error']:
+        print(f"Errors: {counts['error']}")
+
+
+def merge_contacts(output_path=MERGED_CONTACTS_PATH):
+    """Merge the contacts of every saved result across leads and write them as one CSV"""
+    index = ContactIndex()
+    leads = 0
+    for domain, status, result in read_saved_results():
+        if status == OK and has_contacts(result):
+            index.add_all(result['contact_info']['contacts'], domain)
+            leads += 1
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=["name", "title", "email", "phone", "domains"], extrasaction='ignore')
+        writer.writeheader()
+        for contact in index.contacts(with_domains=True):
+            writer.writerow({**contact, "domains": "; ".join(contact["domains"])})
+    os.replace(tmp_path, output_path)
+    print(f"Merged the contacts of {leads} leads into {len(index)} unique contacts: {output_path}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy lead results with at least one contact to cleaned_outputs/")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and re-clean every result")
+    parser.add_argument("--workers", type=int, default=CLEANER_WORKERS, help="Files cleaned in parallel")
+    parser.add_argument("--merge-contacts", action="store_true",
+                        help=f"Also write every lead's contacts, normalized and deduplicated, to {MERGED_CONTACTS_PATH}")
+    args = parser.parse_args()
+
     print("Output Cleaner Script")
     print("=" * 50)
-    process_output_files()
+    process_output_files(args.full, args.workers)
+    if args.merge_contacts:
+        merge_contacts()
@@ -0,0 +1,115 @@
+"""
+Benchmark and parity check for the HTML extraction backends (html_extract.py).
+
+Runs every available backend over a corpus of HTML files, checks that each one
+produces exactly the same text and links as the bs4 reference backend, and reports
+pages per second per core (single-threaded, measured in process CPU time).
+
+Anchor texts are only a ranking hint, so differences there (typically nested <a>
+tags, which libxml2 closes the way browsers do) are counted but do not fail the check.
+
+Usage:
+    python benchmark_html_extraction.py                  # fixtures/html + cached pages
+    python benchmark_html_extraction.py saved_pages/ --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from constants import PAGE_CACHE_DIR
+from html_extract import EXTRACTORS
+
+CORPUS_URL = "https://www.example.ac.in/dir/page.html"
+
+
+def load_corpus(paths):
+    """Read every file under the given files/directories as raw bytes"""
+    corpus = []
+    for path in paths:
+        if os.path.isfile(path):
+            files = [path]
+        else:
+            files = sorted(
+                os.path.join(root, name)
+                for root, _, names in os.walk(path)
+                for name in names
+                if not name.endswith((".sqlite3", ".tmp"))
+            )
+        for file_path in files:
+            with open(file_path, "rb") as f:
+                corpus.append((file_path, f.read()))
+    return corpus
+
+
+def check_parity(corpus):
+    """
+    Compare every backend with bs4.
+
+    Returns (mismatches, anchor_differences): pages whose text or links differ, and
+    pages where only the anchor texts differ.
+    """
+    mismatches = []
+    anchor_differences = []
+    for file_path, content in corpus:
+        text, links, anchor_texts = EXTRACTORS["bs4"](CORPUS_URL, content)
+        for backend, extract in EXTRACTORS.items():
+            if backend == "bs4":
+                continue
+            other_text, other_links, other_anchor_texts = extract(CORPUS_URL, content)
+            if (other_text, other_links) != (text, links):
+                mismatches.append((backend, file_path))
+            elif other_anchor_texts != anchor_texts:
+                anchor_differences.append((backend, file_path))
+    return mismatches, anchor_differences
+
+
+def benchmark(extract, corpus, repeat):
+    """Pages per CPU-second for one backend"""
+    start = time.process_time()
+    for _ in range(repeat):
+        for _, content in corpus:
+            extract(CORPUS_URL, content)
+    elapsed = time.process_time() - start
+    return len(corpus) * repeat / elapsed if elapsed else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML extraction backends")
+    default_paths = ["fixtures/html"]
+    if os.path.isdir(os.path.join(PAGE_CACHE_DIR, "bodies")):
+        default_paths.append(os.path.join(PAGE_CACHE_DIR, "bodies"))
+    parser.add_argument("paths", nargs="*", default=default_paths,
+                        help="HTML files or directories (default: fixtures/html and the page cache)")
+    parser.add_argument("--repeat", type=int, default=10, help="Passes over the corpus per backend")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.paths)
+    if not corpus:
+        print("❌ No HTML files found")
+        return 1
+    total_bytes = sum(len(content) for _, content in corpus)
+    print(f"📄 Corpus: {len(corpus)} pages, {total_bytes / 1024:.0f} KB")
+
+    mismatches, anchor_differences = check_parity(corpus)
+    if mismatches:
+        print(f"❌ {len(mismatches)} pages differ from the bs4 reference:")
+        for backend, file_path in mismatches:
+            print(f"   {backend}: {file_path}")
+    else:
+        print("✅ All backends match bs4's text and links on every page")
+    for backend, file_path in anchor_differences:
+        print(f"ℹ️  {backend}: anchor texts differ on {file_path}")
+
+    results = {backend: benchmark(extract, corpus, args.repeat) for backend, extract in EXTRACTORS.items()}
+    print(f"\n⏱️  Pages per second per core ({args.repeat} passes):")
+    for backend, pages_per_second in results.items():
+        speedup = pages_per_second / results["bs4"]
+        print(f"   {backend:5s} {pages_per_second:10.1f} pages/s  ({speedup:.1f}x bs4)")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
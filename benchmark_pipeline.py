@@ -0,0 +1,287 @@
+"""
+Offline benchmark of the full 2_coursera_agent.py pipeline.
+
+Replays recorded site HTML (fixtures/sites/) and canned Gemini / Perplexity answers
+(fixtures/llm/) from a local stand-in server, runs process_all_websites (or the async
+variant) over a generated leads CSV, and reports:
+
+    - per-stage latency (fetch, parse, URL filter, recommendation LLM,
+      Perplexity, contact extraction)
+    - leads/hour and the number of Gemini requests (batched prompts share one)
+    - peak RSS of the agent process
+
+No network access or API keys are needed, so throughput regressions can be caught on
+any machine. The stand-in server runs in a separate process (so it does not count
+towards RSS) and gives every lead its own loopback port, so each lead is a distinct
+host for connection pooling and per-domain politeness. The agent is pointed at it
+through the GEMINI_API_BASE and PERPLEXITY_API_URL environment variables.
+
+Usage:
+    python benchmark_pipeline.py --leads 30
+    python benchmark_pipeline.py --leads 200 --async --gemini-latency-ms 800 --perplexity-latency-ms 4000
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+
+# resource is Unix-only; peak RSS is reported as unknown elsewhere
+try:
+    import resource
+except ImportError:
+    resource = None
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SITES_DIR = os.path.join(REPO_DIR, "fixtures", "sites")
+LLM_DIR = os.path.join(REPO_DIR, "fixtures", "llm")
+
+
+def list_sites():
+    """Names of the recorded sites under fixtures/sites/"""
+    return sorted(name for name in os.listdir(SITES_DIR) if os.path.isdir(os.path.join(SITES_DIR, name)))
+
+
+def canned_gemini_answer(responses, prompt):
+    """Recorded answer for a prompt: the first entry whose match string it contains"""
+    return next((entry["answer"] for entry in responses if entry["match"] in prompt), {})
+
+
+def resolve_site_file(site_dir, url_path):
+    """File recorded for a URL path: exact file, then path.html, then path/index.html"""
+    relative = unquote(url_path).strip("/")
+    candidates = [relative + ".html", os.path.join(relative, "index.html")] if relative else ["index.html"]
+    if relative:
+        candidates.insert(0, relative)
+    for candidate in candidates:
+        path = os.path.normpath(os.path.join(site_dir, candidate))
+        if path.startswith(site_dir + os.sep) and os.path.isfile(path):
+            return path
+    return None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves a recorded site on GET and canned LLM answers on POST"""
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        site_dir = getattr(self.server, "site_dir", None)
+        path = resolve_site_file(site_dir, urlsplit(self.path).path) if site_dir else None
+        if path is None:
+            return self.send_body(404, b"Not found", "text/plain")
+        with open(path, "rb") as f:
+            body = f.read()
+        self.send_body(200, body, "text/plain" if path.endswith(".txt") else "text/html; charset=utf-8")
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        path = urlsplit(self.path).path
+        if path.startswith("/v1beta/models/"):
+            # Imported here: constants reads GEMINI_API_BASE / PERPLEXITY_API_URL at import,
+            # so no repo module may be imported before main() has set them
+            from gemini_batcher import split_batch_prompt
+            prompt = request["contents"][0]["parts"][0]["text"]
+            tasks = split_batch_prompt(prompt)
+            if tasks:
+                answer = {"answers": [
+                    {"id": task_id, "answer": canned_gemini_answer(self.server.gemini_responses, task)}
+                    for task_id, task in tasks
+                ]}
+            else:
+                answer = canned_gemini_answer(self.server.gemini_responses, prompt)
+            time.sleep(self.server.gemini_latency)
+            text = json.dumps(answer)
+            response = {
+                "candidates": [{"content": {"parts": [{"text": text}]}}],
+                "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4}
+            }
+        elif path == "/chat/completions":
+            time.sleep(self.server.perplexity_latency)
+            response = self.server.perplexity_response
+        else:
+            return self.send_body(404, b"Not found", "text/plain")
+        self.send_body(200, json.dumps(response).encode("utf-8"), "application/json")
+
+
+def run_stand_in_server(ready_queue, lead_count, gemini_latency, perplexity_latency):
+    """
+    Serve one recorded site per lead (each on its own port) plus the API stand-in.
+
+    Puts (api_port, [lead_port, ...]) on ready_queue, then serves until terminated.
+    """
+    with open(os.path.join(LLM_DIR, "gemini.json"), encoding="utf-8") as f:
+        gemini_responses = json.load(f)["responses"]
+    with open(os.path.join(LLM_DIR, "perplexity.json"), encoding="utf-8") as f:
+        perplexity_response = json.load(f)
+
+    servers = []
+    api_server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    api_server.gemini_responses = gemini_responses
+    api_server.perplexity_response = perplexity_response
+    api_server.gemini_latency = gemini_latency
+    api_server.perplexity_latency = perplexity_latency
+    servers.append(api_server)
+
+    sites = list_sites()
+    lead_ports = []
+    for index in range(lead_count):
+        site_server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        site_server.site_dir = os.path.join(SITES_DIR, sites[index % len(sites)])
+        servers.append(site_server)
+        lead_ports.append(site_server.server_address[1])
+
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    ready_queue.put((api_server.server_address[1], lead_ports))
+    threading.Event().wait()
+
+
+def write_leads_csv(csv_path, lead_ports):
+    """Leads CSV in the format written by 1_institutions_list_fetcher.py"""
+    sites = list_sites()
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write("Institution Name,Institution Type,Website,Location,Phone\n")
+        for index, port in enumerate(lead_ports):
+            site = sites[index % len(sites)]
+            f.write(f"Benchmark {site} {index},Schools,http://127.0.0.1:{port}/,Delhi,N/A\n")
+
+
+def load_agent():
+    """Import 2_coursera_agent.py (its file name is not a valid module name)"""
+    spec = importlib.util.spec_from_file_location("coursera_agent", os.path.join(REPO_DIR, "2_coursera_agent.py"))
+    agent = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(agent)
+    return agent
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the full agent pipeline against recorded fixtures")
+    parser.add_argument("--leads", type=int, default=30, help="Number of leads to process")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker threads (or concurrent leads with --async); defaults to the agent's setting")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Benchmark the asyncio execution mode")
+    parser.add_argument("--gemini-latency-ms", type=float, default=0, help="Simulated latency of each Gemini call")
+    parser.add_argument("--perplexity-latency-ms", type=float, default=0, help="Simulated latency of each Perplexity call")
+    parser.add_argument("--no-pipeline", action="store_true", help="Carry each lead through all stages on one worker")
+    parser.add_argument("--no-gemini-batching", action="store_true", help="Send every Gemini prompt in its own request")
+    parser.add_argument("--with-caches", action="store_true", help="Keep the page and Gemini caches enabled (cold)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the agent's own output")
+    args = parser.parse_args()
+
+    ready_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=run_stand_in_server,
+        args=(ready_queue, args.leads, args.gemini_latency_ms / 1000, args.perplexity_latency_ms / 1000),
+        daemon=True
+    )
+    server.start()
+    api_port, lead_ports = ready_queue.get(timeout=60)
+
+    os.environ["GEMINI_API_BASE"] = f"http://127.0.0.1:{api_port}"
+    os.environ["PERPLEXITY_API_URL"] = f"http://127.0.0.1:{api_port}/chat/completions"
+
+    work_dir = tempfile.mkdtemp(prefix="coursera_benchmark_")
+    original_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        write_leads_csv("leads.csv", lead_ports)
+        agent_output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with agent_output:
+            agent = load_agent()
+            agent.page_cache_enabled = args.with_caches
+            agent.llm_cache_enabled = args.with_caches
+            agent.gemini_batching = not args.no_gemini_batching
+            agent.pipeline_enabled = not args.no_pipeline
+            workers = args.workers or (agent.ASYNC_MAX_CONCURRENT_LEADS if args.use_async else agent.DEFAULT_MAX_WORKERS)
+
+            start = time.perf_counter()
+            if args.use_async:
+                asyncio.run(agent.process_all_websites_async("leads.csv", None, workers))
+            else:
+                agent.process_all_websites("leads.csv", None, workers)
+            wall_seconds = time.perf_counter() - start
+
+        from result_sink import read_results, OK, FAILED
+        if agent.result_sink_kind == "jsonl":
+            statuses = [status for _, status, _ in read_results(agent.RESULTS_JSONL_PATH)]
+        else:
+            statuses = [FAILED if path.endswith("_ERROR.json") else OK for path in glob.glob(os.path.join("outputs", "*.json"))]
+        failed = statuses.count(FAILED)
+        stages = agent.STAGE_METRICS.summary()
+        report = {
+            "mode": "async" if args.use_async else "sync",
+            "pipeline": agent.pipeline_enabled,
+            "workers": workers,
+            "leads": args.leads,
+            "succeeded": len(statuses) - failed,
+            "failed": failed,
+            "wall_seconds": wall_seconds,
+            "leads_per_hour": args.leads / wall_seconds * 3600 if wall_seconds else 0.0,
+            "peak_rss_mb": peak_rss_mb(),
+            "gemini_batching": agent.gemini_batching,
+            "gemini_requests": agent.transport_metrics_snapshot()["gemini"]["requests"],
+            "gemini_latency_ms": args.gemini_latency_ms,
+            "perplexity_latency_ms": args.perplexity_latency_ms,
+            "stages": stages
+        }
+    finally:
+        os.chdir(original_dir)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        server.terminate()
+
+    print(f"📊 Offline pipeline benchmark ({report['mode']}, {report['workers']} workers, "
+          f"{'staged' if report['pipeline'] else 'per-lead'} execution)")
+    print(f"Leads: {report['leads']} ({report['succeeded']} succeeded, {report['failed']} failed) "
+          f"in {report['wall_seconds']:.2f} s")
+    print(f"Throughput: {report['leads_per_hour']:.0f} leads/hour")
+    print(f"Gemini requests: {report['gemini_requests']} (batching {'on' if report['gemini_batching'] else 'off'})")
+    if report["peak_rss_mb"] is not None:
+        print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    print("\nPer-stage latency:")
+    for line in agent.format_stage_summary(stages):
+        print(f"  {line}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.json}")
+
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,8 +13,10 @@ import os
 GOOGLE_PLACES_API_KEY = os.environ.get("GOOGLE_PLACES_API_KEY", "YOUR_API_KEY_HERE")
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "YOUR_API_KEY_HERE")
 
-# API URLs
-GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={GEMINI_API_KEY}"
+# API URLs (the base URLs can be pointed at a local stand-in server, e.g. by benchmark_pipeline.py)
+GEMINI_API_BASE = os.environ.get("GEMINI_API_BASE", "https://generativelanguage.googleapis.com")
+GEMINI_API_URL = f"{GEMINI_API_BASE}/v1beta/models/gemini-2.5-flash:generateContent?key={GEMINI_API_KEY}"
+PERPLEXITY_API_URL = os.environ.get("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
 
 # Common Timeouts (in seconds)
 DEFAULT_REQUEST_TIMEOUT = 10
@@ -61,15 +63,137 @@ DEFAULT_LOCATION = "Delhi"
 GOOGLE_PLACES_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
 GOOGLE_PLACES_TEXT_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/textsearch/json"
 
-# Google Places API Fields
-PLACE_DETAILS_FIELDS = "name,website,formatted_phone_number,formatted_address,types"
+# Google Places API Fields (name and address already come from text search)
+PLACE_DETAILS_FIELDS = "website,formatted_phone_number"
 
 # Rate Limiting for Google Places API
-GOOGLE_PLACES_RATE_LIMIT_DELAY = 0.1  # 100ms delay between requests
+GOOGLE_PLACES_RATE_LIMIT_DELAY = 0.1  # Minimum spacing between Places API requests across all threads (10/s)
+GOOGLE_PLACES_DETAILS_WORKERS = 8  # Place Details requests in flight at once
+
+# Place Details Store (place_cache.py)
+PLACE_CACHE_PATH = "cache/places.sqlite3"
+PLACE_DETAILS_TTL = 90 * 24 * 3600  # Look a known place up again after 90 days
 
 # Output File
 INITIAL_LEADS_OUTPUT_FILE = "1_discovered_leads.csv"
 
+# =============================================================================
+# 2_coursera_agent.py
+# =============================================================================
+
+# Async Execution Mode (--async)
+ASYNC_MAX_CONCURRENT_LEADS = 50  # Leads in flight on the event loop at once
+ASYNC_MAX_CONNECTIONS = 200  # Total open connections across all hosts
+ASYNC_PER_HOST_LIMIT = 2  # Concurrent requests to any single crawled website
+ASYNC_GEMINI_CONCURRENCY = 20  # Concurrent Gemini calls
+ASYNC_PERPLEXITY_CONCURRENCY = 5  # Leads researching contacts at once (Perplexity requests are limited by perplexity_client.py)
+
+# Staged Lead Pipeline (pipeline.py)
+PIPELINE_ENABLED = True  # Separate worker pools for recommendation, contact research and writing
+PIPELINE_CONTACT_WORKERS = 5  # Concurrent Perplexity contact research in the threaded pipeline
+PIPELINE_WRITE_WORKERS = 1
+PIPELINE_QUEUE_SIZE = 16  # Leads waiting between two stages before the earlier stage blocks
+
+# Course Recommendation Crawl
+INCREMENTAL_RECOMMENDATION = True  # Send only the new page plus a running evidence summary each step
+RECOMMENDATION_CONFIDENCE_THRESHOLD = 80  # Stop crawling once a ready recommendation scores this high
+RECOMMENDATION_MAX_CONTEXT_CHARS = 60000  # Cap on the page text one recommendation prompt carries
+
+# Cross-Page Boilerplate Removal (text_dedup.py)
+TEXT_DEDUP_ENABLED = True  # Drop text a lead's earlier pages already had before it reaches Gemini
+TEXT_DEDUP_SHINGLE_WORDS = 8  # Words per hashed shingle; shorter repeats are kept
+TEXT_DEDUP_MIN_RUN_WORDS = 4  # Fragments shorter than this left between dropped blocks are discarded
+
+# Shared HTTP Transport (http_transport.py)
+HTTP_POOL_SIZES = {"crawl": 10, "gemini": 20, "perplexity": 10}  # Keep-alive connections per host
+HTTP_POOL_MAX_HOSTS = 200  # Crawled hosts whose connection pools are kept open
+HTTP2_ENABLED = True  # Use HTTP/2 for the API pools when httpx[http2] is installed
+
+# Perplexity Client (perplexity_client.py)
+PERPLEXITY_MAX_CONCURRENCY = 5  # Perplexity requests in flight when the API is not throttling (the plan's ceiling)
+PERPLEXITY_MAX_RETRIES = 4  # Retries of a request after 429 / 5xx responses, timeouts or connection errors
+PERPLEXITY_RETRY_BASE_DELAY = 2.0  # First back-off (seconds) when there is no Retry-After; doubles per retry
+PERPLEXITY_MAX_RETRY_AFTER = 120  # Cap on any one back-off or Retry-After wait (seconds)
+PERPLEXITY_TIMEOUT = 60
+
+# Per-Domain Politeness (politeness.py)
+POLITENESS_MIN_INTERVAL = 1.0  # Seconds between requests to one host, unless robots.txt asks for more
+POLITENESS_BURST = 2  # Requests a host may receive back-to-back before pacing kicks in
+POLITENESS_MAX_INTERVAL = 30.0  # Cap on the backed-off interval after 429/503/406 responses
+POLITENESS_MAX_RETRY_AFTER = 120  # Ignore Retry-After values longer than this (seconds)
+ROBOTS_TXT_TIMEOUT = 10
+
+# Page Download Limits (fetch_policy.py)
+FETCH_MAX_BYTES = 2 * 1024 * 1024  # Bytes of a page body read; larger pages are truncated (or skipped by Content-Length)
+FETCH_MAX_SECONDS = 20  # Time spent reading one body before keeping what has arrived
+
+# HTML Extraction (html_extract.py)
+HTML_EXTRACTION_BACKEND = "auto"  # "lxml" fast path, "bs4" reference parser, or "auto" (lxml if installed)
+
+# Keyword URL Ranker (url_ranker.py)
+URL_RANKER_ENABLED = True  # Rank crawl links with the keyword score tables; Gemini only when ambiguous
+URL_RANKER_MIN_SCORE = 6  # Links scoring below this are not followed by the ranker
+URL_RANKER_MAX_URLS = 8  # Links queued per page for the recommendation crawl
+URL_RANKER_MAX_CONTACT_URLS = 5  # Contact pages picked per lead
+
+# Sitemap Discovery (sitemap_discovery.py)
+SITEMAP_DISCOVERY_ENABLED = True  # Seed the recommendation crawl from robots.txt / sitemap.xml (MAX_URLS_PER_WEBSITE candidates kept)
+SITEMAP_MAX_FILES = 5  # Sitemaps (including children of sitemap indexes) read per lead
+SITEMAP_MAX_ENTRIES = 20000  # Sitemap entries scanned per lead
+SITEMAP_MAX_BYTES = 10 * 1024 * 1024  # Bytes read from any one sitemap
+SITEMAP_TIMEOUT = 15
+
+# Gemini Micro-Batching (gemini_batcher.py)
+GEMINI_BATCHING_ENABLED = True  # Share Gemini requests between URL-filter/classification prompts of concurrent leads
+GEMINI_BATCH_MAX_ITEMS = 8  # Prompts per batched request
+GEMINI_BATCH_MAX_CHARS = 60000  # Prompt characters per batched request; longer prompts are sent alone
+GEMINI_BATCH_WINDOW = 0.1  # Seconds a batch waits for more prompts before it is sent
+GEMINI_BATCH_TIMEOUT = 90  # Request timeout for batched prompts (seconds)
+
+# Contact Normalization (contacts.py)
+DEFAULT_PHONE_COUNTRY_CODE = "91"  # Assumed for phone numbers written without a country code
+SHARE_PARENT_DOMAIN_CONTACTS = True  # Reuse contacts researched for a sibling subdomain (home.iitd.ac.in -> dms.iitd.ac.in)
+
+# Local Contact Harvesting (contact_harvest.py)
+LOCAL_CONTACTS_ENABLED = True  # Collect contacts from the pages the recommendation crawl downloaded
+LOCAL_CONTACTS_MIN_CONTACTS = 3  # Contacts with a name or role found locally that make Perplexity research unnecessary
+LOCAL_CONTACTS_MAX = 25  # Harvested contacts kept per lead (those with a role and a name first)
+LOCAL_CONTACT_CONTEXT_CHARS = 300  # Largest block around an address searched for the person's name and role
+
+# Per-Stage Spans (stage_metrics.py)
+TRACE_ENABLED = True  # Append one JSON line per stage call (duration, bytes, tokens, retries)
+TRACE_FILE = "outputs/trace.jsonl"
+
+# Result Sink (result_sink.py)
+RESULT_SINK = "jsonl"  # "jsonl" append-only store with a domain index, or "json" (one file per domain)
+RESULTS_JSONL_PATH = "outputs/results.jsonl"
+RESULTS_INDEX_PATH = "outputs/results_index.sqlite3"
+EXPORT_DOMAIN_JSON = False  # Also write outputs/{domain}.json next to the JSONL store
+
+# Resumable Batches (run_manifest.py)
+RUN_MANIFEST_PATH = "outputs/run_manifest.sqlite3"
+
+# Persistent Page Cache (page_cache.py)
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_DIR = "cache/pages"
+PAGE_CACHE_TTL = 3 * 24 * 3600  # Serve without revalidation for 3 days, then conditional GET
+PAGE_CACHE_MAX_BYTES = 500 * 1024 * 1024  # LRU-evict beyond 500 MB of page bodies
+
+# Gemini Response Cache (llm_cache.py)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = "cache/llm_responses.sqlite3"
+LLM_CACHE_TTL = 30 * 24 * 3600  # Re-ask Gemini after 30 days
+LLM_CACHE_MAX_BYTES = 100 * 1024 * 1024  # LRU-evict beyond 100 MB of responses
+
+# =============================================================================
+# 3_output_cleaner.py
+# =============================================================================
+
+CLEANED_OUTPUTS_DIR = "cleaned_outputs"
+CLEANER_MANIFEST_PATH = "cleaned_outputs/.cleaner_manifest"  # What earlier runs already cleaned
+CLEANER_WORKERS = 8  # Per-domain JSON files cleaned in parallel
+MERGED_CONTACTS_PATH = "cleaned_outputs/contacts.csv"  # Deduplicated contacts across all leads (--merge-contacts)
+
 # =============================================================================
 # 2_website_crawler.py
 # =============================================================================
@@ -332,6 +456,16 @@ GENERAL_CLASSIFICATION_SCORES = {
     'category': -50, 'tag': -50, 'wp-login': -50, 'admin': -50
 }
 
+# contact_harvest.py: roles that mark a block's email / phone as a person's contact
+CONTACT_ROLE_KEYWORDS = [
+    "Head of Department", "HOD", "Head of the Department", "Dean", "Principal", "Vice Principal", "Director",
+    "Vice Chancellor", "Registrar", "Professor", "Associate Professor", "Assistant Professor", "Coordinator",
+    "Training and Placement Officer", "Training & Placement Officer", "Placement Officer", "TPO",
+    "Head of Sales", "Sales Head", "Sales Manager", "Business Development", "Marketing Manager",
+    "HR Manager", "Head of HR", "Human Resources", "Learning & Development", "L&D", "Training Manager",
+    "CEO", "Chief Executive Officer", "CTO", "Chief Technology Officer", "Founder", "Managing Director", "Admissions Officer"
+]
+
 # 5_top_5_urls_for_contact_info_extractor.py
 PROGRAMMING_KEYWORD_SCORES = {
     # Tier 1 (Score 10): Direct Contact & High-Value Departments
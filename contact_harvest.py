@@ -0,0 +1,267 @@
+"""
+Contact harvesting from the pages the recommendation crawl of 2_coursera_agent.py has
+already downloaded, without any API call.
+
+Each page's HTML is searched for:
+
+    - mailto: and tel: links
+    - schema.org JSON-LD: Person (name, jobTitle, email, telephone), organizations'
+      email / telephone and their contactPoint entries
+    - hCard microformats (class="vcard" / "h-card")
+    - emails written in the text, including "name [at] college [dot] ac [dot] in"
+    - phone numbers written next to a role keyword (CONTACT_ROLE_KEYWORDS: HOD, TPO,
+      Dean, Head of Sales, ...) or a phone label
+
+A link or address is attributed to its surrounding block, the largest enclosing
+element of at most LOCAL_CONTACT_CONTEXT_CHARS characters (a faculty card, a table
+row, a paragraph), which supplies the person's name and role. Contacts are tagged
+"source": "crawled_pages" (so they are never shared as research with sibling
+subdomains) and merged with contacts.ContactIndex. Once LOCAL_CONTACTS_MIN_CONTACTS of them have a name or a role,
+the lead's Perplexity research is skipped.
+"""
+
+import json
+import re
+from urllib.parse import unquote, urlparse
+
+from bs4 import BeautifulSoup
+
+# lxml is optional; it makes BeautifulSoup parse faster
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+from constants import (
+    CONTACT_ROLE_KEYWORDS, LOCAL_CONTACTS_MIN_CONTACTS, LOCAL_CONTACTS_MAX, LOCAL_CONTACT_CONTEXT_CHARS
+)
+from contacts import ContactIndex, EMAIL_PATTERN, CRAWLED_PAGES
+
+ROLE_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(role) for role in CONTACT_ROLE_KEYWORDS) + r")\b", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"\+?\(?\d[\d\s().-]{6,18}\d")
+PHONE_LABEL_PATTERN = re.compile(r"\b(?:phone|tel|telephone|mobile|mob|ph|call|contact)\b", re.IGNORECASE)
+HONORIFIC = r"\b(?:Dr|Prof|Mr|Mrs|Ms|Shri|Smt|Sr|Fr)\b\.?"
+NAME_PATTERN = re.compile(HONORIFIC + r"\s+[A-Z][\w'.-]*(?:\s+(?!" + HONORIFIC + r"\s)[A-Z][\w'.-]*){0,3}")
+OBFUSCATED_EMAIL_PATTERN = re.compile(
+    r"([\w.+-]+)\s*[\[({]\s*at\s*[\])}]\s*([\w-]+(?:\s*(?:[\[({]\s*dot\s*[\])}]|\.)\s*[\w-]+)+)", re.IGNORECASE
+)
+DOT_PATTERN = re.compile(r"\s*(?:[\[({]\s*dot\s*[\])}]|\.)\s*", re.IGNORECASE)
+
+# Elements whose text is not shown on the page
+HIDDEN_TAGS = ("script", "style", "noscript", "template")
+HEADING_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6", "strong", "b", "dt", "th")
+# Words that end a name when they follow it, or show a heading names an organization
+LABEL_WORDS = {"phone", "tel", "telephone", "mobile", "mob", "ph", "email", "e-mail", "mail", "fax", "contact", "office"}
+ORGANIZATION_WORDS = {"school", "college", "institute", "university", "department", "academy", "ltd", "pvt",
+                      "limited", "solutions", "technologies", "services", "company", "foundation", "trust", "secondary"}
+PERSON_TYPES = {"Person"}
+CONTACT_POINT_TYPES = {"ContactPoint"}
+
+
+def deobfuscate(text):
+    """Rewrite "name [at] college [dot] ac [dot] in" as name@college.ac.in"""
+    return OBFUSCATED_EMAIL_PATTERN.sub(lambda match: f"{match.group(1)}@{DOT_PATTERN.sub('.', match.group(2))}", text)
+
+
+def looks_like_name(text):
+    """2-5 capitalized words without digits, role keywords or organization words"""
+    words = text.split()
+    return (2 <= len(words) <= 5 and len(text) <= 60 and not any(char.isdigit() for char in text)
+            and all(word[0].isupper() for word in words) and not ROLE_PATTERN.search(text) and "@" not in text
+            and not ORGANIZATION_WORDS & {word.strip(".,'").lower() for word in words})
+
+
+def honorific_name(text):
+    """The first "Dr. / Prof. / Mr. ..." name in text, without a trailing role or label such as "HOD" or "Phone", or "" """
+    for match in NAME_PATTERN.finditer(text):
+        words = match.group().split()
+        # "Dr. Anita Sharma HOD": the role after the name is not part of it
+        for position in range(2, len(words)):
+            if ROLE_PATTERN.match(" ".join(words[position:])):
+                words = words[:position]
+                break
+        while words and words[-1].strip(".:").lower() in LABEL_WORDS:
+            words.pop()
+        name = " ".join(words)
+        if len(words) >= 2 and not ORGANIZATION_WORDS & {word.strip(".,'").lower() for word in words}:
+            return name
+    return ""
+
+
+def link_target(href, scheme):
+    """The address of a mailto: or tel: link, or "" """
+    if not href.lower().startswith(scheme):
+        return ""
+    return unquote(href[len(scheme):].split("?")[0]).strip()
+
+
+def contact(name="", title="", emails=(), phones=()):
+    return {"name": name or "", "title": title or "", "email": ", ".join(emails), "phone": ", ".join(phones),
+            "source": CRAWLED_PAGES}
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def json_ld_contacts(node, found):
+    """Walk a JSON-LD document, collecting Person, organization and ContactPoint contacts"""
+    if isinstance(node, list):
+        for item in node:
+            json_ld_contacts(item, found)
+        return
+    if not isinstance(node, dict):
+        return
+    types = {str(kind) for kind in as_list(node.get("@type"))}
+    emails = [str(email).replace("mailto:", "") for email in as_list(node.get("email"))]
+    phones = [str(phone) for phone in as_list(node.get("telephone"))]
+    if emails or phones:
+        if types & PERSON_TYPES:
+            found.append(contact(node.get("name"), node.get("jobTitle"), emails, phones))
+        elif types & CONTACT_POINT_TYPES:
+            found.append(contact(title=node.get("contactType"), emails=emails, phones=phones))
+        else:
+            # An organization's general email / telephone
+            found.append(contact(emails=emails, phones=phones))
+    for key, value in node.items():
+        if isinstance(value, (dict, list)) and key != "@context":
+            json_ld_contacts(value, found)
+
+
+def hcard_contacts(soup):
+    """Contacts marked up as hCards (classic vcard or microformats2 h-card)"""
+    found = []
+    for card in soup.select(".vcard, .h-card"):
+        def field(*classes):
+            element = card.select_one(", ".join(f".{name}" for name in classes))
+            return element.get_text(" ", strip=True) if element else ""
+        emails = [link_target(link.get("href", ""), "mailto:") for link in card.select("a[href^='mailto:']")]
+        emails = [email for email in emails if email] or [field("email", "u-email")]
+        phones = [field("tel", "p-tel")]
+        found.append(contact(field("fn", "p-name"), field("title", "role", "p-job-title"),
+                             [email for email in emails if email], [phone for phone in phones if phone]))
+    return found
+
+
+class BlockFinder:
+    """Largest enclosing element of at most LOCAL_CONTACT_CONTEXT_CHARS characters, with memoized text lengths"""
+
+    def __init__(self, max_chars=LOCAL_CONTACT_CONTEXT_CHARS):
+        self.max_chars = max_chars
+        self.lengths = {}
+
+    def length(self, element):
+        key = id(element)
+        if key not in self.lengths:
+            self.lengths[key] = len(element.get_text(" ", strip=True))
+        return self.lengths[key]
+
+    def block(self, element):
+        block = element
+        while block.parent is not None and block.parent.name not in ("body", "html", "[document]"):
+            if self.length(block.parent) > self.max_chars:
+                break
+            block = block.parent
+        return block
+
+
+def block_name(block, text, link_texts):
+    """A person's name in a block: after an honorific, in a heading, or as a mailto link's text"""
+    name = honorific_name(text)
+    if name:
+        return name
+    for candidate in [heading.get_text(" ", strip=True) for heading in block.find_all(HEADING_TAGS)] + link_texts:
+        if looks_like_name(candidate):
+            return candidate
+    return ""
+
+
+def block_contacts(block):
+    """Contacts in one context block: one per email, or one for its phone numbers"""
+    text = deobfuscate(" ".join(block.get_text(" ", strip=True).split()))
+    links = block.find_all("a", href=True) if block.name != "a" else [block]
+    mailtos = [(link_target(link["href"], "mailto:"), link.get_text(" ", strip=True)) for link in links]
+    mailtos = [(email, label) for email, label in mailtos if email]
+    tels = [link_target(link["href"], "tel:") for link in links]
+    link_texts = [label for _, label in mailtos]
+
+    emails = list(dict.fromkeys([email for email, _ in mailtos] + EMAIL_PATTERN.findall(text)))
+    label_text = EMAIL_PATTERN.sub(" ", text)
+    role = ROLE_PATTERN.search(label_text)
+    phones = [tel for tel in tels if tel]
+    if role or PHONE_LABEL_PATTERN.search(label_text):
+        phones += [match.group() for match in PHONE_PATTERN.finditer(label_text)]
+    if not emails and not phones:
+        return []
+
+    if len(emails) <= 1:
+        return [contact(block_name(block, text, link_texts), role.group() if role else "", emails, phones)]
+
+    # Several people in one block: name and role come from the text before each address
+    found, start = [], 0
+    for email in emails:
+        position = text.find(email, start)
+        segment = text[start:position] if position >= 0 else ""
+        start = position + len(email) if position >= 0 else start
+        segment_role = ROLE_PATTERN.search(segment)
+        found.append(contact(honorific_name(segment), segment_role.group() if segment_role else "", [email]))
+    return found
+
+
+def harvest_page(content):
+    """Contacts found on one page's HTML"""
+    soup = BeautifulSoup(content, PARSER)
+    found = []
+    for script in soup.find_all("script", type=re.compile("ld\\+json", re.IGNORECASE)):
+        try:
+            json_ld_contacts(json.loads(script.string or ""), found)
+        except ValueError:
+            continue
+    found += hcard_contacts(soup)
+
+    for element in soup(list(HIDDEN_TAGS)):
+        element.decompose()
+
+    finder = BlockFinder()
+    blocks = {}
+    for link in soup.find_all("a", href=True):
+        if link_target(link["href"], "mailto:") or link_target(link["href"], "tel:"):
+            block = finder.block(link)
+            blocks.setdefault(id(block), block)
+    for string in soup.find_all(string=True):
+        if string.parent is None:
+            continue
+        if "@" in string or ROLE_PATTERN.search(string) or OBFUSCATED_EMAIL_PATTERN.search(string):
+            block = finder.block(string.parent)
+            blocks.setdefault(id(block), block)
+    for block in blocks.values():
+        found += block_contacts(block)
+    return found
+
+
+class ContactHarvest:
+    """Contacts collected from one lead's crawled pages"""
+
+    def __init__(self):
+        self.index = ContactIndex()
+        self.pages = 0
+
+    def add_page(self, url, content):
+        """Harvest a page; returns the number of contacts found on it"""
+        found = harvest_page(content)
+        self.pages += 1
+        self.index.add_all(found, urlparse(url).netloc)
+        return len(found)
+
+    def contacts(self):
+        """Merged contacts, those with a role and a name first, at most LOCAL_CONTACTS_MAX"""
+        contacts = self.index.contacts()
+        contacts.sort(key=lambda found: (not found["title"], not found["name"]))
+        return contacts[:LOCAL_CONTACTS_MAX]
+
+    def enough(self):
+        """True when enough contacts name a person or a role to skip Perplexity"""
+        return sum(1 for entry in self.index.entries if entry["name"] or entry["title"]) >= LOCAL_CONTACTS_MIN_CONTACTS
@@ -0,0 +1,259 @@
+"""
+Contact normalization and deduplication for lead results.
+
+Gemini's contact extraction returns placeholder values ("Not Found", "N/A"), the same
+person twice, and phone numbers in whatever format the website used. Here contacts
+get canonical forms:
+
+    email -> lowercased addresses found in the field, comma-separated
+    phone -> "+<country code><number>" per number (Indian formats assumed), comma-separated
+    name / title -> placeholders become ""
+
+and are merged through hash indexes on email, phone and name + parent domain, so one
+pass over any number of results is O(n). Parent domains (iitd.ac.in for
+home.iitd.ac.in and dms.iitd.ac.in) also let 2_coursera_agent.py share contacts
+researched for one subdomain with its siblings looking for the same course
+(ContactDirectory). Contacts harvested from a lead's own pages are tagged with
+"source": CRAWLED_PAGES and are never shared.
+"""
+
+import ipaddress
+import re
+import threading
+
+from constants import DEFAULT_PHONE_COUNTRY_CODE
+from result_sink import OK
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+PLACEHOLDERS = {"", "-", "na", "n/a", "none", "null", "unknown", "not found", "not available", "not specified"}
+HONORIFICS = {"dr", "prof", "mr", "mrs", "ms", "shri", "smt"}
+# "source" of contacts harvested from a lead's crawled pages rather than researched
+CRAWLED_PAGES = "crawled_pages"
+
+# Second-level suffixes under which the registrable domain has three labels
+TWO_LABEL_SUFFIXES = {
+    "ac.in", "edu.in", "co.in", "org.in", "gov.in", "net.in", "res.in", "nic.in", "ernet.in",
+    "co.uk", "ac.uk", "org.uk", "com.au", "edu.au", "co.nz", "com.sg", "edu.sg"
+}
+
+
+def parent_domain(domain):
+    """Registrable domain of a host, e.g. dms.iitd.ac.in -> iitd.ac.in (IP addresses keep their port)"""
+    host = domain.lower().split(":")[0].strip(".")
+    try:
+        ipaddress.ip_address(host)
+        return domain.lower()
+    except ValueError:
+        pass
+    if host.startswith("www."):
+        host = host[4:]
+    labels = host.split(".")
+    keep = 3 if ".".join(labels[-2:]) in TWO_LABEL_SUFFIXES else 2
+    return ".".join(labels[-keep:])
+
+
+def clean_text(value):
+    """Stripped text, or "" for missing and placeholder values"""
+    if not isinstance(value, str):
+        return ""
+    value = " ".join(value.split())
+    return "" if value.lower() in PLACEHOLDERS else value
+
+
+def normalize_emails(value):
+    """Lowercased, de-duplicated addresses in an email field"""
+    if not isinstance(value, str):
+        return []
+    return list(dict.fromkeys(email.lower() for email in EMAIL_PATTERN.findall(value)))
+
+
+def normalize_phone_number(text, country_code=DEFAULT_PHONE_COUNTRY_CODE):
+    """Canonical form of one phone number, or None if it is too short to be one"""
+    digits = re.sub(r"\D", "", text)
+    if len(digits) < 7:
+        return None
+    if text.lstrip(" (").startswith("+"):
+        return "+" + digits
+    if len(digits) == 10 and digits[0] in "6789":
+        # Mobile number without country code
+        return f"+{country_code}{digits}"
+    if digits.startswith("0") and not digits.startswith("00") and len(digits) == 11:
+        # Landline with trunk prefix (080-26993894)
+        return f"+{country_code}{digits[1:]}"
+    if digits.startswith(country_code) and len(digits) == len(country_code) + 10:
+        return "+" + digits
+    return digits
+
+
+def normalize_phones(value, country_code=DEFAULT_PHONE_COUNTRY_CODE):
+    """Canonical, de-duplicated numbers in a phone field ("a / b", "a, b" and "a or b" hold several)"""
+    if not isinstance(value, str):
+        return []
+    numbers = (normalize_phone_number(part, country_code) for part in re.split(r"[,/;]|\bor\b", value))
+    return list(dict.fromkeys(number for number in numbers if number))
+
+
+def name_key(name):
+    """Case-, punctuation- and honorific-insensitive form of a person's name"""
+    words = re.sub(r"[^\w\s]", " ", name.lower()).split()
+    return " ".join(word for word in words if word not in HONORIFICS)
+
+
+def normalize_contact(contact):
+    """Canonical copy of a contact dict, or None if it has neither an email nor a phone"""
+    if not isinstance(contact, dict):
+        return None
+    emails = normalize_emails(contact.get("email"))
+    phones = normalize_phones(contact.get("phone"))
+    if not emails and not phones:
+        return None
+    return {
+        **contact,
+        "name": clean_text(contact.get("name")),
+        "title": clean_text(contact.get("title")),
+        "email": ", ".join(emails),
+        "phone": ", ".join(phones)
+    }
+
+
+class ContactIndex:
+    """
+    Merged contacts with hash indexes on email, phone and (name, parent domain).
+
+    A contact is merged into an earlier one sharing an email address or a name at the
+    same parent domain. A phone number alone only merges contacts that have neither a
+    name nor an email, since one switchboard number often serves several people.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.by_email = {}
+        self.by_phone = {}
+        self.by_name = {}
+
+    def add(self, contact, domain=""):
+        """Normalize and merge one contact; returns its merged entry, or None if it was dropped"""
+        contact = normalize_contact(contact)
+        if contact is None:
+            return None
+        emails = contact["email"].split(", ") if contact["email"] else []
+        phones = contact["phone"].split(", ") if contact["phone"] else []
+        key = (name_key(contact["name"]), parent_domain(domain)) if contact["name"] else None
+
+        entry = next((self.by_email[email] for email in emails if email in self.by_email), None)
+        if entry is None and key:
+            entry = self.by_name.get(key)
+        if entry is None and not emails and not key:
+            entry = next((self.by_phone[phone] for phone in phones if phone in self.by_phone), None)
+
+        if entry is None:
+            entry = {**contact, "emails": [], "phones": [], "domains": []}
+            self.entries.append(entry)
+        else:
+            for field in ("name", "title"):
+                if not entry[field]:
+                    entry[field] = contact[field]
+        for email in emails:
+            if email not in entry["emails"]:
+                entry["emails"].append(email)
+            self.by_email.setdefault(email, entry)
+        for phone in phones:
+            if phone not in entry["phones"]:
+                entry["phones"].append(phone)
+            self.by_phone.setdefault(phone, entry)
+        if entry["name"]:
+            self.by_name.setdefault((name_key(entry["name"]), parent_domain(domain)), entry)
+        if domain and domain not in entry["domains"]:
+            entry["domains"].append(domain)
+        return entry
+
+    def add_all(self, contacts, domain=""):
+        for contact in contacts or []:
+            self.add(contact, domain)
+
+    def contacts(self, with_domains=False):
+        """The merged contacts in first-seen order, in the result file's contact format"""
+        merged = []
+        for entry in self.entries:
+            contact = {key: value for key, value in entry.items() if key not in ("emails", "phones", "domains")}
+            contact["email"] = ", ".join(entry["emails"])
+            contact["phone"] = ", ".join(entry["phones"])
+            if with_domains:
+                contact["domains"] = list(entry["domains"])
+            merged.append(contact)
+        return merged
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def dedupe_contacts(contacts, domain=""):
+    """Normalized contacts of one lead with placeholders dropped and duplicates merged"""
+    index = ContactIndex()
+    index.add_all(contacts, domain)
+    return index.contacts()
+
+
+def researched_contacts(contacts):
+    """The contacts that were researched, i.e. not harvested from a lead's crawled pages"""
+    return [contact for contact in contacts if contact.get("source") != CRAWLED_PAGES]
+
+
+class ContactDirectory:
+    """
+    Thread-safe record of which (parent domain, recommended course) pairs already have
+    researched contacts.
+
+    claim() tells a lead whether a sibling subdomain's contacts for the same course can
+    be reused, whether it should research them itself (and record() the outcome), or
+    whether a sibling is researching right now and the lead should wait for it. Works
+    with threading.Event and asyncio.Event alike; the caller passes the event factory.
+    Harvested contacts (CRAWLED_PAGES) are left out of what is recorded.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.researched = {}
+        self.in_flight = {}
+
+    def seed(self, results):
+        """Remember the contacts of earlier (domain, status, result) records; returns how many keys have some"""
+        for domain, status, result in results:
+            result = result or {}
+            contact_info = result.get("contact_info") or {}
+            contacts = contact_info.get("contacts") if contact_info.get("source") != CRAWLED_PAGES else None
+            course = (result.get("course_recommendation") or {}).get("recommended_course", "Unknown")
+            if status == OK and isinstance(contacts, list):
+                self.record(domain, course, dedupe_contacts(contacts, domain))
+        return len(self.researched)
+
+    def claim(self, domain, course, new_event):
+        """
+        One of ("shared", (source domain, contacts)), ("research", None) or ("wait", event).
+
+        A lead never reuses its own earlier contacts (a retried or forced lead is researched again).
+        """
+        key = (parent_domain(domain), course)
+        with self.lock:
+            source = self.researched.get(key)
+            if source and source[0] != domain:
+                return "shared", source
+            if key in self.in_flight:
+                return "wait", self.in_flight[key][1]
+            self.in_flight[key] = (domain, new_event())
+            return "research", None
+
+    def record(self, domain, course, contacts):
+        """Store a lead's researched contacts (when there are any) and release leads waiting on the same key"""
+        key = (parent_domain(domain), course)
+        contacts = researched_contacts(contacts)
+        with self.lock:
+            if contacts:
+                self.researched[key] = (domain, contacts)
+            owner = self.in_flight.get(key)
+            if owner and owner[0] == domain:
+                del self.in_flight[key]
+            else:
+                owner = None
+        if owner:
+            owner[1].set()
@@ -0,0 +1,94 @@
+"""
+Limits on what the crawl in 2_coursera_agent.py downloads.
+
+    - links to files of a known non-HTML type (.pdf, .jpg, .zip, ...) outside
+      ALLOWED_WEB_EXTENSIONS are never requested
+    - responses are streamed: a non-HTML Content-Type or a Content-Length above
+      FETCH_MAX_BYTES ends the request before the body is read
+    - a body is read until FETCH_MAX_BYTES or FETCH_MAX_SECONDS, and the part read so
+      far is kept (HTML parsers cope with a truncated page), so one huge or slowly
+      trickling page cannot stall a worker
+    - Accept-Encoding only lists the content codings the HTTP clients can decode
+"""
+
+import mimetypes
+import os
+import time
+from urllib.parse import urlparse
+
+from urllib3.util.request import ACCEPT_ENCODING as URLLIB3_ACCEPT_ENCODING
+
+from constants import ALLOWED_WEB_EXTENSIONS, FETCH_MAX_BYTES, FETCH_MAX_SECONDS
+
+# aiohttp is only needed for the async execution mode
+try:
+    from aiohttp import compression_utils
+except ImportError:
+    compression_utils = None
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Bytes read from a response at a time
+CHUNK_SIZE = 64 * 1024
+
+
+def decodable_encodings():
+    """Content codings both requests (urllib3) and aiohttp can decode here"""
+    encodings = [encoding.strip() for encoding in URLLIB3_ACCEPT_ENCODING.split(",") if encoding.strip()]
+    if compression_utils is not None:
+        # br and zstd depend on optional packages, which each client checks for itself
+        unsupported = {"br": not getattr(compression_utils, "HAS_BROTLI", False),
+                       "zstd": not getattr(compression_utils, "HAS_ZSTD", False)}
+        encodings = [encoding for encoding in encodings if not unsupported.get(encoding)]
+    return encodings
+
+
+ACCEPT_ENCODING = ", ".join(decodable_encodings())
+
+
+def crawlable_url(url):
+    """False for links to files of a known type that is not a web page"""
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    if not extension or extension in ALLOWED_WEB_EXTENSIONS:
+        return True
+    # Unknown "extensions" (/people/dr.smith) are left to the Content-Type check
+    content_type, _ = mimetypes.guess_type(f"file{extension}")
+    return content_type is None or content_type in HTML_CONTENT_TYPES
+
+
+def rejection_reason(headers):
+    """Why a 200 response's body should not be downloaded, or None"""
+    content_type = headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        return f"not HTML ({content_type})"
+    try:
+        length = int(headers.get("Content-Length", ""))
+    except ValueError:
+        return None
+    if length > FETCH_MAX_BYTES:
+        return f"too large ({length // 1024} KB)"
+    return None
+
+
+class BodyBudget:
+    """Collects response chunks until FETCH_MAX_BYTES or FETCH_MAX_SECONDS is reached"""
+
+    def __init__(self, max_bytes=FETCH_MAX_BYTES, max_seconds=FETCH_MAX_SECONDS):
+        self.max_bytes = max_bytes
+        self.deadline = time.monotonic() + max_seconds
+        self.chunks = []
+        self.size = 0
+        self.truncated = False
+
+    def add(self, chunk):
+        """Keep a chunk; returns False once the rest of the body should be skipped"""
+        chunk = chunk[:self.max_bytes - self.size]
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        if self.size >= self.max_bytes or time.monotonic() >= self.deadline:
+            self.truncated = True
+            return False
+        return True
+
+    def body(self):
+        return b"".join(self.chunks)
@@ -0,0 +1,277 @@
+"""
+Micro-batching of small Gemini prompts across concurrent leads for 2_coursera_agent.py.
+
+URL-filter and classification prompts are short, so sending each one on its own spends
+most of the per-request overhead and the requests-per-minute budget on tiny calls. The
+batchers collect the prompts submitted by concurrent leads (worker threads or asyncio
+tasks) for up to GEMINI_BATCH_WINDOW seconds, or until GEMINI_BATCH_MAX_ITEMS prompts /
+GEMINI_BATCH_MAX_CHARS characters are pending, and send them as one multi-task prompt:
+
+    === TASK t1 ===
+    <first prompt>
+    === TASK t2 ===
+    <second prompt>
+
+Gemini answers {"answers": [{"id": "t1", "answer": {...}}, ...]} and every caller gets
+back its own answer as JSON text, exactly as if it had sent its prompt alone.
+
+    - a batch of one is sent as the plain prompt
+    - a prompt at least GEMINI_BATCH_MAX_CHARS long is never batched
+    - tasks missing from (or unparseable in) the batched answer are re-sent individually
+    - an HTTP error of the batch request is raised in every caller of that batch
+
+Bytes and token usage of a batch request are apportioned to its callers by prompt size.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+
+from constants import GEMINI_BATCH_MAX_ITEMS, GEMINI_BATCH_MAX_CHARS, GEMINI_BATCH_WINDOW
+
+TASK_HEADER = "=== TASK {task_id} ==="
+TASK_HEADER_PATTERN = re.compile(r"^=== TASK (t\d+) ===$", re.MULTILINE)
+
+BATCH_PROMPT_TEMPLATE = """
+    You will receive {count} independent tasks, each starting with a line "=== TASK <id> ===".
+    Complete every task on its own, exactly as its instructions say, without letting the other tasks influence it.
+
+    Return only valid JSON, no additional text, with this structure:
+    {{"answers": [{{"id": "<task id>", "answer": <the JSON object that task asks you to return>}}, ...]}}
+    Include one entry for every task id.
+
+{tasks}
+    """
+
+
+def build_batch_prompt(prompts):
+    """One prompt holding every prompt as a numbered task"""
+    tasks = "\n".join(f"{TASK_HEADER.format(task_id=f't{i}')}\n{prompt.strip()}" for i, prompt in enumerate(prompts, 1))
+    return BATCH_PROMPT_TEMPLATE.format(count=len(prompts), tasks=tasks)
+
+
+def split_batch_prompt(prompt):
+    """[(task id, task prompt), ...] of a batched prompt, or None for a plain prompt"""
+    headers = list(TASK_HEADER_PATTERN.finditer(prompt))
+    if not headers:
+        return None
+    tasks = []
+    for header, following in zip(headers, headers[1:] + [None]):
+        end = following.start() if following else len(prompt)
+        tasks.append((header.group(1), prompt[header.end():end].strip()))
+    return tasks
+
+
+def split_batch_answer(content, count):
+    """Per-task answer texts (JSON) of a batched answer; None for tasks without a usable answer"""
+    answers = [None] * count
+    try:
+        entries = json.loads(content).get("answers", [])
+    except (TypeError, ValueError, AttributeError):
+        return answers
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        task_id, answer = entry.get("id"), entry.get("answer")
+        if not (isinstance(task_id, str) and task_id[1:].isdigit()) or answer is None:
+            continue
+        index = int(task_id[1:]) - 1
+        if 0 <= index < count:
+            answers[index] = answer if isinstance(answer, str) else json.dumps(answer)
+    return answers
+
+
+def share_usage(usage, prompts):
+    """Split a batch request's usage counters between its prompts in proportion to their size"""
+    total = sum(len(prompt) for prompt in prompts) or 1
+    return [
+        {name: round(value * len(prompt) / total) for name, value in usage.items()}
+        for prompt in prompts
+    ]
+
+
+class BatchJob:
+    """One submitted prompt and, once its batch has been sent, the outcome"""
+
+    def __init__(self, prompt):
+        self.prompt = prompt
+        self.content = None
+        self.usage = {}
+        self.error = None
+        self.resend = False
+        self.batch_size = 1
+
+
+def settle_batch(jobs, content, usage):
+    """Hand every job of a multi-task batch its answer and usage share (or flag it for resending)"""
+    answers = split_batch_answer(content, len(jobs))
+    for job, answer, job_usage in zip(jobs, answers, share_usage(usage, [job.prompt for job in jobs])):
+        job.batch_size = len(jobs)
+        job.usage = job_usage
+        job.content = answer
+        job.resend = answer is None
+
+
+class Batch:
+    """Jobs collected for one request, plus the thread that will send it"""
+
+    def __init__(self):
+        self.jobs = []
+        self.chars = 0
+        self.closed = False
+        self.done = threading.Event()
+
+    def fits(self, prompt, max_items, max_chars):
+        return not self.closed and len(self.jobs) < max_items and self.chars + len(prompt) <= max_chars
+
+    def add(self, job):
+        self.jobs.append(job)
+        self.chars += len(job.prompt)
+
+
+class GeminiBatcher:
+    """
+    Thread-based batcher for the worker-pool execution mode.
+
+    The first thread to submit into an empty batch leads it: it waits out the window
+    (or until the batch fills up), sends the batch and wakes the other submitters.
+    """
+
+    def __init__(self, send, max_items=GEMINI_BATCH_MAX_ITEMS, max_chars=GEMINI_BATCH_MAX_CHARS,
+                 window=GEMINI_BATCH_WINDOW):
+        # send(prompt) -> (answer text or None, usage counters)
+        self.send = send
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self.window = window
+        self.lock = threading.Lock()
+        self.batch_closed = threading.Condition(self.lock)
+        self.open_batch = None
+
+    def submit(self, prompt):
+        """Answer a prompt, batched with concurrent ones; returns (content, usage, batch size)"""
+        if len(prompt) >= self.max_chars:
+            content, usage = self.send(prompt)
+            return content, usage, 1
+
+        job = BatchJob(prompt)
+        with self.lock:
+            batch = self.open_batch
+            leader = batch is None or not batch.fits(prompt, self.max_items, self.max_chars)
+            if leader:
+                if batch is not None:
+                    # The open batch is full for this prompt; let its leader send it now
+                    batch.closed = True
+                    self.batch_closed.notify_all()
+                batch = self.open_batch = Batch()
+            batch.add(job)
+            if len(batch.jobs) >= self.max_items:
+                batch.closed = True
+                self.batch_closed.notify_all()
+
+            if leader:
+                deadline = time.monotonic() + self.window
+                while not batch.closed and (remaining := deadline - time.monotonic()) > 0:
+                    self.batch_closed.wait(remaining)
+                batch.closed = True
+                if self.open_batch is batch:
+                    self.open_batch = None
+
+        if leader:
+            self.run(batch)
+        else:
+            batch.done.wait()
+
+        if job.error is not None:
+            raise job.error
+        if job.resend:
+            content, usage = self.send(prompt)
+            return content, usage, 1
+        return job.content, job.usage, job.batch_size
+
+    def run(self, batch):
+        """Send a closed batch and record every job's outcome"""
+        jobs = batch.jobs
+        try:
+            if len(jobs) == 1:
+                jobs[0].content, jobs[0].usage = self.send(jobs[0].prompt)
+            else:
+                content, usage = self.send(build_batch_prompt([job.prompt for job in jobs]))
+                settle_batch(jobs, content, usage)
+        except Exception as e:
+            for job in jobs:
+                job.error = e
+        finally:
+            batch.done.set()
+
+
+class AsyncGeminiBatcher:
+    """asyncio batcher for the --async execution mode; the window is a loop timer"""
+
+    def __init__(self, send, max_items=GEMINI_BATCH_MAX_ITEMS, max_chars=GEMINI_BATCH_MAX_CHARS,
+                 window=GEMINI_BATCH_WINDOW):
+        # send(prompt) is a coroutine returning (answer text or None, usage counters)
+        self.send = send
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self.window = window
+        self.pending = []
+        self.pending_chars = 0
+        self.timer = None
+        self.tasks = set()
+
+    async def submit(self, prompt):
+        """Answer a prompt, batched with concurrent ones; returns (content, usage, batch size)"""
+        if len(prompt) >= self.max_chars:
+            content, usage = await self.send(prompt)
+            return content, usage, 1
+
+        if self.pending and self.pending_chars + len(prompt) > self.max_chars:
+            self.flush()
+        job = BatchJob(prompt)
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((job, future))
+        self.pending_chars += len(prompt)
+        if len(self.pending) >= self.max_items:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+        await future
+        if job.error is not None:
+            raise job.error
+        if job.resend:
+            content, usage = await self.send(prompt)
+            return content, usage, 1
+        return job.content, job.usage, job.batch_size
+
+    def flush(self):
+        """Close the pending batch and send it in the background"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        batch, self.pending, self.pending_chars = self.pending, [], 0
+        task = asyncio.get_running_loop().create_task(self.run(batch))
+        # Keep a reference so the task is not garbage-collected mid-flight
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run(self, batch):
+        jobs = [job for job, _ in batch]
+        try:
+            if len(jobs) == 1:
+                jobs[0].content, jobs[0].usage = await self.send(jobs[0].prompt)
+            else:
+                content, usage = await self.send(build_batch_prompt([job.prompt for job in jobs]))
+                settle_batch(jobs, content, usage)
+        except Exception as e:
+            for job in jobs:
+                job.error = e
+        finally:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
@@ -0,0 +1,126 @@
+"""
+Pluggable HTML extraction backends for 2_coursera_agent.py.
+
+Every backend turns raw page bytes into (text, links, anchor_texts): the visible text
+with script/style/nav/footer/header removed and whitespace collapsed, the unique
+same-domain links in page order, and the anchor text of each link (used by
+url_ranker.py to rank links without an LLM call).
+
+    bs4   -> BeautifulSoup with html.parser (the reference behaviour)
+    lxml  -> libxml2 tree built in C; text and anchors are pulled in one pass,
+             several times faster than bs4 on large pages
+    auto  -> lxml when installed, otherwise bs4
+
+Both backends decode bytes the same way (bs4's UnicodeDammit), and the lxml
+backend falls back to bs4 on documents libxml2 cannot parse, so results match.
+benchmark_html_extraction.py checks this on a corpus and reports pages per second.
+"""
+
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+
+# lxml is optional; it enables the fast extraction path
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+from constants import HTML_EXTRACTION_BACKEND
+
+# Elements whose text is page chrome or code rather than content
+REMOVED_TAGS = ("script", "style", "nav", "footer", "header")
+
+
+def clean_text(text):
+    """Strip every line, split on double spaces and join the pieces with single spaces"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def same_domain_links(url, anchors):
+    """
+    Resolve (href, anchor text) pairs against url.
+
+    Returns the unique same-domain URLs in page order and a dict of each URL's first
+    non-empty anchor text (whitespace collapsed).
+    """
+    base_domain = urlparse(url).netloc
+    links = []
+    anchor_texts = {}
+    for href, text in anchors:
+        full_url = urljoin(url, href)
+        if urlparse(full_url).netloc == base_domain:
+            links.append(full_url)
+            text = ' '.join(text.split())
+            if text and full_url not in anchor_texts:
+                anchor_texts[full_url] = text
+    return list(dict.fromkeys(links)), anchor_texts
+
+
+def extract_with_bs4(url, content):
+    """Reference backend: BeautifulSoup tree with html.parser"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Collect links before stripping nav/header/footer, which hold most of them
+    links, anchor_texts = same_domain_links(
+        url, ((link['href'], link.get_text(" ")) for link in soup.find_all('a', href=True))
+    )
+
+    for element in soup(list(REMOVED_TAGS)):
+        element.decompose()
+
+    return clean_text(soup.get_text()), links, anchor_texts
+
+
+def extract_with_lxml(url, content):
+    """Fast backend: one libxml2 parse, anchors and visible text read straight off the tree"""
+    markup = content
+    if isinstance(content, bytes):
+        markup = UnicodeDammit(content, is_html=True).unicode_markup or ""
+    try:
+        root = lxml_html.document_fromstring(markup)
+    except (etree.ParserError, ValueError):
+        # Empty documents or markup libxml2 rejects (e.g. an XML encoding declaration)
+        return extract_with_bs4(url, content)
+
+    anchors = []
+    removed = []
+    # bs4's get_text also skips <template> contents, which are never rendered
+    for element in root.iter("a", "template", *REMOVED_TAGS):
+        if element.tag == "a":
+            href = element.get("href")
+            if href is not None:
+                anchors.append((href, element.text_content()))
+        else:
+            removed.append(element)
+
+    # drop_tree keeps the element's tail text, like bs4's decompose
+    for element in removed:
+        element.drop_tree()
+
+    text = etree.tostring(root, method="text", encoding="unicode")
+    links, anchor_texts = same_domain_links(url, anchors)
+    return clean_text(text), links, anchor_texts
+
+
+EXTRACTORS = {"bs4": extract_with_bs4}
+if lxml_html is not None:
+    EXTRACTORS["lxml"] = extract_with_lxml
+
+
+def resolve_backend(backend=HTML_EXTRACTION_BACKEND):
+    """Name of the backend to use; 'auto' picks lxml when it is installed"""
+    if backend == "auto":
+        return "lxml" if "lxml" in EXTRACTORS else "bs4"
+    if backend not in EXTRACTORS:
+        raise ValueError(f"HTML extraction backend '{backend}' is not available (choose from: auto, {', '.join(EXTRACTORS)})")
+    return backend
+
+
+def extract_page(url, content, backend=HTML_EXTRACTION_BACKEND):
+    """Return (text, links, anchor_texts) for a page's raw HTML using the given backend"""
+    return EXTRACTORS[resolve_backend(backend)](url, content)
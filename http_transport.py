@@ -0,0 +1,225 @@
+"""
+Shared, connection-pooled HTTP transport for 2_coursera_agent.py.
+
+Instead of a new requests.Session (and a fresh TCP + TLS handshake) per page or per
+LLM call, traffic goes through one long-lived client per pool:
+
+    crawl       -> the institutions' websites (many hosts, a few connections each)
+    gemini      -> generativelanguage.googleapis.com
+    perplexity  -> api.perplexity.ai
+
+Sync clients are thread-safe and shared by all workers. The API pools use HTTP/2 when
+httpx with the h2 extra is installed (pip install "httpx[http2]") and fall back to
+requests otherwise. Async sessions (aiohttp) are created per event loop by
+create_async_sessions. Every pool counts requests, new connections and handshake time,
+so the connection reuse rate can be reported.
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# httpx + h2 are optional; they enable HTTP/2 for the API pools
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx needs it for http2=True
+except ImportError:
+    httpx = None
+
+# aiohttp is only needed for the async execution mode
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from constants import HTTP_POOL_SIZES, HTTP_POOL_MAX_HOSTS, HTTP2_ENABLED
+
+CRAWL = "crawl"
+GEMINI = "gemini"
+PERPLEXITY = "perplexity"
+POOLS = (CRAWL, GEMINI, PERPLEXITY)
+
+
+class PoolMetrics:
+    """Thread-safe request, connection and handshake-time counters for one pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.handshake_seconds = 0.0
+
+    def record_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def record_connection(self, seconds):
+        """Count a newly opened connection and the time spent on TCP connect + TLS"""
+        with self.lock:
+            self.new_connections += 1
+            self.handshake_seconds += seconds
+
+    def snapshot(self):
+        """Counters plus derived reuse rate and mean handshake time"""
+        with self.lock:
+            requests_made = self.requests
+            new_connections = self.new_connections
+            handshake_seconds = self.handshake_seconds
+        return {
+            "requests": requests_made,
+            "new_connections": new_connections,
+            "reuse_rate": (1 - new_connections / requests_made) if requests_made else 0.0,
+            "avg_handshake_ms": (handshake_seconds / new_connections * 1000) if new_connections else 0.0,
+            "handshake_seconds": handshake_seconds
+        }
+
+
+POOL_METRICS = {pool: PoolMetrics() for pool in POOLS}
+
+
+def metrics_snapshot():
+    """Metrics of every pool, keyed by pool name"""
+    return {pool: POOL_METRICS[pool].snapshot() for pool in POOLS}
+
+
+def _timed_pool_classes(metrics):
+    """urllib3 connection pool classes whose connections report their connect/TLS time"""
+
+    class TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            metrics.record_connection(time.perf_counter() - start)
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            metrics.record_connection(time.perf_counter() - start)
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    return {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that keeps per-host keep-alive pools and feeds a PoolMetrics"""
+
+    def __init__(self, metrics, **kwargs):
+        self.metrics = metrics
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _timed_pool_classes(self.metrics)
+
+    def send(self, request, **kwargs):
+        self.metrics.record_request()
+        return super().send(request, **kwargs)
+
+
+def _requests_session(pool):
+    """requests.Session with a tuned keep-alive pool for one of POOLS"""
+    session = requests.Session()
+    adapter = PooledAdapter(
+        POOL_METRICS[pool],
+        pool_connections=HTTP_POOL_MAX_HOSTS if pool == CRAWL else 1,
+        pool_maxsize=HTTP_POOL_SIZES[pool]
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _httpx_trace_hook(metrics):
+    """httpx request hook that counts requests and times new connections"""
+
+    def on_request(request):
+        metrics.record_request()
+        started = {}
+
+        def trace(event_name, info):
+            if event_name == "connection.connect_tcp.started":
+                started["at"] = time.perf_counter()
+            elif "at" in started and (
+                event_name == "connection.start_tls.complete"
+                or (event_name == "connection.connect_tcp.complete" and request.url.scheme == "http")
+            ):
+                metrics.record_connection(time.perf_counter() - started.pop("at"))
+
+        request.extensions["trace"] = trace
+
+    return on_request
+
+
+def _http2_client(pool):
+    """httpx client speaking HTTP/2 for an API pool"""
+    size = HTTP_POOL_SIZES[pool]
+    return httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+        event_hooks={"request": [_httpx_trace_hook(POOL_METRICS[pool])]}
+    )
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(pool):
+    """
+    Shared client for a pool, created on first use.
+
+    The returned object supports the requests-style get/post(url, json=, headers=,
+    timeout=) calls the agent makes, whether it is a requests.Session or an httpx.Client.
+    """
+    with _sessions_lock:
+        if pool not in _sessions:
+            if pool != CRAWL and HTTP2_ENABLED and httpx is not None:
+                _sessions[pool] = _http2_client(pool)
+            else:
+                _sessions[pool] = _requests_session(pool)
+        return _sessions[pool]
+
+
+def _aiohttp_trace_config(metrics):
+    """aiohttp TraceConfig that counts requests and times new connections"""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        metrics.record_request()
+
+    async def on_connection_create_start(session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def on_connection_create_end(session, context, params):
+        metrics.record_connection(time.perf_counter() - context.connect_started)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+def create_async_sessions(limits):
+    """
+    One aiohttp.ClientSession per pool for the running event loop.
+
+    Args:
+        limits (dict): Maximum open connections per pool name
+    """
+    return {
+        pool: aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=limits[pool]),
+            trace_configs=[_aiohttp_trace_config(POOL_METRICS[pool])]
+        )
+        for pool in POOLS
+    }
@@ -0,0 +1,115 @@
+"""
+Persistent cache of Gemini responses for 2_coursera_agent.py.
+
+Responses are keyed by the model name plus a hash of the whitespace-normalized
+prompt, so re-runs and restarts of a crashed batch do not pay for identical prompts
+again. Entries expire after a TTL and the least recently used ones are evicted once
+the stored responses exceed a byte budget.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from constants import LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES
+
+
+def normalize_prompt(prompt):
+    """Strip indentation and collapse blank lines so cosmetic prompt edits keep hitting the cache"""
+    lines = (line.strip() for line in prompt.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def prompt_cache_key(model, prompt):
+    """Cache key for a prompt sent to a given model"""
+    return hashlib.sha256(f"{model}\n{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Thread-safe SQLite-backed cache of LLM responses.
+
+    Args:
+        path (str): SQLite database file
+        ttl (float): Seconds before an entry is considered expired
+        max_bytes (int): Upper bound on the total size of cached responses
+        bypass (bool): Skip lookups (every call goes to the API) but still store fresh responses
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES, bypass=False):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.lock = threading.Lock()
+        self.counts = {"hits": 0, "misses": 0, "bypassed": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self.db.commit()
+
+    def get(self, model, prompt):
+        """Return the cached response text, or None on a miss, expiry or bypass"""
+        if self.bypass:
+            self._record("bypassed")
+            return None
+
+        key = prompt_cache_key(model, prompt)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self.counts["misses"] += 1
+                return None
+            self.db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self.counts["hits"] += 1
+        return row[0]
+
+    def put(self, model, prompt, response):
+        """Store a response text for a prompt"""
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (prompt_cache_key(model, prompt), model, response, len(response.encode("utf-8")), now, now)
+            )
+            self._evict(now)
+            self.db.commit()
+
+    def _evict(self, now):
+        """Drop expired entries, then least recently used ones beyond max_bytes (lock held)"""
+        self.db.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def _record(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def stats(self):
+        """Hit/miss/bypass counters for the batch summary"""
+        with self.lock:
+            return dict(self.counts)
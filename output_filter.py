@@ -0,0 +1,59 @@
+"""
+Lead result filter shared by 3_output_cleaner.py and 2_coursera_agent.py.
+
+A lead result is kept for the cleaned outputs when contact_info.contacts holds at least
+one contact. The filter runs either as a batch over the agent's outputs
+(3_output_cleaner.py) or inline as a result-sink view that updates cleaned_outputs/ as
+the agent emits results (2_coursera_agent.py --clean-inline).
+"""
+
+import os
+
+from constants import CLEANED_OUTPUTS_DIR
+from result_sink import write_json_file, OK
+
+
+def has_contacts(data):
+    """True if a lead result has the expected structure and at least one contact"""
+    return (isinstance(data, dict) and
+            'contact_info' in data and
+            isinstance(data['contact_info'], dict) and
+            'contacts' in data['contact_info'] and
+            isinstance(data['contact_info']['contacts'], list) and
+            len(data['contact_info']['contacts']) > 0)
+
+
+def remove_file(path):
+    """Delete a file if it exists; returns True if one was removed"""
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class CleanedOutputView:
+    """
+    Result-sink view keeping cleaned_outputs/{domain}.json in step with the latest result.
+
+    Qualifying results are written and a newer result that no longer qualifies removes
+    the domain's cleaned file. A failed retry leaves the file from the last success alone.
+    """
+
+    def __init__(self, directory=CLEANED_OUTPUTS_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, domain, status, result):
+        """Apply one record; returns True if the domain is in the cleaned outputs afterwards"""
+        output_file = os.path.join(self.directory, f"{domain}.json")
+        if status != OK:
+            return os.path.exists(output_file)
+        if has_contacts(result):
+            write_json_file(output_file, result)
+            return True
+        remove_file(output_file)
+        return False
+
+    def close(self):
+        pass
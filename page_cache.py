@@ -0,0 +1,189 @@
+"""
+Persistent on-disk cache of fetched web pages for 2_coursera_agent.py.
+
+Bodies are stored content-addressed (by SHA-256) under the cache directory and an
+SQLite index maps each normalized URL to its body, response headers and fetch time.
+Entries younger than the TTL are served without touching the network; older entries
+are revalidated with a conditional GET (If-None-Match / If-Modified-Since). The total
+body size is kept under a byte budget by evicting the least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from constants import PAGE_CACHE_DIR, PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES
+
+
+def normalize_cache_key(url):
+    """
+    Normalize a URL so equivalent spellings share one cache entry.
+
+    Lowercases scheme and host, drops default ports and fragments, sorts query
+    parameters and uses "/" for an empty path.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "http" and parts.port == 80) or (scheme == "https" and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class CachedPage:
+    """A cache entry: response headers, body and when it was last fetched or revalidated"""
+
+    def __init__(self, url, headers, content, fetched_at):
+        self.url = url
+        self.headers = headers
+        self.content = content
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl):
+        """True if the entry can be served without revalidating"""
+        return time.time() - self.fetched_at < ttl
+
+    def conditional_headers(self):
+        """Request headers for revalidating this entry with a conditional GET"""
+        headers = {}
+        etag = self.headers.get("etag")
+        last_modified = self.headers.get("last-modified")
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Thread-safe page cache backed by an SQLite index and content-addressed body files.
+
+    Args:
+        cache_dir (str): Directory holding the index database and body files
+        ttl (float): Seconds an entry is served without revalidation
+        max_bytes (int): Upper bound on the total size of cached bodies
+    """
+
+    def __init__(self, cache_dir=PAGE_CACHE_DIR, ttl=PAGE_CACHE_TTL, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.counts = {"hits": 0, "revalidated": 0, "misses": 0}
+
+        os.makedirs(os.path.join(cache_dir, "bodies"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self.db.commit()
+
+    def _body_path(self, body_hash):
+        return os.path.join(self.cache_dir, "bodies", body_hash[:2], body_hash)
+
+    def get(self, url):
+        """Return the CachedPage for url, or None if it is not cached"""
+        key = normalize_cache_key(url)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT body_hash, headers, fetched_at FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            body_hash, headers, fetched_at = row
+            try:
+                with open(self._body_path(body_hash), "rb") as f:
+                    content = f.read()
+            except OSError:
+                # Body went missing (manual cleanup); treat as a miss
+                self.db.execute("DELETE FROM pages WHERE url = ?", (key,))
+                self.db.commit()
+                return None
+            self.db.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), key))
+            self.db.commit()
+        return CachedPage(url, json.loads(headers), content, fetched_at)
+
+    def put(self, url, headers, content):
+        """Store a 200 response; responses marked Cache-Control: no-store are skipped"""
+        headers = {name.lower(): value for name, value in headers.items()}
+        if "no-store" in headers.get("cache-control", "").lower():
+            return
+
+        body_hash = hashlib.sha256(content).hexdigest()
+        body_path = self._body_path(body_hash)
+        if not os.path.exists(body_path):
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            tmp_path = f"{body_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, body_path)
+
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages (url, body_hash, size, headers, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_cache_key(url), body_hash, len(content), json.dumps(headers), now, now)
+            )
+            self.db.commit()
+            self._evict()
+
+    def mark_revalidated(self, url):
+        """Reset the fetch time of an entry after the server answered 304 Not Modified"""
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ?",
+                (now, now, normalize_cache_key(url))
+            )
+            self.db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes (lock held)"""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for url, body_hash, size in self.db.execute(
+            "SELECT url, body_hash, size FROM pages ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+
+            # Bodies are shared between URLs with identical content
+            still_used = self.db.execute(
+                "SELECT 1 FROM pages WHERE body_hash = ? LIMIT 1", (body_hash,)
+            ).fetchone()
+            if not still_used:
+                try:
+                    os.remove(self._body_path(body_hash))
+                except OSError:
+                    pass
+        self.db.commit()
+
+    def record(self, outcome):
+        """Count a lookup outcome: 'hits', 'revalidated' or 'misses'"""
+        with self.lock:
+            self.counts[outcome] += 1
+
+    def stats(self):
+        """Hit/revalidation/miss counters for the batch summary"""
+        with self.lock:
+            return dict(self.counts)
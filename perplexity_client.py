@@ -0,0 +1,248 @@
+"""
+Rate-limit-aware Perplexity client for 2_coursera_agent.py.
+
+Contact research used to be one blocking POST per lead with no retry, so a throttled
+API failed the lead's contacts outright. Requests now go through one client shared by
+all workers (PerplexityClient for threads, AsyncPerplexityClient for the event loop):
+
+    - at most `window` requests are in flight. The window starts at
+      PERPLEXITY_MAX_CONCURRENCY (the plan's ceiling), halves on a 429 / 5xx response
+      (once per round trip, however many requests of that round were throttled) and
+      grows back by one request per window of successes (AIMD)
+    - a Retry-After header holds every request until the given time
+    - 429, 5xx, timeouts and connection errors are retried up to PERPLEXITY_MAX_RETRIES
+      times, with exponential back-off and jitter when there is no Retry-After
+    - identical payloads in flight (the same domain and course researched by two
+      leads) share one request
+
+Both clients take the function that sends one payload and returns
+(status, Retry-After header, body bytes).
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from constants import (
+    PERPLEXITY_MAX_CONCURRENCY, PERPLEXITY_MAX_RETRIES, PERPLEXITY_RETRY_BASE_DELAY, PERPLEXITY_MAX_RETRY_AFTER
+)
+from politeness import parse_retry_after
+
+# Statuses that mean "slow down"; other 4xx responses are not retried
+THROTTLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class PerplexityError(Exception):
+    """A Perplexity request that failed for good"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def payload_key(payload):
+    return json.dumps(payload, sort_keys=True)
+
+
+def backoff_delay(attempt):
+    """Seconds before retry number attempt + 1 when the API gave no Retry-After"""
+    return min(PERPLEXITY_MAX_RETRY_AFTER, PERPLEXITY_RETRY_BASE_DELAY * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class AIMDWindow:
+    """Concurrency window and Retry-After hold shared by every Perplexity request (not locked itself)"""
+
+    def __init__(self, ceiling=PERPLEXITY_MAX_CONCURRENCY):
+        self.ceiling = ceiling
+        self.size = float(ceiling)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+
+    @property
+    def limit(self):
+        return max(1, int(self.size))
+
+    def wait_time(self, now):
+        """0 when a request may start now, the hold left after a Retry-After, or None when the window is full"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        return 0 if self.in_flight < self.limit else None
+
+    def succeeded(self):
+        self.size = min(self.ceiling, self.size + 1 / self.limit)
+
+    def throttled(self, started, retry_after, now):
+        """Halve the window for a throttled request (unless it started before the last halving) and honour Retry-After"""
+        if started >= self.last_decrease:
+            self.size = max(1.0, self.size / 2)
+            self.last_decrease = now
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + min(retry_after, PERPLEXITY_MAX_RETRY_AFTER))
+
+    def outcome(self, started, status, retry_after, attempt):
+        """
+        Record a finished attempt (status None for a transport error).
+
+        Returns "ok", or the seconds to sleep before retrying; raises PerplexityError
+        when the request must not be retried.
+        """
+        if status is not None and status < 400:
+            self.succeeded()
+            return "ok"
+        if status is not None and status not in THROTTLE_STATUSES:
+            raise PerplexityError(f"Perplexity API returned HTTP {status}", status)
+        if attempt >= PERPLEXITY_MAX_RETRIES:
+            raise PerplexityError(f"Perplexity API still failing after {attempt + 1} attempts (last status {status})", status)
+        delay = parse_retry_after(retry_after)
+        if status is not None:
+            self.throttled(started, delay, time.monotonic())
+        # The Retry-After hold is waited out when the next attempt starts
+        return 0 if delay is not None else backoff_delay(attempt)
+
+
+def print_retry(status, attempt, window):
+    reason = f"HTTP {status}" if status is not None else "no response"
+    print(f"⏳ Perplexity {reason}; retry {attempt + 1}/{PERPLEXITY_MAX_RETRIES} "
+          f"with at most {window.limit} requests in flight")
+
+
+class PerplexityClient:
+    """
+    Thread-safe Perplexity client; post(payload) returns (body, info).
+
+    info holds the number of retries and whether the body came from an identical
+    request another worker had in flight ("coalesced").
+    """
+
+    def __init__(self, send, ceiling=PERPLEXITY_MAX_CONCURRENCY):
+        self.send = send
+        self.window = AIMDWindow(ceiling)
+        self.condition = threading.Condition()
+        self.in_flight = {}
+
+    def post(self, payload):
+        key = payload_key(payload)
+        with self.condition:
+            future = self.in_flight.get(key)
+            if future is not None:
+                owner = False
+            else:
+                owner = True
+                future = self.in_flight[key] = Future()
+        if not owner:
+            body, _ = future.result()
+            return body, {"retries": 0, "coalesced": True}
+        try:
+            future.set_result(self._post_with_retries(payload))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self.condition:
+                del self.in_flight[key]
+        body, retries = future.result()
+        return body, {"retries": retries, "coalesced": False}
+
+    def _acquire(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                wait = self.window.wait_time(now)
+                if wait == 0:
+                    self.window.in_flight += 1
+                    return now
+                self.condition.wait(wait)
+
+    def _post_with_retries(self, payload):
+        attempt = 0
+        while True:
+            started = self._acquire()
+            status, retry_after, body = None, None, b""
+            try:
+                status, retry_after, body = self.send(payload)
+            except Exception as e:
+                print(f"⚠️ Perplexity request failed: {e}")
+            finally:
+                with self.condition:
+                    self.window.in_flight -= 1
+                    try:
+                        delay = self.window.outcome(started, status, retry_after, attempt)
+                    finally:
+                        self.condition.notify_all()
+            if delay == "ok":
+                return body, attempt
+            print_retry(status, attempt, self.window)
+            time.sleep(delay)
+            attempt += 1
+
+
+class AsyncPerplexityClient:
+    """Async version of PerplexityClient, for one event loop"""
+
+    def __init__(self, send, ceiling=PERPLEXITY_MAX_CONCURRENCY):
+        self.send = send
+        self.window = AIMDWindow(ceiling)
+        self.condition = asyncio.Condition()
+        self.in_flight = {}
+
+    async def post(self, payload):
+        key = payload_key(payload)
+        future = self.in_flight.get(key)
+        if future is not None:
+            body, _ = await asyncio.shield(future)
+            return body, {"retries": 0, "coalesced": True}
+        future = self.in_flight[key] = asyncio.get_running_loop().create_future()
+        try:
+            future.set_result(await self._post_with_retries(payload))
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            del self.in_flight[key]
+        body, retries = future.result()
+        return body, {"retries": retries, "coalesced": False}
+
+    async def _acquire(self):
+        async with self.condition:
+            while True:
+                now = time.monotonic()
+                wait = self.window.wait_time(now)
+                if wait == 0:
+                    self.window.in_flight += 1
+                    return now
+                try:
+                    await asyncio.wait_for(self.condition.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _release(self, started, status, retry_after, attempt, cancelled=False):
+        async with self.condition:
+            self.window.in_flight -= 1
+            try:
+                return None if cancelled else self.window.outcome(started, status, retry_after, attempt)
+            finally:
+                self.condition.notify_all()
+
+    async def _post_with_retries(self, payload):
+        attempt = 0
+        while True:
+            started = await self._acquire()
+            status, retry_after, body = None, None, b""
+            try:
+                status, retry_after, body = await self.send(payload)
+            except asyncio.CancelledError:
+                await self._release(started, None, None, attempt, cancelled=True)
+                raise
+            except Exception as e:
+                print(f"⚠️ Perplexity request failed: {e}")
+            delay = await self._release(started, status, retry_after, attempt)
+            if delay == "ok":
+                return body, attempt
+            print_retry(status, attempt, self.window)
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,167 @@
+"""
+Staged execution of leads for 2_coursera_agent.py.
+
+Instead of one worker carrying a lead from its first page fetch to its JSON file, each
+stage (course recommendation crawl, Perplexity contact research, result writing) has
+its own workers and a bounded input queue:
+
+    leads -> [recommend] -> queue -> [contacts] -> queue -> [write]
+
+A lead moves on as soon as a stage is done with it, so slow Perplexity research never
+holds up crawling of the next leads, and each stage's worker count keeps its API at
+its own concurrency ceiling. Full queues block the stage before them (backpressure),
+so at most queue_size leads wait between two stages and new leads are only started
+when the first stage has room.
+
+StagePipeline runs stages on threads, AsyncStagePipeline on one asyncio event loop.
+"""
+
+import asyncio
+import queue
+import threading
+
+# Tells a stage worker that no more items will arrive
+_STOP = object()
+
+
+def report_done(on_done, item, error):
+    """
+    Call on_done, logging rather than raising its own failure: a worker that died here
+    would stop draining its queue and block the stages before it for good.
+    """
+    try:
+        on_done(item, error)
+    except Exception as e:
+        print(f"⚠️ Pipeline completion callback failed: {e}")
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    Args:
+        name (str): Stage name for log messages
+        func: Callable (a coroutine function for AsyncStagePipeline) that processes an item
+              in place; raising marks the item as failed and drops it from the pipeline
+        workers (int): Items this stage processes at once
+    """
+
+    def __init__(self, name, func, workers):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+
+class StagePipeline:
+    """
+    Thread-based staged pipeline.
+
+    on_done(item, error) is called exactly once per item that entered the pipeline,
+    with error None after the last stage or the exception of the stage that failed.
+    Calls are serialized, so the callback needs no locking of its own. An exception
+    raised by on_done is logged and the worker carries on (see report_done).
+    """
+
+    def __init__(self, stages, queue_size, on_done):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_done = on_done
+        self.done_lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def stop(self):
+        """Stop admitting new items; items already inside still run to completion"""
+        self.stopped.set()
+
+    def finish(self, item, error):
+        with self.done_lock:
+            report_done(self.on_done, item, error)
+
+    def worker(self, index, queues):
+        stage = self.stages[index]
+        while True:
+            item = queues[index].get()
+            if item is _STOP:
+                return
+            try:
+                stage.func(item)
+            except Exception as e:
+                self.finish(item, e)
+                continue
+            if index + 1 < len(self.stages):
+                queues[index + 1].put(item)
+            else:
+                self.finish(item, None)
+
+    def run(self, items):
+        """Push every item through the stages; items is consumed lazily as the first stage has room"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        workers = []
+        for index, stage in enumerate(self.stages):
+            threads = [
+                threading.Thread(target=self.worker, args=(index, queues), name=f"{stage.name}-{n}", daemon=True)
+                for n in range(stage.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            workers.append(threads)
+
+        for item in items:
+            if self.stopped.is_set():
+                break
+            queues[0].put(item)
+
+        # Drain stage by stage: a stage is told to stop only after the one before it has exited
+        for index, threads in enumerate(workers):
+            for _ in threads:
+                queues[index].put(_STOP)
+            for thread in threads:
+                thread.join()
+
+
+class AsyncStagePipeline:
+    """asyncio version of StagePipeline; stage functions are coroutine functions"""
+
+    def __init__(self, stages, queue_size, on_done):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_done = on_done
+        self.stopped = False
+
+    def stop(self):
+        """Stop admitting new items; items already inside still run to completion"""
+        self.stopped = True
+
+    async def worker(self, index, queues):
+        stage = self.stages[index]
+        while True:
+            item = await queues[index].get()
+            if item is _STOP:
+                return
+            try:
+                await stage.func(item)
+            except Exception as e:
+                report_done(self.on_done, item, e)
+                continue
+            if index + 1 < len(self.stages):
+                await queues[index + 1].put(item)
+            else:
+                report_done(self.on_done, item, None)
+
+    async def run(self, items):
+        """Push every item through the stages; items is consumed lazily as the first stage has room"""
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        workers = [
+            [asyncio.create_task(self.worker(index, queues)) for _ in range(stage.workers)]
+            for index, stage in enumerate(self.stages)
+        ]
+
+        for item in items:
+            if self.stopped:
+                break
+            await queues[0].put(item)
+
+        for index, tasks in enumerate(workers):
+            for _ in tasks:
+                await queues[index].put(_STOP)
+            await asyncio.gather(*tasks)
@@ -0,0 +1,75 @@
+"""
+Persistent store of Google Place Details for 1_institutions_list_fetcher.py.
+
+Details are keyed by place_id together with the website and the time they were
+fetched, so a re-run only calls the Place Details API for places it has never seen
+or whose details are older than PLACE_DETAILS_TTL. Failed lookups are not stored and
+are retried on the next run.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from constants import PLACE_CACHE_PATH, PLACE_DETAILS_TTL
+
+
+class PlaceStore:
+    """
+    Thread-safe SQLite-backed store of place details.
+
+    Args:
+        path (str): SQLite database file
+        ttl (float): Seconds before stored details are considered stale
+        refresh (bool): Treat every entry as stale (details are re-fetched and re-stored)
+    """
+
+    def __init__(self, path=PLACE_CACHE_PATH, ttl=PLACE_DETAILS_TTL, refresh=False):
+        self.ttl = ttl
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self.counts = {"fresh": 0, "stale": 0, "new": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS places (
+                place_id TEXT PRIMARY KEY,
+                name TEXT,
+                website TEXT,
+                details TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def get(self, place_id):
+        """Return the stored details dict, or None when the place is unknown or stale"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT details, fetched_at FROM places WHERE place_id = ?", (place_id,)
+            ).fetchone()
+            if row is None:
+                self.counts["new"] += 1
+                return None
+            if self.refresh or time.time() - row[1] >= self.ttl:
+                self.counts["stale"] += 1
+                return None
+            self.counts["fresh"] += 1
+        return json.loads(row[0])
+
+    def put(self, place_id, name, details):
+        """Store freshly fetched details for a place"""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO places (place_id, name, website, details, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (place_id, name, details.get("website", ""), json.dumps(details), time.time())
+            )
+            self.db.commit()
+
+    def stats(self):
+        """How many lookups were served from the store, and how many needed the API"""
+        with self.lock:
+            return dict(self.counts)
@@ -0,0 +1,251 @@
+"""
+Adaptive per-domain politeness scheduler for crawling in 2_coursera_agent.py.
+
+Each host gets its own token bucket, so different domains are crawled fully in
+parallel while requests to one host are paced:
+
+- the pace is POLITENESS_MIN_INTERVAL, or the robots.txt Crawl-delay if larger
+- 429 / 503 / 406 responses double the host's interval (up to POLITENESS_MAX_INTERVAL),
+  successful responses halve it back
+- a Retry-After header blocks the host until the given time
+
+This replaces fixed random sleeps before every attempt: a host that answers
+promptly is never made to wait longer than its own politeness interval.
+
+The robots.txt fetched for the crawl delay also provides the host's Sitemap: lines and
+Disallow rules (sitemaps / allowed) for sitemap_discovery.py.
+"""
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from constants import (
+    POLITENESS_MIN_INTERVAL, POLITENESS_BURST, POLITENESS_MAX_INTERVAL,
+    POLITENESS_MAX_RETRY_AFTER, ROBOTS_TXT_TIMEOUT
+)
+from http_transport import CRAWL, get_session
+
+# aiohttp is only needed for the async execution mode
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Statuses that mean "slow down"; anything else is retried without extra back-off
+BACKOFF_STATUSES = (429, 503, 406)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_crawl_delay(robots_text):
+    """
+    Crawl-delay (seconds) that robots.txt asks of all user agents, or None.
+
+    Parsed by hand because urllib.robotparser ignores fractional delays like "0.5".
+    """
+    delay = None
+    group_agents, in_rules = [], False
+    for line in robots_text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        name, value = (part.strip() for part in line.split(":", 1))
+        name = name.lower()
+        if name == "user-agent":
+            if in_rules:
+                group_agents, in_rules = [], False
+            group_agents.append(value)
+            continue
+        in_rules = True
+        if name == "crawl-delay" and "*" in group_agents:
+            try:
+                delay = float(value)
+            except ValueError:
+                pass
+    return delay if delay and delay > 0 else None
+
+
+def parse_sitemaps(robots_text):
+    """Sitemap URLs listed in robots.txt (Sitemap: lines apply to every user agent)"""
+    sitemaps = []
+    for line in robots_text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "sitemap" and value.strip():
+            sitemaps.append(value.strip())
+    return sitemaps
+
+
+class HostState:
+    """Token bucket and back-off state for one host"""
+
+    def __init__(self):
+        self.tokens = float(POLITENESS_BURST)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.crawl_delay = None
+        self.backoff = 1.0
+        self.robots_checked = False
+        self.sitemaps = []
+        self.robots = None
+
+    @property
+    def interval(self):
+        """Seconds per request currently allowed for this host"""
+        base = max(POLITENESS_MIN_INTERVAL, self.crawl_delay or 0)
+        return min(base * self.backoff, max(base, POLITENESS_MAX_INTERVAL))
+
+    @property
+    def burst(self):
+        # A host that asked for a crawl delay gets no bursts
+        return 1.0 if self.crawl_delay else float(POLITENESS_BURST)
+
+    def reserve(self, now):
+        """Take a token (possibly going into debt) and return how long to wait for it"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) / self.interval)
+        self.updated = now
+        wait = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) * self.interval)
+        self.tokens -= 1
+        return wait
+
+
+class DomainScheduler:
+    """
+    Thread- and asyncio-safe politeness scheduler shared by all workers.
+
+    Call wait(url) (or await wait_async(url, session)) before each request and
+    report(url, status, retry_after) after it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = {}
+        self.robots_locks = {}
+        self.robots_fetches = {}
+
+    def _state(self, host):
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostState()
+                self.robots_locks[host] = threading.Lock()
+            return self.hosts[host]
+
+    def _reserve(self, host):
+        state = self._state(host)
+        with self.lock:
+            return state.reserve(time.monotonic())
+
+    def _set_robots(self, host, robots_text):
+        crawl_delay, sitemaps, robots = None, [], None
+        if robots_text:
+            try:
+                crawl_delay = parse_crawl_delay(robots_text)
+                sitemaps = parse_sitemaps(robots_text)
+                robots = RobotFileParser()
+                robots.parse(robots_text.splitlines())
+            except Exception:
+                crawl_delay = None
+        state = self._state(host)
+        with self.lock:
+            state.crawl_delay = crawl_delay
+            state.sitemaps = sitemaps
+            state.robots = robots
+            state.robots_checked = True
+        if crawl_delay:
+            print(f"🤖 {host} asks for a crawl delay of {crawl_delay:g}s (robots.txt)")
+
+    def _robots_url(self, url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+
+    def check_robots(self, url):
+        """Fetch and apply url's robots.txt if that has not happened yet; returns the host's state"""
+        host = urlparse(url).netloc
+        state = self._state(host)
+        if not state.robots_checked:
+            with self.robots_locks[host]:
+                if not state.robots_checked:
+                    self._set_robots(host, self._fetch_robots(url))
+        return state
+
+    async def check_robots_async(self, url, session):
+        """Async version of check_robots; robots.txt is fetched with the given aiohttp session"""
+        host = urlparse(url).netloc
+        state = self._state(host)
+        if not state.robots_checked:
+            # The first task starts the fetch; concurrent ones await that same fetch, and
+            # shield keeps it running for them if the task that started it is cancelled
+            with self.lock:
+                fetch = self.robots_fetches.get(host)
+                if fetch is None:
+                    fetch = asyncio.ensure_future(self._fetch_robots_async(url, session))
+                    self.robots_fetches[host] = fetch
+            robots_text = await asyncio.shield(fetch)
+            if not state.robots_checked:
+                self._set_robots(host, robots_text)
+        return state
+
+    def wait(self, url):
+        """Block until a request to url's host is allowed"""
+        self.check_robots(url)
+        time.sleep(self._reserve(urlparse(url).netloc))
+
+    async def wait_async(self, url, session):
+        """Async version of wait"""
+        await self.check_robots_async(url, session)
+        await asyncio.sleep(self._reserve(urlparse(url).netloc))
+
+    def sitemaps(self, url):
+        """Sitemap URLs from the robots.txt of url's host (call check_robots first)"""
+        return list(self._state(urlparse(url).netloc).sitemaps)
+
+    def allowed(self, url, user_agent="*"):
+        """False if url's robots.txt disallows it (call check_robots first)"""
+        robots = self._state(urlparse(url).netloc).robots
+        return robots is None or robots.can_fetch(user_agent, url)
+
+    def _fetch_robots(self, url):
+        try:
+            response = get_session(CRAWL).get(self._robots_url(url), timeout=ROBOTS_TXT_TIMEOUT)
+            return response.text if response.status_code == 200 else None
+        except Exception:
+            return None
+
+    async def _fetch_robots_async(self, url, session):
+        try:
+            timeout = aiohttp.ClientTimeout(total=ROBOTS_TXT_TIMEOUT)
+            async with session.get(self._robots_url(url), timeout=timeout) as response:
+                return await response.text() if response.status == 200 else None
+        except Exception:
+            return None
+
+    def report(self, url, status_code, retry_after=None):
+        """Adapt the host's pace to a response: back off on 429/503/406, recover on success"""
+        host = urlparse(url).netloc
+        state = self._state(host)
+        delay = parse_retry_after(retry_after)
+        with self.lock:
+            if status_code in BACKOFF_STATUSES:
+                state.backoff = min(state.backoff * 2, POLITENESS_MAX_INTERVAL / POLITENESS_MIN_INTERVAL)
+                if delay is not None:
+                    state.blocked_until = max(state.blocked_until,
+                                              time.monotonic() + min(delay, POLITENESS_MAX_RETRY_AFTER))
+            elif status_code < 400:
+                state.backoff = max(1.0, state.backoff / 2)
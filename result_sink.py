@@ -0,0 +1,320 @@
+"""
+Pluggable sinks for the per-lead results of 2_coursera_agent.py.
+
+    jsonl -> every result (or error) is appended as one line to outputs/results.jsonl,
+             with an SQLite index of each domain's latest line (offset and length), so
+             writes stay sequential and downstream tools read all results in one scan
+    json  -> one pretty-printed outputs/{domain}.json per lead (outputs/{domain}_ERROR.json
+             on failure), the original layout
+
+The per-domain JSON files can also be kept as a view next to the JSONL store
+(export_json). JSONL lines look like
+
+    {"domain": "example.edu", "status": "ok", "result": {...}}
+
+and a later line for the same domain supersedes earlier ones, except that a failed
+retry never hides a successful result: a domain's result is its latest "ok" line, or
+its latest "failed" line when it never succeeded. A line torn by a crash is cut off
+the next time the store is opened.
+
+Per-domain JSON files written before the store existed (outputs/*.json) are still
+results: readers merge them in, and the store's lines win for the domains they cover.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from constants import RESULTS_JSONL_PATH, RESULTS_INDEX_PATH
+
+OK = "ok"
+FAILED = "failed"
+
+
+def keep_latest(latest, domain, status, result):
+    """Record a newer (status, result) for a domain in latest, unless it is a failure after a success"""
+    previous = latest.get(domain)
+    if status == FAILED and previous is not None and previous[0] == OK:
+        return
+    latest[domain] = (status, result)
+
+
+def write_json_file(output_file, data):
+    """Write pretty-printed JSON to a temp file and rename it; returns the bytes written"""
+    tmp_file = f"{output_file}.tmp"
+    body = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+    with open(tmp_file, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_file, output_file)
+    return len(body)
+
+
+def read_json_file(path):
+    """Parsed JSON of a file, or None if it is missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class JsonFileSink:
+    """One outputs/{domain}.json (or {domain}_ERROR.json) per lead"""
+
+    def __init__(self, directory="outputs"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, domain, status, result):
+        """Save a lead's result or error record; returns the bytes written"""
+        output_file = os.path.join(self.directory, f"{domain}.json")
+        error_file = os.path.join(self.directory, f"{domain}_ERROR.json")
+        if status == FAILED:
+            return write_json_file(error_file, result)
+        size = write_json_file(output_file, result)
+        # A successful retry supersedes the error file from an earlier run
+        if os.path.exists(error_file):
+            os.remove(error_file)
+        return size
+
+    def get(self, domain):
+        """Saved (status, result) for a domain, or None"""
+        for status, name in ((OK, f"{domain}.json"), (FAILED, f"{domain}_ERROR.json")):
+            result = read_json_file(os.path.join(self.directory, name))
+            if result is not None:
+                return status, result
+        return None
+
+    def has_result(self, domain):
+        """True if a successful result is saved for the domain"""
+        return os.path.exists(os.path.join(self.directory, f"{domain}.json"))
+
+    def location(self, domain):
+        return os.path.join(self.directory, f"{domain}.json")
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    """
+    Thread-safe append-only JSONL store with a by-domain index.
+
+    Args:
+        path (str): JSONL file results are appended to
+        index_path (str): SQLite index of each domain's result line
+        json_view (JsonFileSink): Also write the per-domain JSON files, or None
+        legacy_directory (str): Per-domain JSON files from before the store, consulted
+            for domains the store has no line for
+    """
+
+    def __init__(self, path=RESULTS_JSONL_PATH, index_path=RESULTS_INDEX_PATH, json_view=None,
+                 legacy_directory="outputs"):
+        self.path = path
+        self.json_view = json_view
+        self.legacy = JsonFileSink(legacy_directory) if legacy_directory else None
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "ab")
+        self.db = sqlite3.connect(index_path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                domain TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            )
+        """)
+        # How far into the file the index is up to date (failed lines after a success are not indexed)
+        self.db.execute("CREATE TABLE IF NOT EXISTS indexed (id INTEGER PRIMARY KEY CHECK (id = 0), end INTEGER NOT NULL)")
+        self.db.commit()
+        self._repair()
+
+    def _repair(self):
+        """Cut a torn last line and rebuild the index if it does not cover the whole file"""
+        size = self.file.tell()
+        if size:
+            with open(self.path, "rb") as f:
+                f.seek(max(0, size - 1))
+                if f.read(1) != b"\n":
+                    f.seek(0)
+                    data = f.read()
+                    size = data.rfind(b"\n") + 1
+                    self.file.truncate(size)
+                    self.file.seek(size)
+        row = self.db.execute("SELECT end FROM indexed").fetchone()
+        if row is None or row[0] != size:
+            self._rebuild_index()
+
+    def _index(self, domain, status, offset, length):
+        """Point a domain at a line, unless the line is a failure and the domain already has a success"""
+        self.db.execute("""
+            INSERT INTO results (domain, status, offset, length) VALUES (?, ?, ?, ?)
+            ON CONFLICT(domain) DO UPDATE SET
+                status = excluded.status, offset = excluded.offset, length = excluded.length
+            WHERE excluded.status != ? OR results.status != ?
+        """, (domain, status, offset, length, FAILED, OK))
+        self.db.execute("INSERT OR REPLACE INTO indexed (id, end) VALUES (0, ?)", (offset + length,))
+
+    def _rebuild_index(self):
+        self.db.execute("DELETE FROM results")
+        self.db.execute("INSERT OR REPLACE INTO indexed (id, end) VALUES (0, 0)")
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._index(entry["domain"], entry["status"], offset, len(line))
+                except (ValueError, KeyError, TypeError):
+                    pass
+                offset += len(line)
+        self.db.execute("INSERT OR REPLACE INTO indexed (id, end) VALUES (0, ?)", (offset,))
+        self.db.commit()
+
+    def write(self, domain, status, result):
+        """Append a lead's result or error record; returns the bytes written"""
+        line = json.dumps({"domain": domain, "status": status, "result": result}, ensure_ascii=False)
+        body = line.encode("utf-8") + b"\n"
+        with self.lock:
+            offset = self.file.tell()
+            self.file.write(body)
+            self.file.flush()
+            self._index(domain, status, offset, len(body))
+            self.db.commit()
+        if self.json_view is not None:
+            self.json_view.write(domain, status, result)
+        return len(body)
+
+    def get(self, domain):
+        """A domain's (status, result): its latest success, else its latest failure, else a legacy file, else None"""
+        with self.lock:
+            row = self.db.execute("SELECT status, offset, length FROM results WHERE domain = ?", (domain,)).fetchone()
+        if row is None or (row[0] == FAILED and self.legacy is not None and self.legacy.has_result(domain)):
+            return self.legacy.get(domain) if self.legacy is not None else None
+        status, offset, length = row
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return status, json.loads(f.read(length))["result"]
+
+    def has_result(self, domain):
+        """True if a successful result is stored for the domain (in the store or a legacy file)"""
+        with self.lock:
+            row = self.db.execute("SELECT status FROM results WHERE domain = ?", (domain,)).fetchone()
+        if row is not None and row[0] == OK:
+            return True
+        return self.legacy is not None and self.legacy.has_result(domain)
+
+    def location(self, domain):
+        return self.json_view.location(domain) if self.json_view else self.path
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+            self.db.close()
+
+
+class TeeSink:
+    """Writes every record to a primary sink and then to extra views (e.g. the cleaned outputs)"""
+
+    def __init__(self, primary, views):
+        self.primary = primary
+        self.views = views
+
+    def write(self, domain, status, result):
+        size = self.primary.write(domain, status, result)
+        for view in self.views:
+            view.write(domain, status, result)
+        return size
+
+    def get(self, domain):
+        return self.primary.get(domain)
+
+    def has_result(self, domain):
+        return self.primary.has_result(domain)
+
+    def location(self, domain):
+        return self.primary.location(domain)
+
+    def close(self):
+        self.primary.close()
+        for view in self.views:
+            view.close()
+
+
+def open_result_sink(kind="jsonl", export_json=False, directory="outputs", views=()):
+    """
+    Create the sink for a batch: "jsonl" (optionally with the per-domain JSON view) or "json".
+
+    Extra views (objects with the sink's write/close methods) receive every record too.
+    """
+    if kind == "json":
+        sink = JsonFileSink(directory)
+    elif kind == "jsonl":
+        sink = JsonlSink(json_view=JsonFileSink(directory) if export_json else None, legacy_directory=directory)
+    else:
+        raise ValueError(f"Unknown result sink '{kind}' (choose from: jsonl, json)")
+    return TeeSink(sink, list(views)) if views else sink
+
+
+def read_new_results(path=RESULTS_JSONL_PATH, offset=0):
+    """
+    Latest {domain: (status, result)} among the complete lines after offset, and the
+    offset they end at.
+
+    A failure after a success for the same domain is left out (keep_latest). Unparseable
+    lines (e.g. torn by a crash) are skipped; a partial last line is left for the next call.
+    """
+    latest = {}
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                entry = json.loads(line)
+                keep_latest(latest, entry["domain"], entry["status"], entry["result"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return latest, offset
+
+
+def read_results(path=RESULTS_JSONL_PATH):
+    """Every domain's latest (domain, status, result) from a JSONL store in one sequential scan"""
+    latest, _ = read_new_results(path)
+    for domain, (status, result) in latest.items():
+        yield domain, status, result
+
+
+def read_json_results(directory="outputs"):
+    """Every (domain, status, result) saved as a per-domain JSON file; unreadable files are skipped"""
+    if not os.path.isdir(directory):
+        return
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        stem = name[:-len(".json")]
+        status = FAILED if stem.endswith("_ERROR") else OK
+        result = read_json_file(os.path.join(directory, name))
+        if result is None:
+            continue
+        yield stem[:-len("_ERROR")] if status == FAILED else stem, status, result
+
+
+def read_saved_results(path=RESULTS_JSONL_PATH, directory="outputs"):
+    """
+    Every domain's (domain, status, result) from the JSONL store and the per-domain JSON
+    files. The store's lines come after the files, so they win, except that a failure
+    never replaces a success (keep_latest).
+    """
+    latest = {}
+    for domain, status, result in read_json_results(directory):
+        keep_latest(latest, domain, status, result)
+    if os.path.exists(path):
+        stored, _ = read_new_results(path)
+        for domain, (status, result) in stored.items():
+            keep_latest(latest, domain, status, result)
+    for domain, (status, result) in latest.items():
+        yield domain, status, result
@@ -0,0 +1,154 @@
+"""
+Run manifest for resumable batches in 2_coursera_agent.py.
+
+Every lead's progress is journaled in an SQLite database next to the outputs:
+
+    pending        -> queued in a batch but not finished
+    recommended    -> course recommendation saved, contact research not done yet
+    contacts-done  -> result written to the result sink (result_sink.py)
+    failed         -> error record written to the result sink
+
+along with the config and prompt versions that produced it. A restarted batch skips
+completed leads, resumes "recommended" leads at the contact stage and retries the rest.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from constants import RUN_MANIFEST_PATH
+
+PENDING = "pending"
+RECOMMENDED = "recommended"
+CONTACTS_DONE = "contacts-done"
+FAILED = "failed"
+
+
+class RunManifest:
+    """
+    Thread-safe journal of lead states keyed by output domain.
+
+    Args:
+        path (str): SQLite database file
+        config_version (str): Fingerprint of the agent configuration for this run
+        prompt_version (str): Fingerprint of the prompt templates for this run
+    """
+
+    def __init__(self, path=RUN_MANIFEST_PATH, config_version="", prompt_version=""):
+        self.config_version = config_version
+        self.prompt_version = prompt_version
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS leads (
+                domain TEXT PRIMARY KEY,
+                website_url TEXT NOT NULL,
+                state TEXT NOT NULL,
+                recommendation TEXT,
+                error TEXT,
+                config_version TEXT,
+                prompt_version TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def get(self, domain):
+        """Return the lead's row as a dict, or None if it has never been journaled"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT state, recommendation, config_version, prompt_version FROM leads WHERE domain = ?",
+                (domain,)
+            ).fetchone()
+        if row is None:
+            return None
+        state, recommendation, config_version, prompt_version = row
+        return {
+            "state": state,
+            "recommendation": json.loads(recommendation) if recommendation else None,
+            "config_version": config_version,
+            "prompt_version": prompt_version
+        }
+
+    def is_completed(self, domain, has_result, rerun_outdated=False):
+        """
+        True if the lead needs no work in this run.
+
+        Leads finished before the manifest existed are recognised by has_result, a callable
+        telling whether the result sink holds a successful result for the domain.
+        With rerun_outdated, leads finished under other config or prompt versions are redone.
+        """
+        entry = self.get(domain)
+        if entry is None:
+            return not rerun_outdated and has_result(domain)
+        if entry["state"] != CONTACTS_DONE:
+            return False
+        if rerun_outdated and (entry["config_version"], entry["prompt_version"]) != (self.config_version, self.prompt_version):
+            return False
+        return True
+
+    def mark(self, domain, website_url, state, recommendation=None, error=None):
+        """Record a state transition; a saved recommendation is kept unless replaced"""
+        with self.lock:
+            self.db.execute("""
+                INSERT INTO leads (domain, website_url, state, recommendation, error, config_version, prompt_version, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(domain) DO UPDATE SET
+                    website_url = excluded.website_url,
+                    state = excluded.state,
+                    recommendation = COALESCE(excluded.recommendation, leads.recommendation),
+                    error = excluded.error,
+                    config_version = excluded.config_version,
+                    prompt_version = excluded.prompt_version,
+                    updated_at = excluded.updated_at
+            """, (
+                domain, website_url, state,
+                json.dumps(recommendation, ensure_ascii=False) if recommendation is not None else None,
+                error, self.config_version, self.prompt_version, time.time()
+            ))
+            self.db.commit()
+
+    def mark_pending(self, domain, website_url):
+        """Journal a newly queued lead; existing progress is left untouched"""
+        with self.lock:
+            self.db.execute("""
+                INSERT INTO leads (domain, website_url, state, config_version, prompt_version, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(domain) DO NOTHING
+            """, (domain, website_url, PENDING, self.config_version, self.prompt_version, time.time()))
+            self.db.commit()
+
+    def reset(self, domain):
+        """Forget a lead's saved progress so it is processed from scratch"""
+        with self.lock:
+            self.db.execute("DELETE FROM leads WHERE domain = ?", (domain,))
+            self.db.commit()
+
+    def checkpoint(self, domain, website_url):
+        """LeadCheckpoint bound to one lead, handed to run_agent"""
+        return LeadCheckpoint(self, domain, website_url)
+
+
+class LeadCheckpoint:
+    """Lets run_agent reuse or save one lead's course recommendation"""
+
+    def __init__(self, manifest, domain, website_url):
+        self.manifest = manifest
+        self.domain = domain
+        self.website_url = website_url
+
+    def saved_recommendation(self):
+        """Recommendation saved by an interrupted or failed run under the current versions, if any"""
+        entry = self.manifest.get(self.domain)
+        if entry is None or entry["state"] not in (RECOMMENDED, FAILED) or not entry["recommendation"]:
+            return None
+        if (entry["config_version"], entry["prompt_version"]) != (self.manifest.config_version, self.manifest.prompt_version):
+            return None
+        return entry["recommendation"]
+
+    def save_recommendation(self, recommendation):
+        self.manifest.mark(self.domain, self.website_url, RECOMMENDED, recommendation=recommendation)
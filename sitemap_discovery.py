@@ -0,0 +1,182 @@
+"""
+Sitemap-driven URL discovery for the recommendation crawl in 2_coursera_agent.py.
+
+Before any content page is fetched, the sitemaps a lead's robots.txt lists (or
+/sitemap.xml when it lists none) are read, following sitemap indexes into child
+sitemaps and decompressing gzipped ones. Sitemaps are parsed incrementally as
+response chunks arrive (SitemapParser), and only the best MAX_URLS_PER_WEBSITE
+same-host URLs by keyword score are kept (CandidateRanking), so a sitemap with tens
+of thousands of entries never sits in memory at once.
+
+The ranked candidates seed the crawl frontier, so pages such as /about or
+/departments/computer-science are reached without first downloading the pages that
+link to them. SITEMAP_MAX_FILES, SITEMAP_MAX_ENTRIES and SITEMAP_MAX_BYTES bound the
+work spent on one lead.
+"""
+
+import heapq
+import os
+import xml.etree.ElementTree as ET
+import zlib
+from urllib.parse import urlparse
+
+from constants import (
+    MAX_URLS_PER_WEBSITE, ALLOWED_WEB_EXTENSIONS, SITEMAP_MAX_FILES, SITEMAP_MAX_ENTRIES, SITEMAP_MAX_BYTES
+)
+from url_ranker import score_url
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Bytes read from a sitemap response at a time
+CHUNK_SIZE = 64 * 1024
+
+
+def local_name(tag):
+    """Element name without its XML namespace"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def comparable_host(url):
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class SitemapParser:
+    """
+    Incremental parser for one sitemap or sitemap index, plain or gzipped.
+
+    feed(chunk) yields the ("url" | "sitemap", loc) entries the chunk completed.
+    Compressed chunks are inflated CHUNK_SIZE bytes at a time and each entry's element
+    is dropped from the tree once read, so memory stays flat however long the sitemap is.
+    """
+
+    def __init__(self):
+        self.parser = ET.XMLPullParser(events=("start", "end"))
+        self.root = None
+        self.decompressor = None
+        self.started = False
+        self.bytes = 0
+
+    def feed(self, chunk):
+        self.bytes += len(chunk)
+        if not self.started:
+            self.started = True
+            # A .xml.gz file (as opposed to a gzip Content-Encoding, which the HTTP client undoes)
+            if chunk.startswith(GZIP_MAGIC):
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.decompressor is None:
+            self.parser.feed(chunk)
+            yield from self._read_entries()
+            return
+        while chunk:
+            self.parser.feed(self.decompressor.decompress(chunk, CHUNK_SIZE))
+            yield from self._read_entries()
+            chunk = self.decompressor.unconsumed_tail
+
+    def _read_entries(self):
+        for event, element in self.parser.read_events():
+            if event == "start":
+                if self.root is None:
+                    self.root = element
+                continue
+            kind = local_name(element.tag)
+            if kind not in ("url", "sitemap"):
+                continue
+            for child in element:
+                if local_name(child.tag) == "loc" and child.text:
+                    yield kind, child.text.strip()
+                    break
+            self.root.clear()
+
+
+class CandidateRanking:
+    """The best `limit` URLs seen so far by keyword score, kept in a bounded min-heap"""
+
+    def __init__(self, table, limit=MAX_URLS_PER_WEBSITE):
+        self.table = table
+        self.limit = limit
+        self.heap = []
+        self.urls = set()
+        self.position = 0
+
+    def add(self, url):
+        if url in self.urls:
+            return
+        # Same order as url_ranker.rank_urls: score, then shallower paths, then first seen
+        self.position += 1
+        item = (score_url(url, self.table), -urlparse(url).path.count("/"), -self.position, url)
+        if len(self.heap) < self.limit:
+            heapq.heappush(self.heap, item)
+            self.urls.add(url)
+        elif item > self.heap[0]:
+            self.urls.discard(heapq.heapreplace(self.heap, item)[3])
+            self.urls.add(url)
+
+    def ranked(self):
+        """(score, url) pairs, best first"""
+        return [(score, url) for score, _, _, url in sorted(self.heap, reverse=True)]
+
+
+class SitemapDiscovery:
+    """
+    One lead's discovery: the sitemaps still to read, the work budgets and the ranking.
+
+    The caller fetches each next_sitemap() URL and passes its response chunks to
+    read() with a fresh SitemapParser until read() returns False.
+
+    Args:
+        base_url (str): The lead's homepage; only URLs on its host are candidates
+        sitemap_urls (list): Sitemaps from robots.txt; /sitemap.xml when empty
+        table (dict): Keyword score table for ranking the candidates
+        allowed: Callable telling whether robots.txt allows a URL, or None
+    """
+
+    def __init__(self, base_url, sitemap_urls, table, allowed=None, limit=MAX_URLS_PER_WEBSITE):
+        parsed = urlparse(base_url)
+        self.host = comparable_host(base_url)
+        self.pending = list(dict.fromkeys(sitemap_urls)) or [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+        self.queued = set(self.pending)
+        self.allowed = allowed
+        self.ranking = CandidateRanking(table, limit)
+        self.files = 0
+        self.entries = 0
+        self.bytes = 0
+
+    def next_sitemap(self):
+        """URL of the next sitemap to read, or None when done or out of budget"""
+        if not self.pending or self.files >= SITEMAP_MAX_FILES or self.entries >= SITEMAP_MAX_ENTRIES:
+            return None
+        self.files += 1
+        return self.pending.pop(0)
+
+    def read(self, parser, chunk):
+        """Parse one response chunk of the current sitemap; returns False when the rest can be skipped"""
+        self.bytes += len(chunk)
+        return self.add_entries(parser.feed(chunk)) and parser.bytes < SITEMAP_MAX_BYTES
+
+    def add_entries(self, entries):
+        """Take parsed entries until the entry budget is spent; returns False once it is"""
+        for kind, loc in entries:
+            if self.entries >= SITEMAP_MAX_ENTRIES:
+                return False
+            if kind == "sitemap":
+                if loc not in self.queued:
+                    self.queued.add(loc)
+                    self.pending.append(loc)
+                continue
+            self.entries += 1
+            if self.is_candidate(loc):
+                self.ranking.add(loc)
+        return self.entries < SITEMAP_MAX_ENTRIES
+
+    def is_candidate(self, url):
+        """Same-host HTML page"""
+        if comparable_host(url) != self.host:
+            return False
+        extension = os.path.splitext(urlparse(url).path)[1].lower()
+        return not extension or extension in ALLOWED_WEB_EXTENSIONS
+
+    def candidates(self):
+        """Ranked (score, url) candidates that robots.txt allows, best first"""
+        # Checked only for the kept candidates rather than every sitemap entry
+        return [(score, url) for score, url in self.ranking.ranked() if self.allowed is None or self.allowed(url)]
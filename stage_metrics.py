@@ -0,0 +1,304 @@
+"""
+Per-stage spans and metrics for 2_coursera_agent.py.
+
+The agent's pipeline stages are wrapped with @timed_stage. Every call (sync or async)
+becomes a span recording its duration plus the counters the stage adds through
+annotate_span while it runs:
+
+    discovery           -> reading a lead's robots.txt sitemaps before the crawl (bytes)
+    fetch               -> downloading a page (bytes, retries, politeness waits included)
+    parse               -> extracting text and links from HTML (bytes)
+    contact_harvest     -> finding contacts in a crawled page's HTML (bytes)
+    url_filter          -> choosing which links to follow (keyword ranker, Gemini tokens when ambiguous)
+    recommendation_llm  -> Gemini evaluating pages / forcing a recommendation (tokens)
+    perplexity          -> Perplexity contact research (tokens)
+    contact_extraction  -> Gemini turning the Perplexity answer into contacts (tokens)
+    write               -> writing a lead's JSON result (bytes)
+
+Spans are aggregated in the process-wide STAGE_METRICS (batch summary, benchmarks and a
+Prometheus text endpoint started with start_metrics_server) and, when configure_trace
+was called, appended as one JSON object per line to a trace file tagged with the lead
+set by lead_scope.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STAGES = ("discovery", "fetch", "parse", "contact_harvest", "url_filter", "recommendation_llm", "perplexity", "contact_extraction", "write")
+
+# Counters a stage can add to its span; they are summed per stage
+SPAN_COUNTERS = ("bytes", "prompt_tokens", "response_tokens", "retries")
+
+# Upper bounds (seconds) of the Prometheus duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_current_lead = contextvars.ContextVar("current_lead", default=None)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Span:
+    """One timed call of a pipeline stage"""
+
+    def __init__(self, stage, function):
+        self.stage = stage
+        self.function = function
+        self.lead = _current_lead.get()
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.counters = dict.fromkeys(SPAN_COUNTERS, 0)
+        self.attributes = {}
+
+    def to_dict(self):
+        return {
+            "ts": self.started_at,
+            "lead": self.lead,
+            "stage": self.stage,
+            "function": self.function,
+            "duration_ms": round(self.duration * 1000, 3),
+            **self.counters,
+            **self.attributes
+        }
+
+
+def annotate_span(**counters):
+    """Add to the numeric counters (bytes, prompt_tokens, ...) of the span currently running"""
+    span = _current_span.get()
+    if span is not None:
+        for name, value in counters.items():
+            span.counters[name] = span.counters.get(name, 0) + (value or 0)
+
+
+def set_span_attributes(**attributes):
+    """Attach extra attributes (status, cache_hit, ...) to the span currently running"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+@contextlib.contextmanager
+def lead_scope(lead):
+    """Tag every span started inside the block (in this thread or task) with a lead"""
+    token = _current_lead.set(lead)
+    try:
+        yield
+    finally:
+        _current_lead.reset(token)
+
+
+class StageMetrics:
+    """Thread-safe per-stage aggregates of finished spans"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.durations = {stage: [] for stage in STAGES}
+            self.totals = {}
+            self.buckets = {}
+
+    def record(self, span):
+        with self.lock:
+            self.durations.setdefault(span.stage, []).append(span.duration)
+            totals = self.totals.setdefault(span.stage, dict.fromkeys(SPAN_COUNTERS + ("errors",), 0))
+            for name in SPAN_COUNTERS:
+                totals[name] += span.counters.get(name, 0)
+            if "error" in span.attributes:
+                totals["errors"] += 1
+            buckets = self.buckets.setdefault(span.stage, [0] * len(DURATION_BUCKETS))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    buckets[i] += 1
+
+    def summary(self):
+        """Count, latency percentiles (ms) and counter totals for every stage that ran"""
+        with self.lock:
+            durations = {stage: sorted(values) for stage, values in self.durations.items() if values}
+            totals = {stage: dict(values) for stage, values in self.totals.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "total_s": sum(values),
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "max_ms": values[-1] * 1000,
+                **totals[stage]
+            }
+            for stage, values in durations.items()
+        }
+
+    def render_prometheus(self):
+        """Aggregates in the Prometheus text exposition format"""
+        with self.lock:
+            durations = {stage: (len(values), sum(values)) for stage, values in self.durations.items() if values}
+            totals = {stage: dict(values) for stage, values in self.totals.items()}
+            buckets = {stage: list(values) for stage, values in self.buckets.items()}
+
+        lines = [
+            "# HELP coursera_stage_duration_seconds Wall time of pipeline stage calls",
+            "# TYPE coursera_stage_duration_seconds histogram"
+        ]
+        for stage, (count, total) in durations.items():
+            for bound, bucket_count in zip(DURATION_BUCKETS, buckets[stage]):
+                lines.append(f'coursera_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {bucket_count}')
+            lines.append(f'coursera_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'coursera_stage_duration_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'coursera_stage_duration_seconds_count{{stage="{stage}"}} {count}')
+
+        counters = [
+            ("coursera_stage_bytes_total", "Bytes downloaded, parsed or written per stage", "bytes", ""),
+            ("coursera_stage_tokens_total", "LLM tokens per stage and direction", "prompt_tokens", ',direction="prompt"'),
+            ("coursera_stage_tokens_total", "LLM response tokens per stage", "response_tokens", ',direction="response"'),
+            ("coursera_stage_retries_total", "Retried attempts per stage", "retries", ""),
+            ("coursera_stage_errors_total", "Stage calls that raised", "errors", "")
+        ]
+        declared = set()
+        for metric, help_text, field, extra_labels in counters:
+            if metric not in declared:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            for stage, values in totals.items():
+                lines.append(f'{metric}{{stage="{stage}"{extra_labels}}} {values[field]}')
+        return "\n".join(lines) + "\n"
+
+
+STAGE_METRICS = StageMetrics()
+
+
+class TraceWriter:
+    """Appends finished spans to a JSONL file, one line per span"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def write(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False)
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+_trace_writer = None
+
+
+def configure_trace(path):
+    """Start appending spans to path (None disables the trace file)"""
+    global _trace_writer
+    close_trace()
+    _trace_writer = TraceWriter(path) if path else None
+
+
+def close_trace():
+    global _trace_writer
+    if _trace_writer is not None:
+        _trace_writer.close()
+        _trace_writer = None
+
+
+def finish_span(span, token):
+    span.duration = time.perf_counter() - span.start
+    _current_span.reset(token)
+    STAGE_METRICS.record(span)
+    writer = _trace_writer
+    if writer is not None:
+        writer.write(span)
+
+
+def timed_stage(stage):
+    """Decorator running each call in a span of the given stage; works for sync and async functions"""
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                span = Span(stage, func.__name__)
+                token = _current_span.set(span)
+                try:
+                    return await func(*args, **kwargs)
+                except BaseException as e:
+                    span.attributes["error"] = type(e).__name__
+                    raise
+                finally:
+                    finish_span(span, token)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            span = Span(stage, func.__name__)
+            token = _current_span.set(span)
+            try:
+                return func(*args, **kwargs)
+            except BaseException as e:
+                span.attributes["error"] = type(e).__name__
+                raise
+            finally:
+                finish_span(span, token)
+        return wrapper
+
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves STAGE_METRICS at /metrics"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = STAGE_METRICS.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve the Prometheus text endpoint on a background thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def format_stage_summary(summary):
+    """Lines of a per-stage latency/volume table for printing"""
+    lines = [f"{'stage':20s} {'calls':>6s} {'mean ms':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'max ms':>9s} "
+             f"{'total s':>9s} {'KB':>9s} {'tokens in':>10s} {'tokens out':>10s} {'retries':>8s}"]
+    for stage in list(STAGES) + [stage for stage in summary if stage not in STAGES]:
+        if stage not in summary:
+            continue
+        stats = summary[stage]
+        lines.append(f"{stage:20s} {stats['count']:6d} {stats['mean_ms']:9.1f} {stats['p50_ms']:9.1f} "
+                     f"{stats['p95_ms']:9.1f} {stats['max_ms']:9.1f} {stats['total_s']:9.2f} "
+                     f"{stats['bytes'] / 1024:9.1f} {stats['prompt_tokens']:10d} {stats['response_tokens']:10d} "
+                     f"{stats['retries']:8d}")
+    return lines
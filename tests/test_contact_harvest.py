@@ -0,0 +1,84 @@
+from constants import LOCAL_CONTACTS_MIN_CONTACTS
+from contact_harvest import ContactHarvest, deobfuscate, harvest_page, honorific_name, looks_like_name
+from contacts import CRAWLED_PAGES
+
+
+def people(found):
+    return [(contact["name"], contact["title"], contact["email"], contact["phone"]) for contact in found]
+
+
+def test_deobfuscate():
+    assert deobfuscate("write to tpo [at] nsut [dot] ac [dot] in today") == "write to tpo@nsut.ac.in today"
+    assert deobfuscate("hod(at)cse.x.edu") == "hod@cse.x.edu"
+
+
+def test_names():
+    assert honorific_name("Principal Dr. Anita Sharma Phone: 011 2345 6789") == "Dr. Anita Sharma"
+    assert honorific_name("Contact Prof. Rao Mr. Singh") == "Prof. Rao"
+    assert honorific_name("Dr. Vishwakarma Engineering College") == ""
+    assert honorific_name("Dr. Anita Sharma HOD, Computer Science") == "Dr. Anita Sharma"
+    assert honorific_name("Mr. Dean Jones") == "Mr. Dean Jones"
+    assert looks_like_name("Anita Sharma")
+    assert not looks_like_name("Department Of Physics")
+    assert not looks_like_name("Delhi Public School")
+
+
+def test_mailto_link_in_a_faculty_card():
+    html = """<html><body><div class="nav">Home | About</div>
+    <div class="card"><h3>Dr. Anita Sharma</h3><p>HOD, Computer Science</p>
+    <a href="mailto:hod.cse@x.edu?subject=Hi">Email</a></div></body></html>"""
+    assert people(harvest_page(html)) == [("Dr. Anita Sharma", "HOD", "hod.cse@x.edu", "")]
+
+
+def test_phone_numbers_need_a_role_or_label():
+    html = """<body><p>Training and Placement Officer: Mr. Ravi Kumar, Mobile: 98765 43210</p>
+    <p>Established 1998, 12000 students, 2345 6789 0000</p></body>"""
+    assert people(harvest_page(html)) == [("Mr. Ravi Kumar", "Training and Placement Officer", "", "98765 43210")]
+
+
+def test_several_people_in_one_block():
+    html = """<table><tr><td>Dean Academics Dr. P Gupta dean@x.edu
+    Registrar Mr. S Jain registrar@x.edu</td></tr></table>"""
+    assert people(harvest_page(html)) == [
+        ("Dr. P Gupta", "Dean", "dean@x.edu", ""), ("Mr. S Jain", "Registrar", "registrar@x.edu", "")
+    ]
+
+
+def test_json_ld_and_hcards():
+    html = """<head><script type="application/ld+json">{"@context": "https://schema.org", "@type": "CollegeOrUniversity",
+      "email": "info@x.edu", "contactPoint": {"@type": "ContactPoint", "contactType": "Admissions", "telephone": "+91 11 2345 6789"},
+      "employee": [{"@type": "Person", "name": "Anita Sharma", "jobTitle": "Principal", "email": "mailto:principal@x.edu"}]}</script>
+    <script type="application/ld+json">not json</script></head>
+    <body><div class="vcard"><span class="fn">Ravi Kumar</span><span class="title">Head of Sales</span>
+    <a class="email" href="mailto:ravi@x.com">ravi@x.com</a></div></body>"""
+    found = people(harvest_page(html))
+    assert ("", "", "info@x.edu", "") in found
+    assert ("", "Admissions", "", "+91 11 2345 6789") in found
+    assert ("Anita Sharma", "Principal", "principal@x.edu", "") in found
+    assert ("Ravi Kumar", "Head of Sales", "ravi@x.com", "") in found
+
+
+def test_hidden_text_is_ignored():
+    assert harvest_page("<body><script>var email = 'dev@x.edu';</script></body>") == []
+
+
+def test_harvest_merges_pages_and_tags_the_source():
+    harvest = ContactHarvest()
+    harvest.add_page("https://x.edu/contact", '<p>HOD Dr. A Rao <a href="mailto:hod@x.edu">hod@x.edu</a></p>')
+    harvest.add_page("https://x.edu/cse", '<p>Dr. A Rao, HOD: <a href="mailto:HOD@x.edu">Mail</a> Phone 011-2345-6789</p>')
+    harvest.add_page("https://x.edu/about", '<p><a href="mailto:info@x.edu">info@x.edu</a></p>')
+
+    contacts = harvest.contacts()
+    assert harvest.pages == 3
+    assert [(contact["name"], contact["email"]) for contact in contacts] == [("Dr. A Rao", "hod@x.edu"), ("", "info@x.edu")]
+    assert contacts[0]["phone"] == "+911123456789"
+    assert all(contact["source"] == CRAWLED_PAGES for contact in contacts)
+
+
+def test_enough_counts_named_contacts():
+    harvest = ContactHarvest()
+    page = "".join(f'<p>Dr. Person{i} Name <a href="mailto:p{i}@x.edu">mail</a></p><hr>' for i in range(LOCAL_CONTACTS_MIN_CONTACTS - 1))
+    harvest.add_page("https://x.edu/a", page + '<p><a href="mailto:office@x.edu">office@x.edu</a></p>')
+    assert not harvest.enough()
+    harvest.add_page("https://x.edu/b", '<p>Registrar <a href="mailto:registrar@x.edu">registrar@x.edu</a></p>')
+    assert harvest.enough()
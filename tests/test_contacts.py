@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+from contacts import (
+    CRAWLED_PAGES, ContactDirectory, ContactIndex, dedupe_contacts, normalize_contact, normalize_phone_number,
+    normalize_phones, parent_domain
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("98765 43210", "+919876543210"),
+    ("080-26993894", "+918026993894"),
+    ("+91 98765 43210", "+919876543210"),
+    ("(+1) 415 555 0100", "+14155550100"),
+    ("919876543210", "+919876543210"),
+    ("0091 98765 43210", "00919876543210"),
+    ("26993894", "26993894"),
+    ("ext 123", None),
+])
+def test_normalize_phone_number(text, expected):
+    assert normalize_phone_number(text) == expected
+
+
+def test_normalize_phones_splits_and_dedupes():
+    assert normalize_phones("98765 43210 / 098765-43210, 080 2699 3894 or 12") == ["+919876543210", "+918026993894"]
+    assert normalize_phones(None) == []
+
+
+@pytest.mark.parametrize("domain, expected", [
+    ("dms.iitd.ac.in", "iitd.ac.in"),
+    ("www.IITD.ac.in", "iitd.ac.in"),
+    ("careers.example.com", "example.com"),
+    ("example.com", "example.com"),
+    ("192.168.1.5:8080", "192.168.1.5:8080"),
+])
+def test_parent_domain(domain, expected):
+    assert parent_domain(domain) == expected
+
+
+def test_normalize_contact_drops_placeholders():
+    assert normalize_contact({"name": "Not Found", "title": "N/A", "email": "HOD@X.EDU", "phone": "N/A"}) == {
+        "name": "", "title": "", "email": "hod@x.edu", "phone": ""
+    }
+    assert normalize_contact({"name": "Dr. A", "email": "Not Found", "phone": ""}) is None
+
+
+def test_contacts_sharing_an_email_are_merged():
+    index = ContactIndex()
+    index.add({"name": "", "title": "HOD", "email": "a@x.edu"}, "x.edu")
+    index.add({"name": "Dr. A Kumar", "title": "Professor", "email": "A@x.edu", "phone": "98765 43210"}, "cs.x.edu")
+    assert index.contacts(with_domains=True) == [{
+        "name": "Dr. A Kumar", "title": "HOD", "email": "a@x.edu", "phone": "+919876543210",
+        "domains": ["x.edu", "cs.x.edu"]
+    }]
+
+
+def test_contacts_with_the_same_name_merge_only_under_one_parent_domain():
+    index = ContactIndex()
+    index.add({"name": "Dr. A Kumar", "email": "a@x.edu"}, "cs.x.edu")
+    index.add({"name": "a kumar", "phone": "98765 43210"}, "ee.x.edu")
+    index.add({"name": "A Kumar", "email": "kumar@y.edu"}, "y.edu")
+    assert len(index) == 2
+    assert index.contacts()[0]["phone"] == "+919876543210"
+
+
+def test_a_shared_phone_only_merges_anonymous_contacts():
+    index = ContactIndex()
+    index.add({"title": "Office", "phone": "080 2699 3894"})
+    index.add({"title": "Reception", "phone": "080-26993894"})
+    index.add({"name": "Dr. B", "phone": "080 2699 3894"})
+    assert [contact["title"] for contact in index.contacts()] == ["Office", ""]
+
+
+def test_dedupe_contacts():
+    contacts = [{"name": "A", "email": "a@x.edu"}, {"name": "A", "email": "a@x.edu"}, {"name": "Unknown"}]
+    assert dedupe_contacts(contacts, "x.edu") == [{"name": "A", "title": "", "email": "a@x.edu", "phone": ""}]
+
+
+def result(course, contacts, **contact_info):
+    return {"course_recommendation": {"recommended_course": course},
+            "contact_info": {"contacts": contacts, **contact_info}}
+
+
+def test_directory_shares_contacts_per_parent_domain_and_course():
+    directory = ContactDirectory()
+    assert directory.seed([
+        ("home.x.ac.in", "ok", result("Sales Course", [{"name": "A", "email": "a@x.ac.in"}])),
+        ("old.y.ac.in", "failed", result("Sales Course", [{"name": "B", "email": "b@y.ac.in"}])),
+        ("z.edu", "ok", result("Sales Course", [{"name": "C", "email": "c@z.edu"}], source=CRAWLED_PAGES)),
+    ]) == 1
+
+    outcome, (source, contacts) = directory.claim("dms.x.ac.in", "Sales Course", threading.Event)
+    assert outcome == "shared" and source == "home.x.ac.in" and contacts[0]["email"] == "a@x.ac.in"
+    assert directory.claim("dms.x.ac.in", "Programming Course", threading.Event) == ("research", None)
+    # A lead never reuses its own earlier contacts
+    assert directory.claim("home.x.ac.in", "Sales Course", threading.Event) == ("research", None)
+
+
+def test_directory_waiters_are_released_and_harvested_contacts_not_shared():
+    directory = ContactDirectory()
+    assert directory.claim("a.x.edu", "Sales Course", threading.Event) == ("research", None)
+    outcome, event = directory.claim("b.x.edu", "Sales Course", threading.Event)
+    assert outcome == "wait" and not event.is_set()
+
+    directory.record("a.x.edu", "Sales Course", [{"name": "H", "email": "h@x.edu", "source": CRAWLED_PAGES}])
+    assert event.is_set()
+    assert directory.claim("b.x.edu", "Sales Course", threading.Event) == ("research", None)
+
+    directory.record("b.x.edu", "Sales Course", [{"name": "P", "email": "p@x.edu"}])
+    assert directory.claim("c.x.edu", "Sales Course", threading.Event)[0] == "shared"
@@ -0,0 +1,62 @@
+import importlib
+
+import pytest
+
+from constants import FETCH_MAX_BYTES
+from fetch_policy import ACCEPT_ENCODING, BodyBudget, crawlable_url, rejection_reason
+from page_cache import PageCache
+
+agent = importlib.import_module("2_coursera_agent")
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://x.edu/about", True),
+    ("https://x.edu/about.php", True),
+    ("https://x.edu/people/dr.smith", True),
+    ("https://x.edu/brochure.PDF", False),
+    ("https://x.edu/logo.png", False),
+    ("https://x.edu/files/archive.zip?download=1", False),
+])
+def test_crawlable_url(url, expected):
+    assert crawlable_url(url) is expected
+
+
+def test_rejection_reason():
+    assert rejection_reason({"Content-Type": "text/html; charset=utf-8", "Content-Length": "1000"}) is None
+    assert rejection_reason({}) is None
+    assert rejection_reason({"Content-Type": "application/pdf"}) == "not HTML (application/pdf)"
+    assert rejection_reason({"Content-Type": "text/html", "Content-Length": str(FETCH_MAX_BYTES + 1)}).startswith("too large")
+
+
+def test_accept_encoding_offers_only_decodable_codings():
+    assert "gzip" in ACCEPT_ENCODING
+    assert "compress" not in ACCEPT_ENCODING
+
+
+def test_body_budget_keeps_the_body_within_the_byte_limit():
+    budget = BodyBudget(max_bytes=10)
+    assert budget.add(b"12345")
+    assert not budget.truncated
+    assert not budget.add(b"67890abc")
+    assert budget.body() == b"1234567890"
+    assert budget.truncated
+
+
+def test_body_budget_stops_at_the_deadline():
+    budget = BodyBudget(max_seconds=0)
+    assert not budget.add(b"<html>")
+    assert budget.body() == b"<html>"
+    assert budget.truncated
+
+
+def test_truncated_bodies_are_not_cached(tmp_path, monkeypatch):
+    cache = PageCache(str(tmp_path))
+    monkeypatch.setattr(agent, "get_page_cache", lambda: cache)
+
+    complete = agent.FetchedResponse("https://x.edu/", 200, {}, b"<html>all</html>")
+    truncated = agent.FetchedResponse("https://x.edu/big", 200, {}, b"<html>part", truncated=True)
+    assert agent.resolve_cached_response("https://x.edu/", complete, None) is complete
+    assert agent.resolve_cached_response("https://x.edu/big", truncated, None) is truncated
+
+    assert cache.get("https://x.edu/").content == b"<html>all</html>"
+    assert cache.get("https://x.edu/big") is None
@@ -0,0 +1,204 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from gemini_batcher import AsyncGeminiBatcher, GeminiBatcher, build_batch_prompt, split_batch_prompt
+
+
+class FakeGemini:
+    """
+    Answers every task with {"echo": <its prompt>}. Tasks in drop are left out of batched
+    answers, prompts in fail raise when sent alone, and fail_batches makes batch requests raise.
+    """
+
+    def __init__(self, drop=(), fail=(), fail_batches=False, malformed=False):
+        self.drop = set(drop)
+        self.fail = set(fail)
+        self.fail_batches = fail_batches
+        self.malformed = malformed
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def answer(self, prompt):
+        with self.lock:
+            self.prompts.append(prompt)
+        tasks = split_batch_prompt(prompt)
+        if tasks is None:
+            if prompt in self.fail:
+                raise RuntimeError(f"{prompt} failed")
+            return echo(prompt), {"tokens": 10}
+        if self.fail_batches:
+            raise RuntimeError("batch failed")
+        if self.malformed:
+            return "Sorry, here are your answers: {", {"tokens": 10}
+        answers = [{"id": task_id, "answer": {"echo": task}} for task_id, task in tasks if task not in self.drop]
+        return json.dumps({"answers": answers}), {"tokens": 10 * len(tasks)}
+
+    def send(self, prompt):
+        return self.answer(prompt)
+
+    async def send_async(self, prompt):
+        await asyncio.sleep(0)
+        return self.answer(prompt)
+
+
+def echo(prompt):
+    return json.dumps({"echo": prompt})
+
+
+def submit_all(batcher, prompts):
+    """Submit prompts from concurrent threads; returns {prompt: outcome or exception}"""
+    outcomes = {}
+
+    def submit(prompt):
+        try:
+            outcomes[prompt] = batcher.submit(prompt)
+        except Exception as e:
+            outcomes[prompt] = e
+
+    threads = [threading.Thread(target=submit, args=(prompt,)) for prompt in prompts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert not any(thread.is_alive() for thread in threads)
+    return outcomes
+
+
+def submit_all_async(batcher, prompts):
+    async def submit_one(prompt):
+        try:
+            return await batcher.submit(prompt)
+        except Exception as e:
+            return e
+
+    async def submit():
+        return await asyncio.wait_for(asyncio.gather(*(submit_one(prompt) for prompt in prompts)), 10)
+
+    return dict(zip(prompts, asyncio.run(submit())))
+
+
+def test_batch_prompt_round_trip():
+    prompts = ["Classify a.edu", "Filter these URLs:\n/about\n/contact"]
+    assert split_batch_prompt(build_batch_prompt(prompts)) == [("t1", prompts[0]), ("t2", prompts[1])]
+    assert split_batch_prompt("Classify a.edu") is None
+
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    gemini = FakeGemini()
+    batcher = GeminiBatcher(gemini.send, max_items=3, window=30)
+    started = time.monotonic()
+    outcomes = submit_all(batcher, ["p1", "p2", "p3"])
+
+    assert time.monotonic() - started < 5
+    assert len(gemini.prompts) == 1
+    assert outcomes == {p: (echo(p), {"tokens": 10}, 3) for p in ("p1", "p2", "p3")}
+
+
+def test_batch_is_sent_when_the_window_ends():
+    gemini = FakeGemini()
+    batcher = GeminiBatcher(gemini.send, max_items=8, window=0.3)
+    started = time.monotonic()
+    outcomes = submit_all(batcher, ["p1", "p2"])
+
+    assert time.monotonic() - started >= 0.3
+    assert len(gemini.prompts) == 1
+    assert outcomes == {p: (echo(p), {"tokens": 10}, 2) for p in ("p1", "p2")}
+
+
+def test_lone_prompt_is_sent_plain():
+    gemini = FakeGemini()
+    batcher = GeminiBatcher(gemini.send, window=0.01)
+    assert batcher.submit("p1") == (echo("p1"), {"tokens": 10}, 1)
+    assert gemini.prompts == ["p1"]
+
+
+def test_usage_is_shared_by_prompt_size():
+    gemini = FakeGemini()
+    batcher = GeminiBatcher(gemini.send, max_items=2, window=30)
+    outcomes = submit_all(batcher, ["short", "a much longer prompt"])
+    assert outcomes["short"][1]["tokens"] < outcomes["a much longer prompt"][1]["tokens"]
+    assert sum(outcome[1]["tokens"] for outcome in outcomes.values()) == 20
+
+
+def test_missing_answer_is_resent_alone():
+    gemini = FakeGemini(drop={"p2"})
+    batcher = GeminiBatcher(gemini.send, max_items=3, window=30)
+    outcomes = submit_all(batcher, ["p1", "p2", "p3"])
+    assert outcomes["p1"] == (echo("p1"), {"tokens": 10}, 3)
+    assert outcomes["p2"] == (echo("p2"), {"tokens": 10}, 1)
+    assert gemini.prompts[1:] == ["p2"]
+
+
+def test_error_of_a_resent_prompt_reaches_only_its_caller():
+    gemini = FakeGemini(drop={"p2"}, fail={"p2"})
+    batcher = GeminiBatcher(gemini.send, max_items=3, window=30)
+    outcomes = submit_all(batcher, ["p1", "p2", "p3"])
+    assert str(outcomes["p2"]) == "p2 failed"
+    assert outcomes["p1"][0] == echo("p1") and outcomes["p3"][0] == echo("p3")
+
+
+def test_failed_batch_request_is_raised_in_every_caller_of_that_batch():
+    gemini = FakeGemini(fail_batches=True)
+    batcher = GeminiBatcher(gemini.send, max_items=2, window=30)
+    outcomes = submit_all(batcher, ["p1", "p2"])
+    assert all(str(outcome) == "batch failed" for outcome in outcomes.values())
+
+    # The next batch is unaffected
+    gemini.fail_batches = False
+    outcomes = submit_all(batcher, ["p3", "p4"])
+    assert outcomes == {p: (echo(p), {"tokens": 10}, 2) for p in ("p3", "p4")}
+
+
+@pytest.mark.parametrize("answer", [{"malformed": True}, {"drop": {"p1", "p2", "p3"}}])
+def test_unusable_batch_answer_falls_back_to_single_prompts(answer):
+    gemini = FakeGemini(**answer)
+    batcher = GeminiBatcher(gemini.send, max_items=3, window=30)
+    outcomes = submit_all(batcher, ["p1", "p2", "p3"])
+    assert outcomes == {p: (echo(p), {"tokens": 10}, 1) for p in ("p1", "p2", "p3")}
+    assert sorted(gemini.prompts[1:]) == ["p1", "p2", "p3"]
+
+
+def test_long_prompt_is_never_batched():
+    gemini = FakeGemini()
+    batcher = GeminiBatcher(gemini.send, max_chars=10, window=30)
+    assert batcher.submit("x" * 10)[2] == 1
+    assert gemini.prompts == ["x" * 10]
+
+
+def test_async_full_batch_is_sent_without_waiting_for_the_window():
+    gemini = FakeGemini()
+    batcher = AsyncGeminiBatcher(gemini.send_async, max_items=3, window=30)
+    outcomes = submit_all_async(batcher, ["p1", "p2", "p3"])
+    assert len(gemini.prompts) == 1
+    assert outcomes == {p: (echo(p), {"tokens": 10}, 3) for p in ("p1", "p2", "p3")}
+
+
+def test_async_batch_is_sent_when_the_window_ends():
+    gemini = FakeGemini()
+    batcher = AsyncGeminiBatcher(gemini.send_async, max_items=8, window=0.01)
+    outcomes = submit_all_async(batcher, ["p1", "p2"])
+    assert len(gemini.prompts) == 1
+    assert outcomes == {p: (echo(p), {"tokens": 10}, 2) for p in ("p1", "p2")}
+
+
+def test_async_errors_reach_the_right_callers():
+    gemini = FakeGemini(drop={"p2"}, fail={"p2"})
+    batcher = AsyncGeminiBatcher(gemini.send_async, max_items=3, window=30)
+    outcomes = submit_all_async(batcher, ["p1", "p2", "p3"])
+    assert str(outcomes["p2"]) == "p2 failed"
+    assert outcomes["p1"][0] == echo("p1") and outcomes["p3"][0] == echo("p3")
+
+    gemini.fail_batches = True
+    outcomes = submit_all_async(batcher, ["p4", "p5", "p6"])
+    assert all(str(outcome) == "batch failed" for outcome in outcomes.values())
+
+
+def test_async_malformed_answer_falls_back_to_single_prompts():
+    gemini = FakeGemini(malformed=True)
+    batcher = AsyncGeminiBatcher(gemini.send_async, max_items=2, window=30)
+    outcomes = submit_all_async(batcher, ["p1", "p2"])
+    assert outcomes == {p: (echo(p), {"tokens": 10}, 1) for p in ("p1", "p2")}
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from html_extract import EXTRACTORS, extract_page, extract_with_bs4, extract_with_lxml, resolve_backend
+
+pytestmark = pytest.mark.skipif("lxml" not in EXTRACTORS, reason="lxml is not installed")
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "html")
+URL = "https://www.example.ac.in/dir/page.html"
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("name", sorted(os.listdir(FIXTURES_DIR)))
+def test_lxml_matches_bs4_on_fixture_pages(name):
+    content = fixture(name)
+    text, links, anchor_texts = extract_with_bs4(URL, content)
+    lxml_text, lxml_links, lxml_anchor_texts = extract_with_lxml(URL, content)
+    assert lxml_text == text
+    assert lxml_links == links
+    # Nested anchors are split differently by the two parsers, so the outer link may lack
+    # an anchor text under lxml; every anchor text it does find matches bs4's
+    assert lxml_anchor_texts.items() <= anchor_texts.items()
+
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"   ",
+    "<p>Café &amp; canteen</p>".encode("utf-8"),
+    "<p>Café</p>".encode("cp1252"),
+    b"<?xml version='1.0' encoding='utf-8'?><html><body><a href='/a'>A</a></body></html>",
+    b"<p>Unclosed <b>bold <a href='x.html'>link",
+    b"<a href='https://other.org/'>Elsewhere</a><a href='#top'>Top</a><a>No href</a>",
+    "<p>Already decoded</p><a href='/b'>B</a>",
+])
+def test_lxml_matches_bs4_on_edge_cases(content):
+    assert extract_with_lxml(URL, content) == extract_with_bs4(URL, content)
+
+
+def test_removed_elements_keep_their_tail_text():
+    text, links, _ = extract_with_lxml(URL, b"<body><nav><a href='/n'>Menu</a></nav>After nav<script>x()</script> end</body>")
+    assert text == "After nav end"
+    assert links == ["https://www.example.ac.in/n"]
+
+
+def test_backend_resolution():
+    assert resolve_backend("auto") == "lxml"
+    assert extract_page(URL, b"<p>Hi</p>", "bs4") == extract_page(URL, b"<p>Hi</p>", "lxml")
+    with pytest.raises(ValueError):
+        resolve_backend("html5lib")
@@ -0,0 +1,42 @@
+import time
+
+from llm_cache import LLMCache, normalize_prompt, prompt_cache_key
+
+
+def test_cosmetic_prompt_edits_share_a_key():
+    assert normalize_prompt("\n    Pick one:\n\n    A or B\n") == "Pick one:\nA or B"
+    assert prompt_cache_key("gemini", "  Pick one:\n\nA or B") == prompt_cache_key("gemini", "Pick one:\nA or B")
+    assert prompt_cache_key("gemini", "prompt") != prompt_cache_key("other-model", "prompt")
+
+
+def test_hit_and_miss_are_counted(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"))
+    assert cache.get("gemini", "prompt") is None
+    cache.put("gemini", "prompt", "answer")
+    assert cache.get("gemini", "prompt") == "answer"
+    assert cache.stats() == {"hits": 1, "misses": 1, "bypassed": 0}
+
+
+def test_expired_entries_miss(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), ttl=60)
+    cache.put("gemini", "prompt", "answer")
+    cache.db.execute("UPDATE responses SET created_at = ?", (time.time() - 120,))
+    assert cache.get("gemini", "prompt") is None
+
+
+def test_bypass_skips_lookups_but_stores(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    cache = LLMCache(path, bypass=True)
+    cache.put("gemini", "prompt", "answer")
+    assert cache.get("gemini", "prompt") is None
+    assert cache.stats()["bypassed"] == 1
+    assert LLMCache(path).get("gemini", "prompt") == "answer"
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    cache = LLMCache(str(tmp_path / "llm.sqlite3"), max_bytes=10)
+    cache.put("gemini", "first", "aaaaaa")
+    time.sleep(0.01)
+    cache.put("gemini", "second", "bbbbbb")
+    assert cache.get("gemini", "first") is None
+    assert cache.get("gemini", "second") == "bbbbbb"
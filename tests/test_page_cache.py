@@ -0,0 +1,64 @@
+import os
+import time
+
+from page_cache import CachedPage, PageCache, normalize_cache_key
+
+
+def test_normalize_cache_key_merges_equivalent_urls():
+    assert normalize_cache_key("HTTP://Example.edu:80?b=2&a=1#top") == "http://example.edu/?a=1&b=2"
+    assert normalize_cache_key("https://example.edu:8443/x") == "https://example.edu:8443/x"
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("https://example.edu/", {"ETag": '"v1"', "Content-Type": "text/html"}, b"<html>hi</html>")
+
+    page = cache.get("https://EXAMPLE.edu")
+    assert page.content == b"<html>hi</html>"
+    assert page.headers["etag"] == '"v1"'
+    assert page.is_fresh(cache.ttl)
+    assert cache.get("https://example.edu/other") is None
+
+
+def test_no_store_responses_are_not_cached(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("https://example.edu/", {"Cache-Control": "private, no-store"}, b"secret")
+    assert cache.get("https://example.edu/") is None
+
+
+def test_conditional_headers():
+    page = CachedPage("https://example.edu/", {"etag": '"v1"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+                      b"", time.time())
+    assert page.conditional_headers() == {
+        "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"
+    }
+
+
+def test_stale_entry_is_refreshed_by_revalidation(tmp_path):
+    cache = PageCache(str(tmp_path), ttl=60)
+    cache.put("https://example.edu/", {}, b"body")
+    cache.db.execute("UPDATE pages SET fetched_at = ?", (time.time() - 120,))
+    assert not cache.get("https://example.edu/").is_fresh(cache.ttl)
+
+    cache.mark_revalidated("https://example.edu/")
+    assert cache.get("https://example.edu/").is_fresh(cache.ttl)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=10)
+    cache.put("https://example.edu/a", {}, b"aaaaaa")
+    time.sleep(0.01)
+    cache.put("https://example.edu/b", {}, b"bbbbbb")
+
+    assert cache.get("https://example.edu/a") is None
+    assert cache.get("https://example.edu/b").content == b"bbbbbb"
+    assert sum(len(files) for _, _, files in os.walk(tmp_path / "bodies")) == 1
+
+
+def test_missing_body_is_a_miss(tmp_path):
+    cache = PageCache(str(tmp_path))
+    cache.put("https://example.edu/", {}, b"body")
+    for directory, _, files in os.walk(tmp_path / "bodies"):
+        for name in files:
+            os.remove(os.path.join(directory, name))
+    assert cache.get("https://example.edu/") is None
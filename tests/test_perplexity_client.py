@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import perplexity_client
+from constants import PERPLEXITY_MAX_RETRIES
+from perplexity_client import AIMDWindow, AsyncPerplexityClient, PerplexityClient, PerplexityError
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(perplexity_client, "backoff_delay", lambda attempt: 0)
+
+
+def test_success_grows_the_window_back_to_the_ceiling():
+    window = AIMDWindow(4)
+    window.size = 2.0
+    assert window.outcome(0, 200, None, 0) == "ok"
+    assert window.size == 2.5
+    for _ in range(10):
+        window.outcome(0, 200, None, 0)
+    assert window.limit == 4
+
+
+def test_throttling_halves_the_window_once_per_round():
+    window = AIMDWindow(8)
+    started = time.monotonic()
+    assert window.outcome(started, 429, None, 0) == 0
+    assert window.outcome(started, 503, None, 0) == 0
+    assert window.limit == 4
+
+    # A request started after that halving halves it again
+    assert window.outcome(time.monotonic(), 429, None, 0) == 0
+    assert window.limit == 2
+
+
+def test_window_never_drops_below_one():
+    window = AIMDWindow(2)
+    for _ in range(5):
+        window.outcome(time.monotonic(), 429, None, 0)
+    assert window.limit == 1
+
+
+def test_retry_after_holds_every_request():
+    window = AIMDWindow(4)
+    assert window.outcome(time.monotonic(), 429, "30", 0) == 0
+    assert window.wait_time(time.monotonic()) == pytest.approx(30, abs=1)
+
+
+def test_full_window_blocks_new_requests():
+    window = AIMDWindow(1)
+    window.in_flight = 1
+    assert window.wait_time(time.monotonic()) is None
+
+
+def test_transport_errors_retry_without_shrinking_the_window():
+    window = AIMDWindow(4)
+    assert window.outcome(time.monotonic(), None, None, 0) == 0
+    assert window.limit == 4
+
+
+def test_client_errors_and_exhausted_retries_raise():
+    window = AIMDWindow(4)
+    with pytest.raises(PerplexityError) as error:
+        window.outcome(time.monotonic(), 401, None, 0)
+    assert error.value.status == 401
+    with pytest.raises(PerplexityError):
+        window.outcome(time.monotonic(), 429, None, PERPLEXITY_MAX_RETRIES)
+
+
+def scripted_send(responses):
+    """A send function answering with the given (status, Retry-After, body) tuples, then 200s"""
+    responses = list(responses)
+    calls = []
+
+    def send(payload):
+        calls.append(payload)
+        if responses:
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        return 200, None, b'{"ok": true}'
+    return send, calls
+
+
+def test_client_retries_throttled_and_failed_requests():
+    send, calls = scripted_send([(429, None, b""), ConnectionError("reset"), (502, None, b"")])
+    body, info = PerplexityClient(send).post({"q": 1})
+    assert body == b'{"ok": true}'
+    assert info == {"retries": 3, "coalesced": False}
+    assert len(calls) == 4
+
+
+def test_client_gives_up_on_client_errors():
+    send, calls = scripted_send([(400, None, b"bad request")])
+    with pytest.raises(PerplexityError):
+        PerplexityClient(send).post({"q": 1})
+    assert len(calls) == 1
+
+
+def test_identical_requests_in_flight_share_one_call():
+    release = threading.Event()
+    calls = []
+
+    def send(payload):
+        calls.append(payload)
+        release.wait(5)
+        return 200, None, b"answer"
+
+    client = PerplexityClient(send)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.post({"q": 1}))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while not calls:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(info["coalesced"] for _, info in results) == [False, True, True]
+
+
+def test_async_client_limits_concurrency_and_coalesces():
+    active, peak, calls = 0, 0, []
+
+    async def send(payload):
+        nonlocal active, peak
+        calls.append(payload)
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return 200, None, b"answer"
+
+    async def run():
+        client = AsyncPerplexityClient(send, ceiling=2)
+        return await asyncio.gather(*[client.post({"q": i % 5}) for i in range(10)])
+
+    results = asyncio.run(run())
+    assert len(calls) == 5
+    assert peak == 2
+    assert sum(info["coalesced"] for _, info in results) == 5
+
+
+def test_async_client_retries():
+    responses = [(503, "0", b""), (200, None, b"answer")]
+
+    async def send(payload):
+        return responses.pop(0)
+
+    body, info = asyncio.run(AsyncPerplexityClient(send).post({"q": 1}))
+    assert body == b"answer"
+    assert info["retries"] == 1
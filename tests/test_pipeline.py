@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+from pipeline import AsyncStagePipeline, Stage, StagePipeline
+
+
+def run_with_timeout(pipeline, items, timeout=10):
+    """Run a StagePipeline on a thread; fails the test instead of hanging when run() never returns"""
+    thread = threading.Thread(target=pipeline.run, args=(items,), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline.run() did not return"
+
+
+def double(item):
+    item["value"] *= 2
+
+
+def fail_odd(item):
+    if item["value"] % 2:
+        raise ValueError(f"odd {item['value']}")
+
+
+def test_items_pass_through_every_stage():
+    done = []
+    pipeline = StagePipeline([Stage("double", double, 2), Stage("add", lambda item: item.update(value=item["value"] + 1), 1)],
+                             2, lambda item, error: done.append((item["value"], error)))
+    run_with_timeout(pipeline, ({"value": n} for n in range(20)))
+    assert sorted(done) == [(2 * n + 1, None) for n in range(20)]
+
+
+def test_failed_items_are_reported_once_and_dropped():
+    done, later = [], []
+    pipeline = StagePipeline([Stage("check", fail_odd, 2), Stage("later", later.append, 1)],
+                             2, lambda item, error: done.append((item["value"], type(error).__name__ if error else None)))
+    run_with_timeout(pipeline, ({"value": n} for n in range(10)))
+    assert sorted(done) == [(n, "ValueError" if n % 2 else None) for n in range(10)]
+    assert len(later) == 5
+
+
+def test_a_failing_callback_does_not_stop_the_pipeline():
+    reported = []
+
+    def on_done(item, error):
+        reported.append(item["value"])
+        # e.g. writing the error record to a full disk
+        raise OSError("disk full")
+
+    pipeline = StagePipeline([Stage("check", fail_odd, 1), Stage("write", double, 1)], 1, on_done)
+    run_with_timeout(pipeline, ({"value": n} for n in range(30)))
+    assert len(reported) == 30
+
+
+def test_async_pipeline_survives_a_failing_callback():
+    reported = []
+
+    async def check(item):
+        fail_odd(item)
+
+    async def write(item):
+        await asyncio.sleep(0)
+
+    def on_done(item, error):
+        reported.append((item["value"], error is not None))
+        raise OSError("database is locked")
+
+    pipeline = AsyncStagePipeline([Stage("check", check, 2), Stage("write", write, 1)], 1, on_done)
+    asyncio.run(asyncio.wait_for(pipeline.run({"value": n} for n in range(30)), 10))
+    assert sorted(reported) == [(n, bool(n % 2)) for n in range(30)]
+
+
+def test_stop_admits_no_new_items():
+    done = []
+    pipeline = StagePipeline([Stage("double", double, 1)], 1, lambda item, error: done.append(item))
+
+    def items():
+        for n in range(100):
+            if n == 5:
+                pipeline.stop()
+            yield {"value": n}
+
+    run_with_timeout(pipeline, items())
+    assert len(done) == 5
@@ -0,0 +1,78 @@
+import csv
+import importlib
+import time
+
+from place_cache import PlaceStore
+
+fetcher = importlib.import_module("1_institutions_list_fetcher")
+
+HEADER = ["Institution Name", "Institution Type", "Website", "Location", "Phone"]
+
+
+def test_details_are_served_until_stale(tmp_path):
+    store = PlaceStore(str(tmp_path / "places.sqlite3"), ttl=60)
+    assert store.get("p1") is None
+    store.put("p1", "NSUT", {"website": "http://nsut.ac.in/", "formatted_phone_number": "011 2500 0268"})
+    assert store.get("p1")["website"] == "http://nsut.ac.in/"
+
+    store.db.execute("UPDATE places SET fetched_at = ?", (time.time() - 120,))
+    assert store.get("p1") is None
+    assert store.stats() == {"fresh": 1, "stale": 1, "new": 1}
+
+
+def test_refresh_treats_every_entry_as_stale(tmp_path):
+    path = str(tmp_path / "places.sqlite3")
+    PlaceStore(path).put("p1", "NSUT", {"website": "http://nsut.ac.in/"})
+    assert PlaceStore(path, refresh=True).get("p1") is None
+
+
+def read_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))[1:]
+
+
+def write_rows(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def test_merge_keeps_separate_places_sharing_a_website(tmp_path):
+    path = str(tmp_path / "leads.csv")
+    write_rows(path, [
+        ["NSUT", "Colleges", "http://nsut.ac.in/", "Delhi", "N/A"],
+        ["Agency", "Corporates", "https://agency.com/", "Bangalore", "1"],
+        ["Agency", "Corporates", "https://agency.com/", "Bangalore", "1"],
+    ])
+    fetcher.merge_into_csv([
+        ("NSUT (West Campus)", "Colleges", "http://nsut.ac.in", "Delhi", "N/A"),
+        ("nsut", "Colleges", "http://NSUT.ac.in/", "Delhi", "011 2500 0268"),
+    ], path)
+
+    assert read_rows(path) == [
+        ["nsut", "Colleges", "http://NSUT.ac.in/", "Delhi", "011 2500 0268"],
+        ["Agency", "Corporates", "https://agency.com/", "Bangalore", "1"],
+        ["Agency", "Corporates", "https://agency.com/", "Bangalore", "1"],
+        ["NSUT (West Campus)", "Colleges", "http://nsut.ac.in", "Delhi", "N/A"],
+    ]
+
+
+def test_merge_pads_short_rows_instead_of_dropping_them(tmp_path, capsys):
+    path = str(tmp_path / "leads.csv")
+    write_rows(path, [["Old College", "Colleges", "http://old.edu/"]])
+    fetcher.merge_into_csv([("NSUT", "Colleges", "http://nsut.ac.in/", "Delhi", "N/A")], path)
+
+    assert read_rows(path) == [
+        ["Old College", "Colleges", "http://old.edu/", "N/A", "N/A"],
+        ["NSUT", "Colleges", "http://nsut.ac.in/", "Delhi", "N/A"],
+    ]
+    assert "Padded 1 row(s)" in capsys.readouterr().out
+
+
+def test_merge_without_changes_leaves_the_file_alone(tmp_path):
+    path = tmp_path / "leads.csv"
+    write_rows(path, [["NSUT", "Colleges", "http://nsut.ac.in/", "Delhi", "N/A"]])
+    before = path.stat().st_mtime_ns
+    fetcher.merge_into_csv([("NSUT", "Colleges", "http://nsut.ac.in/", "Delhi", "N/A")], str(path))
+    assert path.stat().st_mtime_ns == before
@@ -0,0 +1,124 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from constants import POLITENESS_BURST, POLITENESS_MIN_INTERVAL, POLITENESS_MAX_INTERVAL
+from politeness import DomainScheduler, HostState, parse_crawl_delay, parse_retry_after
+
+
+def scheduler_with_robots(robots_text):
+    """A DomainScheduler that reads robots_text instead of fetching robots.txt"""
+    scheduler = DomainScheduler()
+    scheduler._fetch_robots = lambda url: robots_text
+    return scheduler
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("30") == 30.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+@pytest.mark.parametrize("robots_text, expected", [
+    ("User-agent: *\nCrawl-delay: 5\n", 5.0),
+    ("User-agent: *\nCrawl-delay: 0.5  # fractional\n", 0.5),
+    ("User-agent: Googlebot\nCrawl-delay: 10\n\nUser-agent: *\nDisallow: /private\n", None),
+    ("User-agent: Bingbot\nUser-agent: *\nCrawl-delay: 3\n", 3.0),
+    ("User-agent: *\nDisallow: /\n\nUser-agent: Bingbot\nCrawl-delay: 9\n", None),
+    ("User-agent: *\nCrawl-delay: zero\n", None),
+    ("User-agent: *\nCrawl-delay: 0\n", None),
+    ("", None),
+])
+def test_parse_crawl_delay(robots_text, expected):
+    assert parse_crawl_delay(robots_text) == expected
+
+
+def test_burst_then_paced():
+    state = HostState()
+    now = state.updated
+    waits = [state.reserve(now) for _ in range(POLITENESS_BURST + 2)]
+    assert waits[:POLITENESS_BURST] == [0.0] * POLITENESS_BURST
+    assert waits[POLITENESS_BURST:] == pytest.approx([POLITENESS_MIN_INTERVAL, 2 * POLITENESS_MIN_INTERVAL])
+
+
+def test_tokens_refill_over_time():
+    state = HostState()
+    now = state.updated
+    for _ in range(POLITENESS_BURST):
+        state.reserve(now)
+    assert state.reserve(now + POLITENESS_MIN_INTERVAL) == 0.0
+
+
+def test_crawl_delay_sets_the_pace_without_bursts():
+    scheduler = scheduler_with_robots("User-agent: *\nCrawl-delay: 4\n")
+    state = scheduler.check_robots("https://slow.edu/page")
+    assert state.crawl_delay == 4.0
+    assert state.interval == 4.0
+    now = state.updated
+    assert [state.reserve(now), state.reserve(now)] == pytest.approx([0.0, 4.0])
+
+
+def test_hosts_are_paced_independently():
+    scheduler = scheduler_with_robots(None)
+    for _ in range(POLITENESS_BURST):
+        scheduler.check_robots("https://a.edu/")
+        assert scheduler._reserve("a.edu") == 0.0
+    assert scheduler._reserve("a.edu") > 0
+    assert scheduler._reserve("b.edu") == 0.0
+
+
+def test_throttling_backs_off_and_success_recovers():
+    scheduler = scheduler_with_robots(None)
+    url = "https://busy.edu/"
+    scheduler.report(url, 429)
+    scheduler.report(url, 503)
+    state = scheduler.hosts["busy.edu"]
+    assert state.interval == 4 * POLITENESS_MIN_INTERVAL
+
+    for _ in range(20):
+        scheduler.report(url, 429)
+    assert state.interval == POLITENESS_MAX_INTERVAL
+
+    for _ in range(20):
+        scheduler.report(url, 200)
+    assert state.interval == POLITENESS_MIN_INTERVAL
+
+
+def test_retry_after_blocks_the_host():
+    scheduler = scheduler_with_robots(None)
+    scheduler.report("https://busy.edu/", 429, "20")
+    assert scheduler._reserve("busy.edu") == pytest.approx(20, abs=0.5)
+
+
+def test_other_errors_do_not_back_off():
+    scheduler = scheduler_with_robots(None)
+    scheduler.report("https://broken.edu/", 500)
+    scheduler.report("https://broken.edu/", 404)
+    assert scheduler.hosts["broken.edu"].backoff == 1.0
+
+
+def test_concurrent_tasks_share_one_robots_fetch():
+    scheduler = DomainScheduler()
+    fetches = []
+
+    async def fetch_robots(url, session):
+        fetches.append(url)
+        await asyncio.sleep(0.01)
+        return "User-agent: *\nCrawl-delay: 4\nDisallow: /private"
+
+    async def crawl_delay_seen(url):
+        state = await scheduler.check_robots_async(url, None)
+        return state.crawl_delay
+
+    async def check_all():
+        scheduler._fetch_robots_async = fetch_robots
+        return await asyncio.gather(*(crawl_delay_seen(f"https://slow.edu/page{i}") for i in range(5)))
+
+    # No task goes ahead before robots.txt is applied
+    assert asyncio.run(check_all()) == [4] * 5
+    assert len(fetches) == 1
+    assert not scheduler.allowed("https://slow.edu/private/page")
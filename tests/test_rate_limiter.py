@@ -0,0 +1,57 @@
+import importlib
+import threading
+
+fetcher = importlib.import_module("1_institutions_list_fetcher")
+
+
+class FakeClock:
+    """Stands in for the time module: the clock only moves when a test moves it"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = threading.local()
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.seconds = seconds
+
+    def wait(self, limiter):
+        """Wait on the limiter and return when this thread's request goes out"""
+        self.slept.seconds = 0.0
+        limiter.wait()
+        return self.now + self.slept.seconds
+
+
+def test_shared_limiter_never_exceeds_its_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fetcher, "time", clock)
+    limiter = fetcher.RateLimiter(0.5)
+    sent = []
+
+    def worker():
+        for _ in range(10):
+            sent.append(clock.wait(limiter))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    sent.sort()
+    assert len(sent) == 80
+    assert sent[0] == 100.0
+    assert all(later - earlier >= 0.5 for earlier, later in zip(sent, sent[1:]))
+
+
+def test_limiter_does_not_delay_a_request_after_a_quiet_spell(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(fetcher, "time", clock)
+    limiter = fetcher.RateLimiter(0.5)
+    assert clock.wait(limiter) == 100.0
+    assert clock.wait(limiter) == 100.5
+
+    clock.now = 200.0
+    assert clock.wait(limiter) == 200.0
@@ -0,0 +1,17 @@
+import importlib
+
+agent = importlib.import_module("2_coursera_agent")
+
+
+def test_visited_and_queued_links_are_not_ranked_again():
+    crawl = agent.RecommendationCrawl("https://x.edu", dedup=False)
+    crawl.queue_urls(["https://x.edu/about"])
+    page = agent.Page(url="https://x.edu", links=[
+        "https://x.edu", "https://x.edu/about", "https://x.edu/placements", "https://x.edu/brochure.pdf",
+    ])
+    assert crawl.add_page("https://x.edu", page) == ["https://x.edu/placements"]
+
+
+def test_failed_page_yields_no_links():
+    crawl = agent.RecommendationCrawl("https://x.edu", dedup=False)
+    assert crawl.add_page("https://x.edu", None) == []
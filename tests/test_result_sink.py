@@ -0,0 +1,136 @@
+import json
+import os
+
+from output_filter import CleanedOutputView
+from result_sink import (
+    FAILED, OK, JsonFileSink, JsonlSink, read_new_results, read_saved_results
+)
+
+GOOD = {"contact_info": {"contacts": [{"name": "A", "email": "a@a.edu"}]}}
+EMPTY = {"contact_info": {"contacts": []}}
+ERROR = {"error": "timeout"}
+
+
+def open_sink(tmp_path, **kwargs):
+    return JsonlSink(str(tmp_path / "results.jsonl"), str(tmp_path / "index.sqlite3"),
+                     legacy_directory=str(tmp_path / "outputs"), **kwargs)
+
+
+def test_latest_line_wins(tmp_path):
+    sink = open_sink(tmp_path)
+    sink.write("a.edu", OK, EMPTY)
+    sink.write("a.edu", OK, GOOD)
+    assert sink.get("a.edu") == (OK, GOOD)
+    assert sink.get("b.edu") is None
+    sink.close()
+
+
+def test_failed_retry_keeps_the_last_success(tmp_path):
+    sink = open_sink(tmp_path)
+    sink.write("a.edu", OK, GOOD)
+    sink.write("a.edu", FAILED, ERROR)
+    sink.write("b.edu", FAILED, ERROR)
+    assert sink.get("a.edu") == (OK, GOOD)
+    assert sink.has_result("a.edu")
+    assert sink.get("b.edu") == (FAILED, ERROR)
+    assert not sink.has_result("b.edu")
+    sink.close()
+
+    latest, _ = read_new_results(str(tmp_path / "results.jsonl"))
+    assert latest == {"a.edu": (OK, GOOD), "b.edu": (FAILED, ERROR)}
+
+
+def test_index_is_rebuilt_from_the_file(tmp_path):
+    sink = open_sink(tmp_path)
+    sink.write("a.edu", OK, GOOD)
+    sink.write("a.edu", FAILED, ERROR)
+    sink.write("b.edu", OK, EMPTY)
+    sink.close()
+
+    os.remove(tmp_path / "index.sqlite3")
+    sink = open_sink(tmp_path)
+    assert sink.get("a.edu") == (OK, GOOD)
+    assert sink.get("b.edu") == (OK, EMPTY)
+    sink.close()
+
+
+def test_index_behind_the_file_is_rebuilt(tmp_path):
+    sink = open_sink(tmp_path)
+    sink.write("a.edu", OK, EMPTY)
+    sink.close()
+    with open(tmp_path / "results.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"domain": "a.edu", "status": OK, "result": GOOD}) + "\n")
+
+    sink = open_sink(tmp_path)
+    assert sink.get("a.edu") == (OK, GOOD)
+    sink.close()
+
+
+def test_torn_last_line_is_cut(tmp_path):
+    sink = open_sink(tmp_path)
+    sink.write("a.edu", OK, GOOD)
+    sink.close()
+    with open(tmp_path / "results.jsonl", "ab") as f:
+        f.write(b'{"domain": "b.edu", "sta')
+
+    sink = open_sink(tmp_path)
+    sink.write("c.edu", OK, EMPTY)
+    assert sink.get("c.edu") == (OK, EMPTY)
+    sink.close()
+    latest, _ = read_new_results(str(tmp_path / "results.jsonl"))
+    assert set(latest) == {"a.edu", "c.edu"}
+
+
+def test_read_new_results_resumes_from_an_offset(tmp_path):
+    sink = open_sink(tmp_path)
+    sink.write("a.edu", OK, GOOD)
+    sink.close()
+    path = str(tmp_path / "results.jsonl")
+    _, offset = read_new_results(path)
+
+    with open(path, "ab") as f:
+        f.write(json.dumps({"domain": "b.edu", "status": OK, "result": EMPTY}).encode() + b"\n")
+        f.write(b'{"domain": "c.edu"')
+    latest, end = read_new_results(path, offset)
+    assert latest == {"b.edu": (OK, EMPTY)}
+    assert end == os.path.getsize(path) - len(b'{"domain": "c.edu"')
+
+
+def test_legacy_json_files_are_read_with_the_store_winning(tmp_path):
+    legacy = JsonFileSink(str(tmp_path / "outputs"))
+    legacy.write("old.edu", OK, GOOD)
+    legacy.write("both.edu", OK, EMPTY)
+    legacy.write("retried.edu", OK, GOOD)
+    legacy.write("broken.edu", FAILED, ERROR)
+
+    sink = open_sink(tmp_path)
+    sink.write("both.edu", OK, GOOD)
+    sink.write("retried.edu", FAILED, ERROR)
+    assert sink.has_result("old.edu")
+    assert sink.get("old.edu") == (OK, GOOD)
+    assert sink.get("retried.edu") == (OK, GOOD)
+    sink.close()
+
+    saved = {domain: (status, result) for domain, status, result in
+             read_saved_results(str(tmp_path / "results.jsonl"), str(tmp_path / "outputs"))}
+    assert saved == {
+        "old.edu": (OK, GOOD), "both.edu": (OK, GOOD), "retried.edu": (OK, GOOD), "broken.edu": (FAILED, ERROR)
+    }
+
+
+def test_json_file_sink_replaces_the_error_file_on_success(tmp_path):
+    sink = JsonFileSink(str(tmp_path))
+    sink.write("a.edu", FAILED, ERROR)
+    assert sink.get("a.edu") == (FAILED, ERROR)
+    sink.write("a.edu", OK, GOOD)
+    assert sorted(os.listdir(tmp_path)) == ["a.edu.json"]
+    sink.write("a.edu", FAILED, ERROR)
+    assert sink.get("a.edu") == (OK, GOOD)
+
+
+def test_cleaned_view_follows_results_but_not_failures(tmp_path):
+    view = CleanedOutputView(str(tmp_path))
+    cleaned = tmp_path / "a.edu.json"
+    assert view.write("a.edu", OK, GOOD) and cleaned.exists()
+    assert view.write("a.edu", FAILED, ERROR) and cleaned.exists()
+    assert not view.write("a.edu", OK, EMPTY) and not cleaned.exists()
@@ -0,0 +1,60 @@
+from run_manifest import RunManifest, CONTACTS_DONE, FAILED, PENDING
+
+
+def open_manifest(tmp_path, config_version="c1", prompt_version="p1"):
+    return RunManifest(str(tmp_path / "manifest.sqlite3"), config_version, prompt_version)
+
+
+def never_saved(domain):
+    return False
+
+
+def test_completed_leads_are_skipped(tmp_path):
+    manifest = open_manifest(tmp_path)
+    manifest.mark_pending("a.edu", "https://a.edu")
+    assert manifest.get("a.edu")["state"] == PENDING
+    assert not manifest.is_completed("a.edu", never_saved)
+
+    manifest.mark("a.edu", "https://a.edu", CONTACTS_DONE)
+    assert manifest.is_completed("a.edu", never_saved)
+
+
+def test_mark_pending_keeps_existing_progress(tmp_path):
+    manifest = open_manifest(tmp_path)
+    manifest.mark("a.edu", "https://a.edu", CONTACTS_DONE)
+    manifest.mark_pending("a.edu", "https://a.edu")
+    assert manifest.get("a.edu")["state"] == CONTACTS_DONE
+
+
+def test_leads_from_before_the_manifest_are_recognised_by_their_result(tmp_path):
+    manifest = open_manifest(tmp_path)
+    assert manifest.is_completed("old.edu", lambda domain: domain == "old.edu")
+    assert not manifest.is_completed("new.edu", lambda domain: domain == "old.edu")
+    assert not manifest.is_completed("old.edu", lambda domain: True, rerun_outdated=True)
+
+
+def test_outdated_leads_are_rerun_on_request(tmp_path):
+    open_manifest(tmp_path, "c1").mark("a.edu", "https://a.edu", CONTACTS_DONE)
+    manifest = open_manifest(tmp_path, "c2")
+    assert manifest.is_completed("a.edu", never_saved)
+    assert not manifest.is_completed("a.edu", never_saved, rerun_outdated=True)
+
+
+def test_saved_recommendation_survives_a_failure(tmp_path):
+    manifest = open_manifest(tmp_path)
+    checkpoint = manifest.checkpoint("a.edu", "https://a.edu")
+    assert checkpoint.saved_recommendation() is None
+
+    checkpoint.save_recommendation({"recommended_course": "Sales Course"})
+    manifest.mark("a.edu", "https://a.edu", FAILED, error="timeout")
+    assert checkpoint.saved_recommendation() == {"recommended_course": "Sales Course"}
+
+    # Another prompt version must not reuse it
+    assert open_manifest(tmp_path, prompt_version="p2").checkpoint("a.edu", "https://a.edu").saved_recommendation() is None
+
+
+def test_reset_forgets_a_lead(tmp_path):
+    manifest = open_manifest(tmp_path)
+    manifest.mark("a.edu", "https://a.edu", CONTACTS_DONE)
+    manifest.reset("a.edu")
+    assert manifest.get("a.edu") is None
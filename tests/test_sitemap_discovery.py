@@ -0,0 +1,87 @@
+import gzip
+
+from constants import SITEMAP_MAX_FILES
+from politeness import DomainScheduler, parse_sitemaps
+from sitemap_discovery import CandidateRanking, SitemapDiscovery, SitemapParser
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+TABLE = {"about": 5, "computer-science": 10, "departments": 3}
+
+
+def urlset(*locs):
+    entries = "".join(f"<url><loc> {loc} </loc><lastmod>2024-01-01</lastmod></url>" for loc in locs)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset {NS}>{entries}</urlset>'.encode()
+
+
+def sitemap_index(*locs):
+    entries = "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+    return f"<sitemapindex {NS}>{entries}</sitemapindex>".encode()
+
+
+def parse_in_chunks(body, size):
+    parser = SitemapParser()
+    entries = []
+    for start in range(0, len(body), size):
+        entries += parser.feed(body[start:start + size])
+    return entries
+
+
+def test_entries_are_read_across_chunk_boundaries():
+    body = urlset("https://x.edu/", "https://x.edu/about")
+    assert parse_in_chunks(body, 7) == [("url", "https://x.edu/"), ("url", "https://x.edu/about")]
+
+
+def test_gzipped_sitemaps_are_inflated():
+    body = gzip.compress(urlset(*[f"https://x.edu/page-{i}" for i in range(2000)]))
+    entries = parse_in_chunks(body, 1000)
+    assert len(entries) == 2000
+    assert entries[-1] == ("url", "https://x.edu/page-1999")
+
+
+def test_sitemap_index_entries():
+    body = sitemap_index("https://x.edu/sitemap-pages.xml", "https://x.edu/sitemap-news.xml.gz")
+    assert parse_in_chunks(body, 50) == [
+        ("sitemap", "https://x.edu/sitemap-pages.xml"), ("sitemap", "https://x.edu/sitemap-news.xml.gz")
+    ]
+
+
+def test_ranking_keeps_the_best_urls():
+    ranking = CandidateRanking(TABLE, limit=2)
+    for url in ["https://x.edu/news", "https://x.edu/about", "https://x.edu/a/b/about",
+                "https://x.edu/departments/computer-science", "https://x.edu/about"]:
+        ranking.add(url)
+    assert ranking.ranked() == [(13, "https://x.edu/departments/computer-science"), (5, "https://x.edu/about")]
+
+
+def test_discovery_follows_indexes_and_filters_candidates():
+    discovery = SitemapDiscovery("https://www.x.edu/", [], TABLE, allowed=lambda url: "/private" not in url)
+    assert discovery.next_sitemap() == "https://www.x.edu/sitemap.xml"
+    discovery.read(SitemapParser(), sitemap_index("https://x.edu/pages.xml", "https://www.x.edu/sitemap.xml"))
+
+    assert discovery.next_sitemap() == "https://x.edu/pages.xml"
+    assert discovery.read(SitemapParser(), urlset(
+        "https://x.edu/about", "https://x.edu/brochure.pdf", "https://other.edu/about",
+        "https://x.edu/private/about", "https://x.edu/departments/computer-science.html"
+    ))
+    assert discovery.next_sitemap() is None
+    assert discovery.candidates() == [
+        (13, "https://x.edu/departments/computer-science.html"), (5, "https://x.edu/about")
+    ]
+
+
+def test_discovery_stops_after_the_file_budget():
+    discovery = SitemapDiscovery("https://x.edu/", [f"https://x.edu/s{i}.xml" for i in range(SITEMAP_MAX_FILES + 2)], TABLE)
+    read = [discovery.next_sitemap() for _ in range(SITEMAP_MAX_FILES + 2)]
+    assert read.count(None) == 2
+
+
+def test_robots_txt_sitemaps_and_disallow_rules():
+    robots_text = "Sitemap: https://x.edu/a.xml\nUser-agent: *\nDisallow: /private\n# Sitemap: https://x.edu/old.xml\nsitemap:https://x.edu/b.xml\n"
+    assert parse_sitemaps(robots_text) == ["https://x.edu/a.xml", "https://x.edu/b.xml"]
+
+    scheduler = DomainScheduler()
+    scheduler._fetch_robots = lambda url: robots_text
+    scheduler.check_robots("https://x.edu/")
+    assert scheduler.sitemaps("https://x.edu/") == ["https://x.edu/a.xml", "https://x.edu/b.xml"]
+    assert scheduler.allowed("https://x.edu/about")
+    assert not scheduler.allowed("https://x.edu/private/staff")
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+from stage_metrics import (
+    STAGE_METRICS, annotate_span, close_trace, configure_trace, lead_scope, percentile,
+    set_span_attributes, timed_stage
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    STAGE_METRICS.reset()
+    yield
+    close_trace()
+    STAGE_METRICS.reset()
+
+
+@timed_stage("fetch")
+def fetch(size):
+    annotate_span(bytes=size, retries=1)
+    set_span_attributes(cache_hit=False)
+    return size
+
+
+@timed_stage("recommendation_llm")
+async def ask(tokens):
+    annotate_span(prompt_tokens=tokens, response_tokens=None)
+    return tokens
+
+
+@timed_stage("parse")
+def broken():
+    raise ValueError("bad page")
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([1, 2, 3, 4], 0.5) == 2
+    assert percentile([1, 2, 3, 4], 0.95) == 4
+
+
+def test_sync_and_async_spans_are_aggregated():
+    assert fetch(100) == 100
+    fetch(50)
+    assert asyncio.run(ask(7)) == 7
+
+    summary = STAGE_METRICS.summary()
+    assert summary["fetch"]["count"] == 2
+    assert summary["fetch"]["bytes"] == 150
+    assert summary["fetch"]["retries"] == 2
+    assert summary["recommendation_llm"]["prompt_tokens"] == 7
+    assert summary["recommendation_llm"]["response_tokens"] == 0
+    assert "parse" not in summary
+
+
+def test_errors_are_counted_and_reraised():
+    with pytest.raises(ValueError):
+        broken()
+    assert STAGE_METRICS.summary()["parse"]["errors"] == 1
+
+
+def test_annotations_outside_a_span_are_ignored():
+    annotate_span(bytes=10)
+    set_span_attributes(status=200)
+    assert STAGE_METRICS.summary() == {}
+
+
+def test_trace_lines_are_tagged_with_the_lead(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    configure_trace(str(path))
+    with lead_scope("a.edu"):
+        fetch(10)
+    fetch(20)
+    close_trace()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(span["lead"], span["stage"], span["function"], span["bytes"]) for span in spans] == [
+        ("a.edu", "fetch", "fetch", 10), (None, "fetch", "fetch", 20)
+    ]
+    assert spans[0]["cache_hit"] is False
+
+
+def test_prometheus_rendering():
+    fetch(100)
+    text = STAGE_METRICS.render_prometheus()
+    assert 'coursera_stage_duration_seconds_count{stage="fetch"} 1' in text
+    assert 'coursera_stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 1' in text
+    assert 'coursera_stage_bytes_total{stage="fetch"} 100' in text
+    assert text.count("# TYPE coursera_stage_tokens_total counter") == 1
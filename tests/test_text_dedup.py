@@ -0,0 +1,45 @@
+from text_dedup import GAP, PageTextDedup
+
+MENU = "Home About Us Admissions Departments Placements Contact Us Alumni Gallery"
+FOOTER = "Copyright 2024 Example College of Engineering all rights reserved Privacy Policy"
+
+
+def test_first_page_is_unchanged():
+    dedup = PageTextDedup()
+    text = f"{MENU} Welcome to the college {FOOTER}"
+    assert dedup.filter(text) == text
+    assert dedup.dropped_fraction == 0.0
+
+
+def test_repeated_blocks_are_dropped_from_later_pages():
+    dedup = PageTextDedup()
+    dedup.filter(f"{MENU} Welcome to the college campus in Delhi {FOOTER}")
+    kept = dedup.filter(f"{MENU} The computer science department offers B.Tech and M.Tech {FOOTER}")
+    assert kept == "The computer science department offers B.Tech and M.Tech"
+    assert 0 < dedup.dropped_fraction < 1
+
+
+def test_matching_ignores_case():
+    dedup = PageTextDedup()
+    dedup.filter(MENU)
+    assert dedup.filter(MENU.upper()) == ""
+
+
+def test_short_leftovers_between_repeats_are_discarded():
+    dedup = PageTextDedup(min_run_words=4)
+    dedup.filter(f"{MENU} {FOOTER}")
+    assert dedup.filter(f"{MENU} Page 2 {FOOTER}") == ""
+
+
+def test_new_runs_are_joined_with_a_gap_marker():
+    dedup = PageTextDedup()
+    dedup.filter(f"{MENU} {FOOTER}")
+    kept = dedup.filter(f"Placement statistics for the 2024 batch {MENU} Our recruiters include Infosys and TCS {FOOTER}")
+    assert kept == f"Placement statistics for the 2024 batch{GAP}Our recruiters include Infosys and TCS"
+
+
+def test_pages_shorter_than_a_shingle():
+    dedup = PageTextDedup(shingle_words=8)
+    assert dedup.filter("Contact us") == "Contact us"
+    assert dedup.filter("Contact us") == ""
+    assert dedup.filter("") == ""
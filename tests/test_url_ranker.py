@@ -0,0 +1,42 @@
+from url_ranker import keyword_tokens, rank_urls, score_url, select_urls, tokenize_url
+
+TABLE = {"computer-science": 10, "computer": 2, "placements": 8, "contact": 7, "about": 3}
+
+
+def test_keyword_tokens_join_neighbours():
+    assert keyword_tokens(["computer", "science", "dept"]) == {
+        "computer", "science", "dept", "computer-science", "science-dept", "computer-science-dept"
+    }
+
+
+def test_tokenize_url_reads_path_segments_and_anchor_text():
+    tokens = tokenize_url("https://x.edu/Departments/Computer_Science.html?id=3", "Training & Placements")
+    assert {"departments", "computer-science", "computer", "science", "training", "placements"} <= tokens
+    assert "id" not in tokens
+
+
+def test_score_counts_each_keyword_once():
+    assert score_url("https://x.edu/computer-science/computer-science", TABLE) == 10 + 2
+    assert score_url("https://x.edu/page", TABLE, "Contact us") == 7
+    assert score_url("https://x.edu/page", TABLE) == 0
+
+
+def test_rank_prefers_score_then_shallow_paths_then_page_order():
+    urls = ["https://x.edu/a/b/contact", "https://x.edu/contact", "https://x.edu/placements", "https://x.edu/news"]
+    assert [url for _, url in rank_urls(urls, TABLE)] == [
+        "https://x.edu/placements", "https://x.edu/contact", "https://x.edu/a/b/contact", "https://x.edu/news"
+    ]
+
+
+def test_select_is_confident_when_the_cut_off_is_clear():
+    urls = ["https://x.edu/placements", "https://x.edu/contact", "https://x.edu/about"]
+    assert select_urls(urls, TABLE, 2, min_score=5) == (["https://x.edu/placements", "https://x.edu/contact"], True)
+
+
+def test_select_defers_to_the_llm_when_ambiguous():
+    assert select_urls(["https://x.edu/news", "https://x.edu/events"], TABLE, 2, min_score=5) == ([], False)
+
+    tied = ["https://x.edu/placements", "https://x.edu/contact", "https://x.edu/contact-us"]
+    selected, confident = select_urls(tied, TABLE, 2, min_score=5)
+    assert selected == ["https://x.edu/placements", "https://x.edu/contact"]
+    assert not confident
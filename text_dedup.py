@@ -0,0 +1,72 @@
+"""
+Cross-page boilerplate removal for the recommendation crawl in 2_coursera_agent.py.
+
+Pages of one site repeat the same menus, address blocks, cookie banners and
+footers (when they are not in a <nav>/<footer> element html_extract.py drops).
+The extracted page text is a single line, so repeats are found on word shingles
+rather than paragraphs: every run of TEXT_DEDUP_SHINGLE_WORDS words is hashed, and
+words covered by a shingle already seen on an earlier page of the same lead are
+dropped. A block that differs by a word or two (a year, a phone extension) is
+still dropped apart from those words, and leftover fragments shorter than
+TEXT_DEDUP_MIN_RUN_WORDS between dropped blocks are discarded too.
+
+The first page of a lead is never changed, and a later page keeps everything
+Gemini has not seen on an earlier one, so only repeated text leaves the prompts.
+"""
+
+from constants import TEXT_DEDUP_SHINGLE_WORDS, TEXT_DEDUP_MIN_RUN_WORDS
+
+# Marks where repeated text was cut out of a page
+GAP = " … "
+
+
+class PageTextDedup:
+    """Shingle hashes of one lead's pages so far; filter() strips what earlier pages already had"""
+
+    def __init__(self, shingle_words=TEXT_DEDUP_SHINGLE_WORDS, min_run_words=TEXT_DEDUP_MIN_RUN_WORDS):
+        self.shingle_words = shingle_words
+        self.min_run_words = min_run_words
+        self.seen = set()
+        self.chars_in = 0
+        self.chars_out = 0
+
+    def filter(self, text):
+        """The part of a page's text that is not repeated from earlier pages"""
+        words = text.split()
+        if not words:
+            return ""
+        size = min(self.shingle_words, len(words))
+        keys = [word.lower() for word in words]
+        hashes = [hash(tuple(keys[i:i + size])) for i in range(len(words) - size + 1)]
+
+        # coverage[i] > 0 when word i lies inside a shingle seen on an earlier page
+        coverage = [0] * (len(words) + 1)
+        for i, shingle in enumerate(hashes):
+            if shingle in self.seen:
+                coverage[i] += 1
+                coverage[i + size] -= 1
+        self.seen.update(hashes)
+
+        runs, run, covered = [], [], 0
+        for word, change in zip(words, coverage):
+            covered += change
+            if covered:
+                if run:
+                    runs.append(run)
+                    run = []
+            else:
+                run.append(word)
+        if run:
+            runs.append(run)
+
+        if len(runs) > 1 or sum(map(len, runs)) < len(words):
+            runs = [run for run in runs if len(run) >= self.min_run_words]
+        kept = GAP.join(" ".join(run) for run in runs)
+        self.chars_in += len(text)
+        self.chars_out += len(kept)
+        return kept
+
+    @property
+    def dropped_fraction(self):
+        """Share of the lead's page text removed so far"""
+        return 1 - self.chars_out / self.chars_in if self.chars_in else 0.0
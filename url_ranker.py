@@ -0,0 +1,74 @@
+"""
+Deterministic keyword ranker for links found while crawling in 2_coursera_agent.py.
+
+URL paths and anchor texts are tokenized and scored against the keyword tables in
+constants.py (GENERAL_CLASSIFICATION_SCORES for the recommendation crawl,
+PROGRAMMING_KEYWORD_SCORES / SALES_KEYWORD_SCORES for contact pages). Ranking a page's
+links takes microseconds, so Gemini is only asked when the ranking is ambiguous:
+
+    - no link reaches URL_RANKER_MIN_SCORE (nothing recognisable), or
+    - the cut-off falls inside a tie (the k-th and (k+1)-th best links score the same)
+"""
+
+import os
+import re
+from urllib.parse import urlparse, unquote
+
+from constants import URL_RANKER_MIN_SCORE
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def keyword_tokens(words):
+    """Single words plus hyphen-joined neighbours, so 'computer science' also yields 'computer-science'"""
+    tokens = set(words)
+    for size in (2, 3):
+        for i in range(len(words) - size + 1):
+            tokens.add("-".join(words[i:i + size]))
+    return tokens
+
+
+def tokenize_url(url, anchor_text=""):
+    """Keyword tokens of a URL's path segments and its anchor text"""
+    tokens = set()
+    for segment in unquote(urlparse(url).path).lower().split("/"):
+        segment = os.path.splitext(segment)[0].replace("_", "-")
+        if not segment:
+            continue
+        tokens.add(segment)
+        tokens |= keyword_tokens(WORD_PATTERN.findall(segment))
+    if anchor_text:
+        tokens |= keyword_tokens(WORD_PATTERN.findall(anchor_text.lower()))
+    return tokens
+
+
+def score_url(url, table, anchor_text=""):
+    """Sum of the table scores of every distinct keyword found in the URL or its anchor text"""
+    return sum(table[token] for token in tokenize_url(url, anchor_text) if token in table)
+
+
+def rank_urls(urls, table, anchor_texts=None):
+    """(score, url) pairs, best first; ties keep shallower paths and then page order first"""
+    anchor_texts = anchor_texts or {}
+    scored = [
+        (score_url(url, table, anchor_texts.get(url, "")), urlparse(url).path.count("/"), position, url)
+        for position, url in enumerate(urls)
+    ]
+    scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+    return [(score, url) for score, _, _, url in scored]
+
+
+def select_urls(urls, table, max_urls, anchor_texts=None, min_score=URL_RANKER_MIN_SCORE):
+    """
+    Pick up to max_urls links scoring at least min_score.
+
+    Returns (selected, confident); when confident is False the ranking is ambiguous
+    and the caller should fall back to the LLM.
+    """
+    candidates = [(score, url) for score, url in rank_urls(urls, table, anchor_texts) if score >= min_score]
+    if not candidates:
+        return [], False
+    selected = candidates[:max_urls]
+    if len(candidates) > max_urls and candidates[max_urls][0] == selected[-1][0]:
+        return [url for _, url in selected], False
+    return [url for _, url in selected], True